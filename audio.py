@@ -0,0 +1,200 @@
+# Audio for Cosmic Clash
+
+# Sound effects are decoded once, when the first game starts, into pygame.mixer.Sound
+# buffers: assets/sfx/<name>.wav where it exists, otherwise a placeholder made up with
+# NumPy (a tone sweep or a burst of noise), like the placeholder images of missing
+# sprites. Playing one is then only a copy into a mixer channel.
+#
+# The game calls play(name) from the simulation, as often as things happen. Requests
+# are only queued there: the same effect asked for several times before a frame is
+# shown plays once, a little louder. Like everything else drawing needs, the queue is
+# handed over with the frame's RenderFrame (take() on the simulating thread, schedule() on
+# the drawing one, see pipeline.py), and flush() plays it when that frame is presented,
+# on a fixed pool of AUDIO_CHANNELS channels:
+#
+#   - each category (shots, explosions, ...) has at most AUDIO_VOICE_CAPS voices. When
+#     it is full, the new sound takes over the oldest voice of the category with the
+#     same or a lower priority, or is dropped.
+#   - when every channel is busy, the new sound takes over the oldest voice with a lower
+#     priority, or is dropped
+#
+# so rapid fire can never keep an explosion from being heard. The music streams from
+# disk in SDL_mixer's audio thread; opening the file happens on a thread of its own, so
+# a slow disk does not hold up the first frame of a game.
+#
+# Frames simulated again after a co-op rollback queue nothing, their sounds were heard
+# the first time (see netplay.py).
+
+import os
+import threading
+import pygame
+from settings import *
+
+# Effect: (category, priority, placeholder). Placeholders are ("sweep", start Hz, end Hz, ms)
+# or ("noise", low-pass strength 0..1, ms).
+EFFECTS = {
+    "player_shot": ("shots", 1, ("sweep", 1400, 700, 60)),
+    "enemy_shot": ("enemy_shots", 1, ("sweep", 500, 300, 80)),
+    "boss_shot": ("enemy_shots", 2, ("sweep", 300, 180, 90)),
+    "boss_hit": ("impacts", 2, ("noise", 0.3, 40)),
+    "explosion": ("explosions", 3, ("noise", 0.6, 300)),
+    "player_death": ("explosions", 5, ("noise", 0.8, 700)),
+    "boss_explosion": ("explosions", 6, ("noise", 0.9, 1200)),
+    "powerup": ("pickups", 4, ("sweep", 500, 1500, 200)),
+}
+
+class AudioManager:
+    def __init__(self, game):
+        self.game = game
+        self.started = False
+        self.enabled = False # Whether the mixer could be opened
+        self.sounds = {}
+        self.channels = []
+        self.voices = [] # (category, priority, sequence) of the last sound on each channel
+        self.queued = {} # Effect name: times asked for by the simulation since the last take()
+        self.due = {} # Effect name: times, to play with the next presented frame
+        self.sequence = 0
+        self.music_loaded = False
+        self.music_wanted = False
+        self.music_lock = threading.Lock()
+        self.played = 0
+        self.merged = 0
+        self.dropped = 0
+        self.stolen = 0
+
+    def start(self):
+        """Open the mixer, decode the effects and start loading the music. Called when the first game starts."""
+        if self.started:
+            return
+        self.started = True
+        try:
+            pygame.mixer.init()
+        except pygame.error as e:
+            print(f"No sound: {e}")
+            return
+        self.enabled = True
+        pygame.mixer.set_num_channels(AUDIO_CHANNELS)
+        self.channels = [pygame.mixer.Channel(i) for i in range(AUDIO_CHANNELS)]
+        self.voices = [None] * AUDIO_CHANNELS
+        for name, (_, _, placeholder) in EFFECTS.items():
+            path = os.path.join(SFX_DIR, f"{name}.wav")
+            try:
+                sound = pygame.mixer.Sound(path) if os.path.exists(path) else make_placeholder(placeholder)
+            except pygame.error as e:
+                print(f"Could not load {path}: {e}")
+                sound = make_placeholder(placeholder)
+            self.sounds[name] = sound
+        threading.Thread(target=self.load_music, name="music-load", daemon=True).start()
+
+    def load_music(self):
+        try:
+            pygame.mixer.music.load(MUSIC_PATH)
+            pygame.mixer.music.set_volume(MUSIC_VOLUME)
+        except pygame.error:
+            print("Could not load background music")
+            return
+        with self.music_lock:
+            self.music_loaded = True
+            if self.music_wanted:
+                pygame.mixer.music.play(-1)
+
+    def play_music(self):
+        self.start()
+        with self.music_lock:
+            self.music_wanted = True
+            if self.music_loaded:
+                pygame.mixer.music.play(-1)  # -1 means loop indefinitely
+
+    def stop_music(self):
+        with self.music_lock:
+            self.music_wanted = False
+            if self.music_loaded:
+                pygame.mixer.music.stop()
+
+    def play(self, name):
+        """Queue an effect for the next presented frame"""
+        if self.game.resimulating:
+            return
+        self.queued[name] = self.queued.get(name, 0) + 1
+
+    def take(self):
+        """The effects queued since the last call, for a RenderFrame. Called on the simulating thread."""
+        queued, self.queued = self.queued, {}
+        return queued
+
+    def schedule(self, sounds):
+        """Play sounds (from take()) with the next presented frame. Called on the drawing thread."""
+        for name, count in sounds.items():
+            self.due[name] = self.due.get(name, 0) + count
+
+    def flush(self):
+        """Play what is due, within the voice caps. Called once per presented frame."""
+        if not self.due:
+            return
+        queued, self.due = self.due, {}
+        if not self.enabled:
+            return
+        # The most important sounds get channels first
+        for name, count in sorted(queued.items(), key=lambda item: -EFFECTS[item[0]][1]):
+            self.merged += count - 1
+            category, priority, _ = EFFECTS[name]
+            channel = self.pick_channel(category, priority)
+            if channel is None:
+                self.dropped += 1
+                continue
+            sound = self.sounds[name]
+            self.channels[channel].play(sound)
+            # Louder when several merged, up to full volume
+            self.channels[channel].set_volume(min(1.0, EFFECTS_VOLUME * (1 + AUDIO_MERGE_BOOST * (count - 1))))
+            self.sequence += 1
+            self.voices[channel] = (category, priority, self.sequence)
+            self.played += 1
+
+    def pick_channel(self, category, priority):
+        """A channel for a new sound, stopping the voice it takes over, or None to drop it"""
+        busy = [i for i, channel in enumerate(self.channels) if channel.get_busy()]
+        same = [i for i in busy if self.voices[i][0] == category]
+        if len(same) >= AUDIO_VOICE_CAPS.get(category, AUDIO_CHANNELS):
+            candidates = [i for i in same if self.voices[i][1] <= priority]
+        elif len(busy) < len(self.channels):
+            return next(i for i, channel in enumerate(self.channels) if i not in busy)
+        else:
+            candidates = [i for i in busy if self.voices[i][1] < priority]
+        if not candidates:
+            return None
+        # The lowest priority, and of those the oldest
+        victim = min(candidates, key=lambda i: (self.voices[i][1], self.voices[i][2]))
+        self.channels[victim].stop()
+        self.stolen += 1
+        return victim
+
+    def report(self):
+        return (f"Audio: {self.played} sounds played, {self.merged} merged into others, "
+                f"{self.dropped} dropped, {self.stolen} voices stolen")
+
+def make_placeholder(spec):
+    """A Sound made up from a placeholder spec in EFFECTS, in the mixer's format"""
+    import numpy as np
+    frequency, size, channels = pygame.mixer.get_init()
+    kind = spec[0]
+    n = max(1, frequency * spec[-1] // 1000)
+    t = np.arange(n) / frequency
+    if kind == "sweep":
+        hz = np.linspace(spec[1], spec[2], n)
+        wave = np.sign(np.sin(2 * np.pi * np.cumsum(hz) / frequency)) * 0.5 # Square wave
+    else:
+        noise = np.random.default_rng(n).uniform(-1, 1, n)
+        # Moving average as a low-pass: the stronger, the deeper the rumble
+        width = 1 + int(spec[1] * 40)
+        wave = np.convolve(noise, np.ones(width) / width, "same")
+        wave /= max(1e-6, np.abs(wave).max())
+    wave *= np.exp(-4 * t / t[-1]) # Fade out
+    if size == 32:
+        samples = wave.astype(np.float32)
+    elif size < 0:
+        samples = (wave * (2 ** (-size - 1) - 1)).astype({-8: np.int8, -16: np.int16}[size])
+    else:
+        samples = ((wave + 1) / 2 * (2 ** size - 1)).astype({8: np.uint8, 16: np.uint16}[size])
+    if channels > 1:
+        samples = np.repeat(samples[:, None], channels, axis=1)
+    return pygame.sndarray.make_sound(np.ascontiguousarray(samples))
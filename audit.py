@@ -0,0 +1,143 @@
+# Entity lifecycle auditor for Cosmic Clash
+
+# A debugging aid for leaks that only show up over long sessions: sprites that were
+# removed from one group but not the others, dead sprites something still points at,
+# timers still armed for them, and memory that grows from level to level. Turn it on
+# with main.py --audit to audit at the start of the run and at every level transition,
+# or press F9 while playing to audit right away. Each audit prints:
+#
+#   - group problems: every sprite in all_sprites must be in the typed group for its
+#     class (enemies, bullets, ...) and every sprite in a typed group in all_sprites
+#   - dead sprites that are still reachable, with what refers to them, and pending
+#     timers whose owner is dead
+#   - live objects per class against the first audit (the baseline). Between levels
+#     only the players are left, so the sprite counts should be back where they started.
+#   - the allocation sites (from tracemalloc) that grew the most since the last audit
+#
+# Audits run a full garbage collection and walk every object, so they take a few
+# milliseconds and are not meant to run while nobody is looking. tracemalloc also slows
+# the whole game down while it traces, which is why it only starts with the auditor.
+
+import gc
+import tracemalloc
+from collections import Counter
+import pygame
+from settings import *
+from sprites import Player, Enemy, Boss, Bullet, EnemyBullet, PowerUp
+from explosion import Explosion
+from scheduler import Timer
+
+# The typed group each sprite class belongs in, as a Game attribute (None: all_sprites only)
+TYPED_GROUPS = {Player: None, Enemy: "enemies", Boss: "boss_group", Bullet: "bullets",
+                EnemyBullet: "enemy_bullets", PowerUp: "powerups", Explosion: None}
+# Classes whose live count is compared against the baseline
+TRACKED = list(TYPED_GROUPS) + [Timer]
+
+class LifecycleAuditor:
+    def __init__(self, trace=True):
+        if trace and not tracemalloc.is_tracing():
+            tracemalloc.start(AUDIT_TRACE_FRAMES)
+        self.baseline = None # Counts per type name from the first audit
+        self.baseline_surfaces = None
+        self.last_snapshot = None
+        self.audits = 0
+
+    def audit(self, game, reason):
+        """Check game now and print what looks leaked. Returns the list of problems."""
+        self.audits += 1
+        gc.collect() # Only what is still reachable counts
+        # Frozen objects (see gcpolicy.py) are invisible to gc.get_objects()
+        frozen = gc.get_freeze_count()
+        if frozen:
+            gc.unfreeze()
+        try:
+            objects = gc.get_objects()
+            counts = Counter(type(obj).__name__ for obj in objects)
+            problems = self.check_groups(game) + self.check_dead(game, objects)
+        finally:
+            del objects
+            if frozen:
+                gc.freeze()
+
+        lines = [f"Audit {self.audits} ({reason}), level {game.current_level}, frame {game.frame}"]
+        lines += [f"  PROBLEM {problem}" for problem in problems]
+        surfaces = game.surfaces.stats()
+        if self.baseline is None:
+            self.baseline = counts
+            self.baseline_surfaces = surfaces
+            lines.append("  Baseline: " + ", ".join(f"{cls.__name__} {counts[cls.__name__]}" for cls in TRACKED))
+        else:
+            for cls in TRACKED:
+                name = cls.__name__
+                if counts[name] != self.baseline[name]:
+                    lines.append(f"  {name}: {counts[name]} live, baseline {self.baseline[name]}")
+            growth = (counts - self.baseline).most_common(AUDIT_TOP_TYPES)
+            if growth:
+                lines.append("  Most grown types: " + ", ".join(f"{name} +{n}" for name, n in growth))
+            lines.append(f"  Surface cache: {surfaces['surfaces']} surfaces, {surfaces['bytes'] / 1024:.0f} KB "
+                         f"(baseline {self.baseline_surfaces['surfaces']}, {self.baseline_surfaces['bytes'] / 1024:.0f} KB)")
+        lines += self.allocations()
+        print("\n".join(lines))
+        return problems
+
+    def check_groups(self, game):
+        problems = []
+        everything = game.all_sprites
+        for sprite in everything:
+            cls = type(sprite)
+            if cls not in TYPED_GROUPS:
+                problems.append(f"{cls.__name__} of unknown type in all_sprites")
+            elif TYPED_GROUPS[cls] is not None and sprite not in getattr(game, TYPED_GROUPS[cls]):
+                problems.append(f"{cls.__name__} in all_sprites but not in {TYPED_GROUPS[cls]}")
+        for cls, name in TYPED_GROUPS.items():
+            if name is None:
+                continue
+            for sprite in getattr(game, name):
+                if type(sprite) is not cls:
+                    problems.append(f"{type(sprite).__name__} in {name}")
+                if sprite not in everything:
+                    problems.append(f"{type(sprite).__name__} in {name} but not in all_sprites")
+        for player in game.players:
+            if player not in everything:
+                problems.append(f"Player {player.index + 1} not in all_sprites")
+        return problems
+
+    def check_dead(self, game, objects):
+        problems = []
+        dead = [obj for obj in objects if isinstance(obj, pygame.sprite.Sprite) and not obj.alive()]
+        for cls, sprites in _by_class(dead).items():
+            # The first one's referrers, except the lists made here
+            referrers = [type(ref).__name__ for ref in gc.get_referrers(sprites[0])
+                         if ref is not objects and ref is not dead and ref is not sprites]
+            problems.append(f"{len(sprites)} dead {cls.__name__} still reachable, referred to by {', '.join(referrers) or 'nothing'}")
+        for entry in game.scheduler.heap:
+            timer = entry[3]
+            owner = getattr(timer.callback, "__self__", None)
+            if not timer.cancelled and isinstance(owner, pygame.sprite.Sprite) and not owner.alive():
+                problems.append(f"Timer {timer.callback.__name__} still armed for a dead {type(owner).__name__}")
+        return problems
+
+    def allocations(self):
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ])
+        last, self.last_snapshot = self.last_snapshot, snapshot
+        if last is None:
+            current, peak = tracemalloc.get_traced_memory()
+            return [f"  Traced memory: {current / 1024:.0f} KB (peak {peak / 1024:.0f} KB)"]
+        stats = [stat for stat in snapshot.compare_to(last, "lineno") if stat.size_diff > 0]
+        lines = ["  Grown since the last audit:"]
+        for stat in stats[:AUDIT_TOP_ALLOCATIONS]:
+            frame = stat.traceback[0]
+            lines.append(f"    {stat.size_diff / 1024:+.1f} KB ({stat.count_diff:+d} blocks) {frame.filename}:{frame.lineno}")
+        return lines if stats else []
+
+def _by_class(objects):
+    classes = {}
+    for obj in objects:
+        classes.setdefault(type(obj), []).append(obj)
+    return classes
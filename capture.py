@@ -0,0 +1,94 @@
+# Gameplay recording for Cosmic Clash
+
+# FrameRecorder copies every presented frame into one of a few preallocated buffers
+# (a plain memory copy, well under a millisecond) and background workers encode them,
+# as a numbered PNG sequence or as one raw video stream. When all buffers are still
+# waiting to be encoded the frame is dropped instead of making the game wait, unless
+# the recorder was created with block=True (offline replay rendering, where every frame
+# matters and nothing runs in real time).
+#
+# A raw stream can be turned into a video with ffmpeg, using the command printed when
+# recording stops.
+
+import os
+import queue
+import threading
+import pygame
+from settings import *
+
+class FrameRecorder:
+    def __init__(self, path, surface, fmt=CAPTURE_FORMAT, ring_size=CAPTURE_RING_SIZE, block=False):
+        self.path = path
+        self.fmt = fmt
+        self.block = block
+        self.size = surface.get_size()
+        self.surface = surface # Format reference for decoding the buffers
+        self.frame_bytes = surface.get_pitch() * self.size[1]
+        self.free = queue.Queue()
+        self.filled = queue.Queue()
+        for _ in range(ring_size):
+            self.free.put(bytearray(self.frame_bytes))
+        self.frame_number = 0
+        self.captured = 0
+        self.dropped = 0
+        self.encoded = 0
+        self.errors = 0
+        if fmt == "raw":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.stream = open(path, "wb")
+            worker_count = 1 # The stream has to be written in order
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.stream = None
+            worker_count = CAPTURE_WORKERS # PNG encoding releases the GIL, so workers run in parallel
+        self.workers = [threading.Thread(target=self.work, name=f"capture-{i}", daemon=True) for i in range(worker_count)]
+        for worker in self.workers:
+            worker.start()
+
+    def capture(self, surface):
+        """Queue a copy of surface for encoding, or count it as dropped when the ring is full"""
+        try:
+            buffer = self.free.get(self.block)
+        except queue.Empty:
+            self.dropped += 1
+            self.frame_number += 1
+            return
+        buffer[:] = surface.get_buffer()
+        self.filled.put((self.frame_number, buffer))
+        self.frame_number += 1
+        self.captured += 1
+
+    def work(self):
+        # Each worker decodes into its own surface with the game screen's pixel format
+        frame = pygame.Surface(self.size, 0, self.surface)
+        while True:
+            item = self.filled.get()
+            if item is None:
+                return
+            number, buffer = item
+            try:
+                if self.stream is not None:
+                    self.stream.write(buffer)
+                else:
+                    frame.get_buffer().write(bytes(buffer))
+                    pygame.image.save(frame, os.path.join(self.path, f"frame_{number:06d}.png"))
+                self.encoded += 1
+            except (OSError, pygame.error) as e:
+                self.errors += 1
+                print(f"Could not write frame {number}: {e}")
+            self.free.put(buffer)
+
+    def close(self):
+        """Finish encoding the queued frames and print a summary"""
+        for _ in self.workers:
+            self.filled.put(None)
+        for worker in self.workers:
+            worker.join()
+        if self.stream is not None:
+            self.stream.close()
+        print(f"Recorded {self.captured} frames to {self.path} ({self.dropped} dropped, {self.errors} failed)")
+        if self.fmt == "raw":
+            # Byte order of the pixels in memory for ffmpeg
+            pixel_format = "bgr0" if self.surface.get_shifts()[0] == 16 else "rgb0"
+            print(f"  ffmpeg -f rawvideo -pixel_format {pixel_format} -video_size {self.size[0]}x{self.size[1]} "
+                  f"-framerate {FPS} -i {self.path} {os.path.splitext(self.path)[0]}.mp4")
@@ -0,0 +1,71 @@
+# Boss bullet pattern emitters for Cosmic Clash
+
+# Patterns are declared in levels.py (BOSS_PATTERNS). Every volley is computed as one
+# batch: the emitter's angles (a NumPy array) times its speeds gives the velocity arrays,
+# which are written straight into the game's ProjectileStore.
+
+import math
+import numpy as np
+from settings import *
+from levels import BOSS_PATTERNS
+
+class Emitter:
+    def __init__(self, definition, diff_mult):
+        self.kind = definition["kind"]
+        self.origin = definition.get("origin", "center")
+        self.interval = definition.get("interval", BOSS_SHOOT_DELAY_BASE) * diff_mult["boss_shoot_delay_mult"]
+        self.speeds = np.array(definition["speeds"], np.float32) * diff_mult["enemy_bullet_speed_mult"]
+        self.angle = math.radians(definition.get("angle", 0)) # Current rotation, advanced by spin
+        self.spin = math.radians(definition.get("spin", 0))
+        count = definition["count"]
+        # Angle offsets of one volley, relative to self.angle (or to the player when aimed)
+        if self.kind == "aimed_fan":
+            spread = math.radians(definition.get("spread", 0))
+            self.offsets = np.linspace(-spread / 2, spread / 2, count, dtype=np.float32)
+        else:
+            self.offsets = np.arange(count, dtype=np.float32) * np.float32(2 * math.pi / count)
+            if self.kind == "ring":
+                self.offsets = self.offsets[definition.get("gap", 0):]
+        self.next_shot = 0
+
+    def volley(self, origin, target):
+        """Velocity arrays (vx, vy) for one volley fired from origin"""
+        if self.kind == "aimed_fan":
+            base = math.atan2(target[1] - origin[1], target[0] - origin[0])
+        else:
+            base = self.angle
+            self.angle += self.spin
+        angles = self.offsets + np.float32(base)
+        # Every angle at every speed in one outer product
+        vx = np.outer(np.cos(angles), self.speeds).ravel()
+        vy = np.outer(np.sin(angles), self.speeds).ravel()
+        return vx, vy
+
+class BossPattern:
+    """Runs the emitters of a boss type, switching sets as the boss health drops"""
+    def __init__(self, boss_type, diff_mult):
+        phases = BOSS_PATTERNS.get(boss_type, BOSS_PATTERNS["level1_boss"])
+        self.phases = [(phase["health"], [Emitter(e, diff_mult) for e in phase["emitters"]]) for phase in phases]
+        self.phase_index = 0
+
+    def update(self, now, health_fraction, rect, target, store):
+        # Advance to the lowest phase the boss health has reached
+        while self.phase_index + 1 < len(self.phases) and health_fraction <= self.phases[self.phase_index + 1][0]:
+            self.phase_index += 1
+            for emitter in self.phases[self.phase_index][1]:
+                emitter.next_shot = now
+        for emitter in self.phases[self.phase_index][1]:
+            if now >= emitter.next_shot:
+                emitter.next_shot = now + emitter.interval
+                origin = origin_point(rect, emitter.origin)
+                vx, vy = emitter.volley(origin, target)
+                store.spawn(origin[0], origin[1], vx, vy)
+
+def origin_point(rect, origin):
+    if origin == "bottom":
+        return rect.midbottom
+    elif origin == "left":
+        return rect.midleft
+    elif origin == "right":
+        return rect.midright
+    return rect.center
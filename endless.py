@@ -0,0 +1,77 @@
+# Endless mode for Cosmic Clash
+
+# Levels past the last one in LEVELS are endless: their waves are made up as the game
+# goes instead of being listed in levels.py. Two generators form the pipeline:
+#
+#   wave_stream   yields one wave definition (like the waves in LEVELS) at a time, made
+#                 from the run seed and the wave number, harder as the waves and
+#                 time_based_difficulty_multiplier go up
+#   spawn_stream  turns those waves into single spawns, each with the delay before it
+#
+# Game.manage_endless pulls the next spawn only when it is due and the screen is below
+# the caps on live enemies and enemy bullets. While it is full the stream waits, so a
+# session can run for hours with bounded memory and frame time.
+#
+# A wave depends only on the seed, its number and its intensity, so a snapshot restores
+# the stream from (wave number, spawns done in it, intensity), see snapshot.py.
+
+import random
+from settings import *
+from levels import LEVELS, PATHS
+from paths import get_path
+
+SPAWN_PATTERNS = ["top_random", "top_sides", "top_center_spread"] + list(PATHS)
+# Bosses fought in endless mode, in turn
+BOSS_ROTATION = [LEVELS[level]["boss_type"] for level in sorted(LEVELS)]
+
+def is_endless(level):
+    return level > len(LEVELS)
+
+def stage_data(level):
+    """Level data for endless level number level (the waves come from wave_stream)"""
+    stage = level - len(LEVELS) - 1
+    for name in PATHS:
+        get_path(name) # Any path can come up, bake them all now rather than mid-wave
+    return {"waves": [], "enemy_count_for_boss": 0, "boss_type": BOSS_ROTATION[stage % len(BOSS_ROTATION)]}
+
+def wave_intensity(number, difficulty_multiplier):
+    # Difficulty curve: rises with every wave and with the time-based multiplier, up to a limit
+    return min(ENDLESS_MAX_INTENSITY, (1 + number * 0.06) * difficulty_multiplier)
+
+def make_wave(seed, number, intensity):
+    """Wave number of the run with the given seed. Every ENDLESS_BOSS_EVERY-th wave is a boss."""
+    if number % ENDLESS_BOSS_EVERY == ENDLESS_BOSS_EVERY - 1:
+        return {"boss": True}
+    rng = random.Random(seed * 100003 + number)
+    # Zigzags and shooters get more common as the intensity rises
+    weights = [3, intensity, max(0.0, intensity - 0.8)]
+    enemy_type = rng.choices(["basic", "zigzag", "shooter"], weights)[0]
+    return {
+        "type": enemy_type,
+        "count": min(ENDLESS_MAX_ENEMIES, int(4 + 3 * intensity + rng.randrange(3))),
+        "spawn_delay": int(max(200, 1200 / intensity) * rng.uniform(0.8, 1.2)),
+        "pattern": rng.choice(SPAWN_PATTERNS),
+    }
+
+def wave_stream(game, number, intensity=None):
+    """Waves from number on, each made when it is asked for.
+    intensity is that of the first wave when resuming one that had started."""
+    while True:
+        if intensity is None:
+            intensity = wave_intensity(number, game.time_based_difficulty_multiplier)
+        yield number, intensity, make_wave(game.seed, number, intensity)
+        number += 1
+        intensity = None
+
+def spawn_stream(waves, skip=0):
+    """(wave number, intensity, index in the wave, delay in ms, wave) for every spawn of
+    waves, leaving out the first skip spawns of the first wave"""
+    for number, intensity, wave in waves:
+        if "boss" in wave:
+            if skip == 0:
+                yield number, intensity, 0, ENDLESS_WAVE_PAUSE, wave
+        else:
+            for index in range(skip, wave["count"]):
+                delay = ENDLESS_WAVE_PAUSE if index == 0 else wave["spawn_delay"]
+                yield number, intensity, index, delay, wave
+        skip = 0
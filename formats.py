@@ -0,0 +1,137 @@
+# Image formats for Cosmic Clash
+
+# Images are loaded with convert_alpha(), so every blit of them blends every pixel by
+# its alpha, even where the image has no translucency at all. optimize() puts each image
+# into the cheapest format that draws it the same:
+#
+#   opaque    every pixel is fully opaque: convert(), blitted as a plain copy
+#   colorkey  every pixel is fully opaque or fully transparent: convert() with a colorkey
+#             (a color no visible pixel has) and RLEACCEL. SDL run-length encodes the
+#             transparent runs on the first blit and skips them from then on.
+#   alpha     real translucency (antialiased edges, glows): per-pixel alpha, as loaded
+#
+# ASSET_SOFT_EDGE_SHARE lets images with a few partly transparent pixels be snapped to
+# colorkey anyway (at ASSET_ALPHA_THRESHOLD), which hardens their edges. At 5% that is
+# every sprite, explosion and the middle background layer, whose antialiased rims are a
+# pixel wide; the bullets (mostly glow) and the top background layer stay alpha.
+#
+# The format of every image the game loads is recorded in game.asset_formats. report()
+# (main.py --asset-report) times blitting each image in its format, and as colorkey and
+# per-pixel alpha, onto a copy of the screen.
+#
+# Only pygame.mask is used to look at the pixels, so the background can be optimized
+# before NumPy is imported (see startup.py).
+
+import time
+import pygame
+from settings import *
+
+# Tried in order as an image's colorkey; the first one no visible pixel has is used
+KEY_COLORS = [(255, 0, 255), (0, 255, 0), (0, 255, 255), (1, 2, 3), (254, 1, 253)]
+
+def classify(surface):
+    """(format, share of partly transparent pixels) for a per-pixel alpha surface"""
+    pixels = surface.get_width() * surface.get_height()
+    visible = pygame.mask.from_surface(surface, 0).count() # Alpha above 0
+    opaque = pygame.mask.from_surface(surface, 254).count() # Alpha 255
+    partial = (visible - opaque) / max(1, pixels)
+    if opaque == pixels:
+        return "opaque", partial
+    if partial <= ASSET_SOFT_EDGE_SHARE:
+        return "colorkey", partial
+    return "alpha", partial
+
+def with_colorkey(surface):
+    """surface converted to a colorkey with RLEACCEL, or None when every key color is taken"""
+    shown = pygame.mask.from_surface(surface, ASSET_ALPHA_THRESHOLD - 1)
+    for color in KEY_COLORS:
+        if not pygame.mask.from_threshold(surface, color, (1, 1, 1, 255)).overlap_area(shown, (0, 0)):
+            break
+    else:
+        return None
+    keyed = surface.convert()
+    shown.invert()
+    shown.to_surface(keyed, setcolor=color, unsetcolor=None) # Paint the hidden pixels with the key
+    keyed.set_colorkey(color, pygame.RLEACCEL)
+    return keyed
+
+def optimize(surface, size=None):
+    """(surface in its cheapest format, format, share of partly transparent pixels) for a per-pixel alpha surface.
+
+    With size, the result is also scaled to size. The format is picked before scaling,
+    which looks at fewer pixels when the image is enlarged (the background layers).
+    """
+    kind, partial = classify(surface)
+    optimized = None
+    if kind == "opaque":
+        optimized = surface.convert()
+    elif kind == "colorkey":
+        optimized = with_colorkey(surface)
+    if optimized is None:
+        kind = "alpha"
+        optimized = surface
+    if size is not None and size != surface.get_size():
+        # Nearest-neighbor scaling adds no new alpha values, so the format still fits
+        optimized = pygame.transform.scale(optimized, size)
+        if kind == "colorkey":
+            optimized.set_colorkey(optimized.get_colorkey(), pygame.RLEACCEL)
+    return optimized, kind, partial
+
+def editable(image):
+    """A copy of image to draw or blend on. A colorkey image is copied to per-pixel alpha,
+    so blending can't change the key color; optimize() the result when done."""
+    return image.convert_alpha() if image.get_colorkey() is not None else image.copy()
+
+def blit_time(image, target, seconds=0.02):
+    """Microseconds per blit of image onto target, the best of three runs"""
+    width = max(1, target.get_width() - image.get_width())
+    height = max(1, target.get_height() - image.get_height())
+    count = max(10, min(500, 4000000 // max(1, image.get_width() * image.get_height())))
+    positions = [((i * 97) % width, (i * 61) % height) for i in range(count)]
+    target.blit(image, (0, 0)) # The first blit of a colorkey image RLE-encodes it
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for position in positions:
+            target.blit(image, position)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / count * 1e6
+
+class AssetFormats:
+    def __init__(self):
+        self.images = {} # Name: (format, share of partly transparent pixels, surface, surface as loaded)
+
+    def optimize(self, name, surface, size=None):
+        """optimize() a loaded image and record its format under name"""
+        optimized, kind, partial = optimize(surface, size)
+        self.images[name] = (kind, partial, optimized, surface)
+        return optimized
+
+    def summary(self):
+        counts = {}
+        for kind, _, _, _ in self.images.values():
+            counts[kind] = counts.get(kind, 0) + 1
+        return "Asset formats: " + ", ".join(f"{counts.get(kind, 0)} {kind}" for kind in ("opaque", "colorkey", "alpha"))
+
+    def report(self, screen):
+        """Memory and blit time of every image in its format, as colorkey and as per-pixel alpha"""
+        target = screen.copy()
+        lines = [f"{'image':<16} {'size':>9} {'format':<8} {'soft':>6} {'KB':>6} {'alpha KB':>8} "
+                 f"{'alpha us':>9} {'key us':>8} {'used us':>8} {'speedup':>7}"]
+        total_alpha = total_used = 0.0
+        for name, (kind, partial, surface, alpha) in self.images.items():
+            if alpha.get_size() != surface.get_size():
+                alpha = pygame.transform.scale(alpha, surface.get_size())
+            keyed = surface if kind == "colorkey" else with_colorkey(alpha) if kind == "alpha" else None
+            alpha_us = blit_time(alpha, target)
+            used_us = alpha_us if kind == "alpha" else blit_time(surface, target)
+            key_us = used_us if keyed is surface else blit_time(keyed, target) if keyed is not None else None
+            total_alpha += alpha_us
+            total_used += used_us
+            size = f"{surface.get_width()}x{surface.get_height()}"
+            lines.append(f"{name:<16} {size:>9} {kind:<8} {partial:>6.1%} "
+                         f"{surface.get_pitch() * surface.get_height() / 1024:>6.1f} {alpha.get_pitch() * alpha.get_height() / 1024:>8.1f} "
+                         f"{alpha_us:>9.2f} {'-' if key_us is None else f'{key_us:.2f}':>8} {used_us:>8.2f} {alpha_us / used_us:>6.2f}x")
+        lines.append(f"One blit of every image: {total_alpha:.1f} us all per-pixel alpha, {total_used:.1f} us as used")
+        return "\n".join(lines)
@@ -0,0 +1,82 @@
+# Garbage collection policy for Cosmic Clash
+
+# Sprites hold reference cycles (through self.game, and with their scheduler timers), so
+# Python's cyclic collector runs every so often, and a full (generation 2) collection can
+# land in the middle of a boss fight. In "low-latency" mode (main.py --gc-mode):
+#
+#   - long-lived objects (modules, images, level data, the players) are moved out of the
+#     collector's view with gc.freeze() after loading and at the start of every level.
+#     Each level start unfreezes first, so what the last level froze can be collected.
+#   - during play the collection thresholds are raised (GC_PLAY_THRESHOLDS), so
+#     collections are rare
+#   - between levels (during the level transition, see scenes.LevelTransition) and after
+#     a game the garbage is collected on purpose, where a pause is not noticed
+#
+# In every mode each collection is timed through gc.callbacks, so pauses show up in the
+# telemetry next to the frame times (see telemetry.py).
+
+import gc
+import time
+from collections import deque
+from settings import *
+
+class GcPolicy:
+    def __init__(self, mode=GC_MODE):
+        self.mode = mode
+        self.default_thresholds = gc.get_threshold()
+        # Written only by the callback, which runs on whichever thread triggered the collection
+        self.collections = [0, 0, 0] # Per generation
+        self.pause_total = [0.0, 0.0, 0.0] # Seconds per generation
+        self.collected = 0 # Unreachable objects found
+        self.recent = deque(maxlen=GC_RECENT_PAUSES) # (generation, seconds) of the last collections
+        self.started = None
+        gc.callbacks.append(self.callback)
+
+    def callback(self, phase, info):
+        if phase == "start":
+            self.started = time.perf_counter()
+            return
+        if self.started is None:
+            return
+        duration = time.perf_counter() - self.started
+        self.started = None
+        generation = info["generation"]
+        self.collections[generation] += 1
+        self.pause_total[generation] += duration
+        self.collected += info["collected"]
+        self.recent.append((generation, duration))
+
+    def loaded(self):
+        """Called once the images and modules are loaded"""
+        if self.mode == "low-latency":
+            gc.collect()
+            gc.freeze()
+
+    def level_start(self):
+        """Called when a level starts: collect what the last one left, freeze, raise the thresholds"""
+        if self.mode != "low-latency":
+            return
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+        gc.set_threshold(*GC_PLAY_THRESHOLDS)
+
+    def game_over(self):
+        """Called after a game: everything frozen during it is collectable again"""
+        if self.mode != "low-latency":
+            return
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze() # The game itself and the modules stay frozen
+        gc.set_threshold(*self.default_thresholds)
+
+    def stats(self):
+        recent = list(self.recent)
+        return {"collections": list(self.collections), "pause_total": list(self.pause_total),
+                "collected": self.collected, "max_recent_pause": max((d for _, d in recent), default=0.0),
+                "frozen": gc.get_freeze_count()}
+
+    def report(self):
+        stats = self.stats()
+        pauses = ", ".join(f"gen {g}: {n} ({t * 1000:.1f} ms)" for g, (n, t) in enumerate(zip(stats["collections"], stats["pause_total"])))
+        return f"GC ({self.mode}): {pauses}, longest recent pause {stats['max_recent_pause'] * 1000:.2f} ms"
@@ -0,0 +1,105 @@
+# Input latency for Cosmic Clash
+
+# The normal loop (scenes.Playing) waits for the frame at its top (see pacing.py), reads
+# the keys, simulates the whole frame and draws it. A key pressed during the sleep waits
+# for the rest of it, and then for the whole update and draw, before it is on screen.
+#
+# The low-latency loop (main.py --low-latency, scenes.Playing too) reorders a frame:
+#
+#   1. update_world: everything that does not depend on this frame's input (enemies,
+#      timers, projectiles, spawns), right after the last flip
+#   2. sleep until the flip deadline minus the estimated time of steps 3 and 4, polling
+#      for events meanwhile
+#   3. handle the events and read the keys, then update_players: move the players and
+#      check collisions
+#   4. draw and flip, on the deadline
+#
+# The players always move after the rest of the world, in every loop, so both loops
+# (and replays and co-op) simulate the same frames from the same inputs.
+#
+# FlipEstimate is the estimate for step 2: a high quantile of the recent durations of
+# steps 3 and 4, plus a safety margin. InputLatency measures what the loops achieve.
+# While waiting it takes events off the queue every LATENCY_POLL_INTERVAL ms and stamps
+# every key and button event with the time it was seen. The stamps of the events that
+# were read for a frame are matched to that frame's flip, and the differences are the
+# latencies reported at exit and in the telemetry. Events that arrived during a blind
+# sleep (the normal loop's pacing) are only seen after it, so the normal loop only
+# waits by polling (and is measured fairly) with main.py --input-latency.
+
+import time
+from collections import deque
+import pygame
+from settings import *
+
+STAMPED_EVENTS = (pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP)
+
+class InputLatency:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.events = [] # Taken off the queue, not handled yet
+        self.seen = [] # perf_counter() of each stamped event in self.events
+        self.sampled = [] # Stamps of the events read for the frame being made
+        self.latencies = deque(maxlen=window) # Seconds from event to flip
+        self.count = 0
+
+    def poll(self):
+        events = pygame.event.get()
+        if events:
+            now = time.perf_counter()
+            self.events += events
+            self.seen += [now for event in events if event.type in STAMPED_EVENTS]
+
+    def wait(self, deadline):
+        """Sleep until perf_counter() reaches deadline, taking events off the queue meanwhile"""
+        while True:
+            self.poll()
+            left = deadline - time.perf_counter()
+            if left <= 0:
+                return
+            time.sleep(min(left, LATENCY_POLL_INTERVAL / 1000))
+
+    def take_events(self):
+        """The events to handle now. The keys are read right after, so their stamps wait for the flip."""
+        self.poll()
+        events = self.events
+        self.events = []
+        self.sampled += self.seen
+        self.seen = []
+        return events
+
+    def flipped(self):
+        """Called right after the display is updated"""
+        if self.sampled:
+            now = time.perf_counter()
+            self.latencies.extend(now - seen for seen in self.sampled)
+            self.count += len(self.sampled)
+            self.sampled = []
+
+    def quantiles(self):
+        """Latency quantiles in ms over the last LATENCY_WINDOW events, {} before the first"""
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {}
+        return {q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 for q in (0.5, 0.9, 0.99)}
+
+    def report(self):
+        quantiles = self.quantiles()
+        if not quantiles:
+            return "Input latency: no input events measured"
+        return (f"Input latency over the last {len(self.latencies)} of {self.count} events: "
+                + ", ".join(f"p{int(q * 100)} {ms:.1f} ms" for q, ms in quantiles.items()))
+
+class FlipEstimate:
+    """How long reading the input, moving the players and drawing will take"""
+
+    def __init__(self, window=LATENCY_ESTIMATE_FRAMES):
+        self.durations = deque(maxlen=window) # Seconds
+
+    def add(self, duration):
+        self.durations.append(duration)
+
+    def value(self):
+        """Seconds to leave before the flip deadline"""
+        if not self.durations:
+            return 1 / FPS # Nothing measured yet: no sleeping at all
+        durations = sorted(self.durations)
+        return durations[int(LATENCY_ESTIMATE_QUANTILE * (len(durations) - 1))] + LATENCY_MARGIN / 1000
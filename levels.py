@@ -14,7 +14,41 @@
 # }
 
 # Enemy Types: basic, zigzag, shooter (add more later: e.g., fast, tank, homing_shooter)
-# Spawn Patterns: top_random, top_sides, top_center_spread, left_entry_sweep, right_entry_sweep (add more later)
+# Spawn Patterns: top_random, top_sides, top_center_spread, or the name of any path in PATHS.
+# Enemies of a path wave fly along the path one after another, spawn_delay ms apart.
+
+# Flight paths, baked into per-frame lookup tables by paths.py when a level is loaded.
+# Coordinates are fractions of the screen size (values outside 0-1 are off screen).
+# Kinds:
+#     "bezier":      "points" are the control points of a single Bezier curve
+#     "catmull_rom": the curve passes through all "points"
+#     "sine":        straight line from "start" to "end" weaving sideways by "amplitude", "waves" times
+# "speed" is in pixels per frame.
+PATHS = {
+    "left_entry_sweep": {
+        "kind": "bezier",
+        "points": [(-0.08, 0.1), (0.45, 0.0), (0.75, 0.85), (0.3, 0.6), (-0.1, 0.35)],
+        "speed": 3.5
+    },
+    "right_entry_sweep": {
+        "kind": "bezier",
+        "points": [(1.08, 0.1), (0.55, 0.0), (0.25, 0.85), (0.7, 0.6), (1.1, 0.35)],
+        "speed": 3.5
+    },
+    "sine_sweep": {
+        "kind": "sine",
+        "start": (0.5, -0.1),
+        "end": (0.5, 1.1),
+        "amplitude": 0.35,
+        "waves": 2,
+        "speed": 2.5
+    },
+    "center_dive_loop": {
+        "kind": "catmull_rom",
+        "points": [(0.5, -0.1), (0.5, 0.45), (0.7, 0.6), (0.65, 0.3), (0.35, 0.3), (0.3, 0.6), (0.5, 0.75), (0.5, 1.1)],
+        "speed": 3
+    },
+}
 
 LEVELS = {
     1: {
@@ -41,8 +75,9 @@ LEVELS = {
             {"type": "shooter", "count": 4, "spawn_delay": 1500, "pattern": "top_random"},
             {"type": "zigzag", "count": 6, "spawn_delay": 900, "pattern": "top_random"},
             {"type": "basic", "count": 10, "spawn_delay": 500, "pattern": "top_center_spread"},
+            {"type": "basic", "count": 6, "spawn_delay": 400, "pattern": "left_entry_sweep"},
         ],
-        "enemy_count_for_boss": 20,
+        "enemy_count_for_boss": 26,
         "boss_type": "level1_boss" # Reuse boss for now
     },
     4: {
@@ -50,8 +85,10 @@ LEVELS = {
             {"type": "basic", "count": 8, "spawn_delay": 700, "pattern": "top_sides"},
             {"type": "zigzag", "count": 8, "spawn_delay": 700, "pattern": "top_sides"},
             {"type": "shooter", "count": 5, "spawn_delay": 1200, "pattern": "top_random"},
+            {"type": "basic", "count": 6, "spawn_delay": 400, "pattern": "right_entry_sweep"},
+            {"type": "basic", "count": 6, "spawn_delay": 400, "pattern": "left_entry_sweep"},
         ],
-        "enemy_count_for_boss": 21,
+        "enemy_count_for_boss": 33,
         "boss_type": "level2_boss" # Reuse boss
     },
     5: {
@@ -69,8 +106,9 @@ LEVELS = {
             {"type": "basic", "count": 15, "spawn_delay": 500, "pattern": "top_random"},
             {"type": "shooter", "count": 8, "spawn_delay": 900, "pattern": "top_sides"},
             {"type": "zigzag", "count": 10, "spawn_delay": 600, "pattern": "top_center_spread"},
-            ],
-        "enemy_count_for_boss": 33,
+            {"type": "zigzag", "count": 8, "spawn_delay": 600, "pattern": "sine_sweep"},
+        ],
+        "enemy_count_for_boss": 41,
         "boss_type": "level3_boss"
     },
     7: {
@@ -86,8 +124,10 @@ LEVELS = {
             {"type": "basic", "count": 20, "spawn_delay": 400, "pattern": "top_center_spread"},
             {"type": "zigzag", "count": 10, "spawn_delay": 600, "pattern": "top_sides"},
             {"type": "shooter", "count": 10, "spawn_delay": 700, "pattern": "top_random"},
-            ],
-        "enemy_count_for_boss": 40,
+            {"type": "basic", "count": 8, "spawn_delay": 450, "pattern": "center_dive_loop"},
+            {"type": "shooter", "count": 4, "spawn_delay": 900, "pattern": "sine_sweep"},
+        ],
+        "enemy_count_for_boss": 52,
         "boss_type": "level4_boss"
     },
     9: {
@@ -105,9 +145,84 @@ LEVELS = {
             {"type": "shooter", "count": 10, "spawn_delay": 800, "pattern": "top_random"},
             {"type": "basic", "count": 15, "spawn_delay": 300, "pattern": "top_random"},
             {"type": "zigzag", "count": 10, "spawn_delay": 400, "pattern": "top_sides"},
+            {"type": "basic", "count": 8, "spawn_delay": 350, "pattern": "left_entry_sweep"},
+            {"type": "basic", "count": 8, "spawn_delay": 350, "pattern": "right_entry_sweep"},
+            {"type": "basic", "count": 10, "spawn_delay": 400, "pattern": "center_dive_loop"},
         ],
-        "enemy_count_for_boss": 55,
+        "enemy_count_for_boss": 81,
         "boss_type": "final_boss"
     },
 }
 
+
+# Boss bullet patterns, per boss type and health phase.
+# Each phase lists the emitters used while the boss health fraction is at or below
+# "health"; phases are ordered from full health down.
+# Emitter kinds (angles in degrees, 0 = right, 90 = straight down):
+#     "radial":    "count" bullets evenly spaced around a circle, starting at "angle"
+#     "spiral":    like radial, but rotated by "spin" degrees after every volley
+#     "aimed_fan": "count" bullets spread over "spread" degrees, centred on the player
+#     "ring":      like spiral, with "gap" consecutive bullets left out for the player to slip through
+# Every volley fires each angle at every speed in "speeds" (pixels per frame), from
+# "origin" ("center", "bottom", "left" or "right" of the boss), every "interval" ms.
+BOSS_PATTERNS = {
+    "level1_boss": [
+        {"health": 1.0, "emitters": [
+            {"kind": "aimed_fan", "count": 1, "spread": 0, "speeds": [5.6], "interval": 1000, "origin": "bottom"},
+        ]},
+        {"health": 0.5, "emitters": [
+            {"kind": "aimed_fan", "count": 3, "spread": 30, "speeds": [5.6], "interval": 1000, "origin": "bottom"},
+            {"kind": "radial", "count": 12, "angle": 0, "speeds": [3.5], "interval": 2500, "origin": "center"},
+        ]},
+    ],
+    "level2_boss": [
+        {"health": 1.0, "emitters": [
+            {"kind": "aimed_fan", "count": 2, "spread": 20, "speeds": [5.6], "interval": 750, "origin": "bottom"},
+        ]},
+        {"health": 0.5, "emitters": [
+            {"kind": "spiral", "count": 4, "angle": 0, "spin": 13, "speeds": [4], "interval": 160, "origin": "center"},
+        ]},
+    ],
+    "level3_boss": [
+        {"health": 1.0, "emitters": [
+            {"kind": "radial", "count": 10, "angle": 9, "speeds": [4], "interval": 1200, "origin": "center"},
+        ]},
+        {"health": 0.5, "emitters": [
+            {"kind": "spiral", "count": 6, "angle": 0, "spin": 11, "speeds": [3.5], "interval": 120, "origin": "center"},
+            {"kind": "aimed_fan", "count": 3, "spread": 24, "speeds": [6], "interval": 1500, "origin": "bottom"},
+        ]},
+    ],
+    "level4_boss": [
+        {"health": 1.0, "emitters": [
+            {"kind": "ring", "count": 24, "gap": 4, "angle": 0, "spin": 7.5, "speeds": [3.5], "interval": 700, "origin": "center"},
+        ]},
+        {"health": 0.4, "emitters": [
+            {"kind": "ring", "count": 24, "gap": 4, "angle": 0, "spin": 7.5, "speeds": [3.5, 4.5], "interval": 700, "origin": "center"},
+            {"kind": "aimed_fan", "count": 5, "spread": 40, "speeds": [6], "interval": 1200, "origin": "bottom"},
+        ]},
+    ],
+    "level5_boss": [
+        {"health": 1.0, "emitters": [
+            {"kind": "spiral", "count": 3, "angle": 0, "spin": 17, "speeds": [4], "interval": 90, "origin": "center"},
+        ]},
+        {"health": 0.5, "emitters": [
+            {"kind": "spiral", "count": 3, "angle": 0, "spin": 17, "speeds": [4], "interval": 90, "origin": "center"},
+            {"kind": "spiral", "count": 3, "angle": 60, "spin": -17, "speeds": [3], "interval": 90, "origin": "center"},
+        ]},
+    ],
+    "final_boss": [
+        {"health": 1.0, "emitters": [
+            {"kind": "aimed_fan", "count": 5, "spread": 50, "speeds": [5.6], "interval": 500, "origin": "bottom"},
+            {"kind": "radial", "count": 16, "angle": 0, "speeds": [3.5], "interval": 1500, "origin": "center"},
+        ]},
+        {"health": 0.66, "emitters": [
+            {"kind": "spiral", "count": 4, "angle": 0, "spin": 9, "speeds": [3.5, 5], "interval": 100, "origin": "center"},
+            {"kind": "aimed_fan", "count": 3, "spread": 20, "speeds": [6.5], "interval": 700, "origin": "bottom"},
+        ]},
+        {"health": 0.33, "emitters": [
+            {"kind": "ring", "count": 36, "gap": 5, "angle": 0, "spin": 6, "speeds": [3, 4, 5], "interval": 600, "origin": "center"},
+            {"kind": "spiral", "count": 5, "angle": 0, "spin": 11, "speeds": [4], "interval": 80, "origin": "center"},
+            {"kind": "aimed_fan", "count": 3, "spread": 20, "speeds": [6.5], "interval": 900, "origin": "bottom"},
+        ]},
+    ],
+}
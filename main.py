@@ -1,14 +1,42 @@
 # Cosmic Clash - Main Game File
 
+import time
+STARTUP_TIME = time.perf_counter() # Start of the startup profile (main.py --profile-startup)
 import pygame
 import sys
 import random
-import time
 import math
+import os
+import argparse
+import threading
 from settings import *
+from startup import StartupProfile, resolve_font
+startup = StartupProfile(STARTUP_TIME)
+startup.mark("import pygame")
 from sprites import Player, Enemy, Bullet, PowerUp, Boss, EnemyBullet
 from levels import LEVELS
+from paths import is_path, bake_level_paths
 from explosion import Explosion
+from surfaces import SurfaceCache
+from formats import AssetFormats
+from variants import VariantCache
+from scheduler import Scheduler
+import replay
+import endless
+from capture import FrameRecorder
+from telemetry import Telemetry
+from gcpolicy import GcPolicy
+from visibility import Visibility
+from latency import InputLatency
+from audio import AudioManager
+from pacing import Pacer, STRATEGIES
+import pacing
+import pipeline
+from scores import ScoreStore
+from scenes import SceneStack, StartScreen, GameOver, read_input
+# The modules that need NumPy (projectiles, particles, emitters, snapshot, netplay) are imported
+# where they are first used, after the first frame is on screen (see load_deferred)
+startup.mark("import game modules")
 
 class Background:
     def __init__(self, game):
@@ -24,9 +52,15 @@ class Background:
                 layer = pygame.image.load(layer_path).convert_alpha()
                 # Scale the layer to cover the entire screen while maintaining aspect ratio
                 scale = max(WIDTH / layer.get_width(), HEIGHT / layer.get_height())
+                # Only the middle of a wide layer is ever on screen, so crop it before
+                # scaling instead of scaling (and keeping) the whole strip
+                visible_width = min(layer.get_width(), math.ceil(WIDTH / scale))
+                layer = layer.subsurface(((layer.get_width() - visible_width) // 2, 0, visible_width, layer.get_height()))
                 new_width = int(layer.get_width() * scale)
                 new_height = int(layer.get_height() * scale)
-                layer = pygame.transform.scale(layer, (new_width, new_height))
+                # The void layer is opaque and is blitted whole every frame (see formats.py).
+                # The format is picked before scaling, on a fifth of the pixels.
+                layer = game.asset_formats.optimize(f"bg_layer{i+1}", layer, (new_width, new_height))
                 self.layers.append(layer)
             except pygame.error as e:
                 print(f"Error loading background layer {i+1}: {e}")
@@ -42,31 +76,53 @@ class Background:
             if self.positions[i] >= self.layers[i].get_height():
                 self.positions[i] = 0
 
-    def draw(self, surface):
+    def draw(self, surface, positions=None):
+        # Positions default to the current ones; a RenderFrame passes the ones it captured
+        if positions is None:
+            positions = self.positions
         # Draw each layer
         for i, layer in enumerate(self.layers):
             # Calculate the position to center the layer
             x_offset = (WIDTH - layer.get_width()) // 2
             
             # Draw the main layer
-            surface.blit(layer, (x_offset, self.positions[i]))
+            surface.blit(layer, (x_offset, positions[i]))
             # Draw the layer again above to create seamless scrolling
-            surface.blit(layer, (x_offset, self.positions[i] - layer.get_height()))
+            surface.blit(layer, (x_offset, positions[i] - layer.get_height()))
             # Draw the layer again below to ensure full coverage
-            surface.blit(layer, (x_offset, self.positions[i] + layer.get_height()))
+            surface.blit(layer, (x_offset, positions[i] + layer.get_height()))
 
 class Game:
     def __init__(self):
-        pygame.init()
-        pygame.mixer.init()  # Initialize sound
-        # Set standard windowed mode with fixed size
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
+        # Only what the start screen needs; sound is set up when the first game starts
+        pygame.display.init()
+        pygame.font.init()
+        # Resizable window; everything is drawn to self.screen at the logical resolution
+        # and scaled to the window once per frame in present()
+        self.window = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.RESIZABLE)
         pygame.display.set_caption(TITLE)
+        self.screen = pygame.Surface((WIDTH, HEIGHT)).convert()
+        self.update_viewport()
         self.clock = pygame.time.Clock()
+        self.pacer = Pacer(self.clock) # Waits for the next frame in the game loops (see pacing.py)
+        self.scenes = SceneStack(self) # The main loop and the screens it shows (see scenes.py)
         self.running = True
-        self.font_name = pygame.font.match_font(FONT_NAME)
-        self.load_data()
+        self.startup = startup
+        startup.mark("open window")
+        self.font_name = resolve_font(FONT_NAME)
+        self.fonts = {}
+        self.text_cache = {}
+        self.start_screen_cache = None
+        startup.mark("resolve font")
+        self.assets = {} # Sprite images, loaded after the first frame (see load_deferred)
+        self.surfaces = SurfaceCache(self) # Placeholders and tinted variants of the images
+        self.asset_formats = AssetFormats() # The format each image was put in (see formats.py)
+        self.variants = VariantCache() # Rotated images for sprites with a heading
+        self.deferred_loaded = False
+        self.deferred_lock = threading.Lock() # load_deferred may run on the preload thread
+        self.profile_startup = False # Print the startup profile and quit (main.py --profile-startup)
         self.background = Background(self)  # Initialize background
+        startup.mark("load background")
         self.game_state = "START_SCREEN"
         self.current_level = 1
         self.score = 0
@@ -75,26 +131,132 @@ class Game:
         self.playing = False
         self.selected_level = 1
         self.max_level = max(LEVELS.keys())
+        self.endless_level = self.max_level + 1 # Selecting it starts an endless run (see endless.py)
         self.difficulty_options = list(DIFFICULTY_LEVELS.keys())
         self.selected_difficulty_index = self.difficulty_options.index(self.difficulty)
         
-        # Load background music
-        try:
-            pygame.mixer.music.load("assets/audio.wav")
-            pygame.mixer.music.set_volume(0.5)  # Set volume to 50%
-        except:
-            print("Could not load background music")
+        # Sound is set up when the first game starts (see audio.py)
+        self.audio = AudioManager(self)
+
+        # The simulation runs on its own clock: frame counts simulated frames and time is
+        # the matching number of milliseconds. Together with the seeded rng this makes a
+        # run play out exactly the same for the same inputs, which co-op rollback relies on.
+        self.frame = 0
+        self.time = 0
+        self.rng = random.Random()
+        self.players = []
+        self.netplay = None # RollbackSession while playing co-op (see netplay.py)
+        self.realtime = True # False when frames are not shown live (co-op catch-up, offline replays)
+        self.input_log = bytearray() # Inputs of every frame of the run, for replays (see replay.py)
+        self.start_level = 1
+        self.recorder = None # FrameRecorder while recording (see capture.py)
+        self.telemetry = None # Telemetry when metrics were asked for (see telemetry.py)
+        self.gc_policy = GcPolicy()
+        self.auditor = None # LifecycleAuditor with --audit or after F9 (see audit.py)
+        self.pipelined = False # Simulate the next frame while drawing this one (see pipeline.py)
+        self.resimulating = False # Frames are being simulated again after a co-op rollback
+        self.visibility = Visibility() # Culls off-screen sprites from drawing and collisions
+        self.low_latency = False # Read input as late as possible before each flip (see latency.py)
+        self.input_latency = InputLatency()
+        self.measure_latency = False # Also measure the normal loop's input latency (main.py --input-latency)
 
         # Timers for automatic difficulty adjustments and player power increase
-        self.last_power_increase_time = pygame.time.get_ticks()
+        self.last_power_increase_time = 0
         self.power_increase_interval = 30000 # 30 seconds in milliseconds
-        self.last_obstacle_difficulty_increase_time = pygame.time.get_ticks()
+        self.last_obstacle_difficulty_increase_time = 0
         self.obstacle_difficulty_increase_interval = 20000 # 20 seconds in milliseconds
         self.time_based_difficulty_multiplier = 1.0 # Starts at 1.0, increases over time
 
+        # Checkpoints for instant retry (see snapshot.py)
+        self.last_checkpoint = None
+        self.last_checkpoint_time = 0
+        self.checkpoint_writer = None
+        self.holds = [] # (ms, kind) pauses the last frame asked for, shown as scenes (see hold)
+
+        # High scores and run history, written in the background (see scores.py)
+        self.scores = ScoreStore()
+        self.seed = 0
+        startup.mark("open score index")
+
+    def update_viewport(self):
+        """Recalculate the letterboxed area of the window the logical screen is scaled into"""
+        self.window = pygame.display.get_surface()
+        self.window_size = self.window.get_size()
+        win_w, win_h = self.window_size
+        scale = min(win_w / WIDTH, win_h / HEIGHT)
+        if SCALE_MODE == "integer" and scale >= 1:
+            scale = int(scale)
+        view_w = max(1, int(WIDTH * scale))
+        view_h = max(1, int(HEIGHT * scale))
+        self.viewport = pygame.Rect((win_w - view_w) // 2, (win_h - view_h) // 2, view_w, view_h)
+        # Scale straight into the window instead of allocating a new surface every frame
+        self.present_target = self.window.subsurface(self.viewport)
+        self.window.fill(BLACK)  # Letterbox bars
+
+    def present(self, dirty_rects=None):
+        """Scale the logical screen to the window with a single operation and flip"""
+        if pygame.display.get_surface().get_size() != self.window_size:
+            self.update_viewport()
+            dirty_rects = None
+        if self.recorder is not None:
+            self.recorder.capture(self.screen)
+        if self.telemetry is not None:
+            self.telemetry.frame()
+        if self.viewport.size == (WIDTH, HEIGHT) and dirty_rects is not None:
+            # Unscaled window: only copy and update the areas that changed
+            dirty_rects = [rect.move(self.viewport.topleft) for rect in dirty_rects]
+            for rect in dirty_rects:
+                self.window.blit(self.screen, rect, rect.move(-self.viewport.x, -self.viewport.y))
+            pygame.display.update(dirty_rects)
+            self.pacer.presented()
+            self.input_latency.flipped()
+            self.audio.flush()
+            return
+        if self.viewport.size == (WIDTH, HEIGHT):
+            self.window.blit(self.screen, self.viewport)
+        elif SCALE_MODE == "smooth":
+            pygame.transform.smoothscale(self.screen, self.viewport.size, self.present_target)
+        else:
+            pygame.transform.scale(self.screen, self.viewport.size, self.present_target)
+        pygame.display.flip()
+        self.pacer.presented()
+        self.input_latency.flipped()
+        self.audio.flush()
+
+    def set_pacing(self, strategy):
+        """Choose how the game loops wait for frames (see pacing.py)"""
+        if strategy == "vsync" and not self.pacer.vsync:
+            # pygame only does vsync with a window it scales itself
+            try:
+                pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED | pygame.RESIZABLE, vsync=1)
+                self.pacer.vsync = True
+            except pygame.error as e:
+                print(f"No vsync on this display ({e}), pacing with hybrid instead")
+                strategy = "hybrid"
+            self.update_viewport()
+        self.pacer.strategy = strategy
+
+    def window_to_logical(self, pos):
+        """Map a window (mouse) position to logical screen coordinates"""
+        x = (pos[0] - self.viewport.x) * WIDTH / self.viewport.width
+        y = (pos[1] - self.viewport.y) * HEIGHT / self.viewport.height
+        return int(x), int(y)
+
+    def load_deferred(self):
+        """Load what the start screen does not need. Preloaded once the first frame is shown."""
+        with self.deferred_lock:
+            if self.deferred_loaded:
+                return
+            import projectiles, particles, emitters, snapshot, sweep # NumPy is the slowest import of the game
+            startup.mark("import numpy modules")
+            self.load_data()
+            startup.mark("load sprite images")
+            self.gc_policy.loaded()
+            self.deferred_loaded = True
+
     def load_data(self):
         import os
-        self.assets = {}
+        assets = {} # Published in one go: this may run on the preload thread (see scenes.py)
         asset_dir = "assets"
         
         # Ensure the assets directory exists
@@ -131,16 +293,16 @@ class Game:
         # Load images with error handling
         for key, filename in asset_files.items():
             if key == "explosion_frames":
-                self.assets[key] = []
+                assets[key] = []
                 for frame_file in filename:
                     path = os.path.join(asset_dir, frame_file)
                     if not os.path.exists(path):
                         raise FileNotFoundError(f"Error: File '{path}' does not exist.")
                     img = pygame.image.load(path).convert_alpha()
                     # Scale explosion frames to match original sizes (30x30 to 100x100)
-                    size = 30 + (len(self.assets[key]) * 10)
+                    size = 30 + (len(assets[key]) * 10)
                     img = pygame.transform.scale(img, (int(size), int(size)))
-                    self.assets[key].append(img)
+                    assets[key].append(self.asset_formats.optimize(f"explosion_{len(assets[key]) + 1}", img))
             else:
                 path = os.path.join(asset_dir, filename)
                 if not os.path.exists(path):
@@ -159,7 +321,13 @@ class Game:
                     img = pygame.transform.scale(img, (int(BULLET_WIDTH * SCALE_FACTOR), int(BULLET_HEIGHT * 1.5 * SCALE_FACTOR)))
                 elif key == "powerup":
                     img = pygame.transform.scale(img, (POWERUP_WIDTH, POWERUP_HEIGHT))  # Unchanged size
-                self.assets[key] = img
+                assets[key] = self.asset_formats.optimize(key, img)
+        self.assets = assets
+        self.surfaces.clear() # Placeholders may be replaced by real images now
+        self.variants.clear()
+        for key in ROTATION_PRELOAD:
+            if key in self.assets:
+                self.variants.frames(key, assets[key])
 
     def set_difficulty(self, difficulty_level):
         if difficulty_level in DIFFICULTY_LEVELS:
@@ -170,75 +338,163 @@ class Game:
         else:
             print(f"Warning: Invalid difficulty ", difficulty_level, ". Keeping ", self.difficulty)
 
-    def new(self):
-        # Start or restart a game
+    def setup(self, seed=None, player_count=1, local_index=0):
+        """Reset the simulation for a new run. Co-op peers pass the seed they agreed on."""
+        from projectiles import ProjectileStore
+        from particles import ParticleSystem
+        self.load_deferred()
         self.score = 0
+        # Every run gets its own seed so it is recorded with the score and can be replayed
+        self.seed = random.randrange(1 << 32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.frame = 0
+        self.time = 0
+        self.last_power_increase_time = 0
+        self.last_obstacle_difficulty_increase_time = 0
+        self.time_based_difficulty_multiplier = 1.0
         self.current_level = self.selected_level
+        self.start_level = self.current_level
+        self.input_log = bytearray()
+        self.holds = []
+        self.scheduler = Scheduler(lambda: self.time) # Timers run on the simulation clock
         self.all_sprites = pygame.sprite.Group()
         self.enemies = pygame.sprite.Group()
         self.bullets = pygame.sprite.Group()
         self.enemy_bullets = pygame.sprite.Group()
         self.powerups = pygame.sprite.Group()
         self.boss_group = pygame.sprite.GroupSingle()
-        self.player = Player(self) # Player adds itself
-        self.level_data = LEVELS[self.current_level]
+        self.projectiles = ProjectileStore(self) # Boss pattern bullets
+        self.particles = ParticleSystem(self, seed=self.seed) # Explosion and engine effects
+        # Players add themselves; self.player is the one controlled on this machine
+        self.players = [Player(self, i, WIDTH * (i + 1) / (player_count + 1)) for i in range(player_count)]
+        self.player = self.players[local_index]
+        self.arm_timers()
+        self.load_level_data()
         self.current_wave = 0
         self.enemies_killed_this_level = 0
+        self.endless_spawns = None # Spawn stream of an endless run
+        self.endless_waits = 0 # Frames the stream waited for room on screen
+        if endless.is_endless(self.start_level):
+            self.start_endless()
         self.game_state = "PLAYING"
-        
-        # Start playing background music
-        pygame.mixer.music.play(-1)  # -1 means loop indefinitely
-        
-        self.run()
-
-    def run(self):
-        self.playing = True
-        while self.playing:
-            self.dt = self.clock.tick(FPS) / 1000.0
-            self.events()
-            self.update()
-            self.draw()
-
-    def update(self):
-        self.all_sprites.update()
+        self.last_checkpoint = None
+        self.last_checkpoint_time = 0
+        self.gc_policy.level_start()
+        if self.auditor is not None:
+            self.auditor.audit(self, f"start of level {self.current_level}")
+
+    def load_level_data(self):
+        if endless.is_endless(self.current_level):
+            self.level_data = endless.stage_data(self.current_level)
+        else:
+            self.level_data = LEVELS[self.current_level]
+        bake_level_paths(self.level_data)
+
+    def start_endless(self, wave=0, index=0, intensity=None, due=None):
+        """Start the endless spawn stream, or resume it at spawn index of wave (see snapshot.py)"""
+        self.endless_spawns = endless.spawn_stream(endless.wave_stream(self, wave, intensity), index)
+        self.endless_next = next(self.endless_spawns)
+        self.endless_due = self.time + self.endless_next[3] if due is None else due
+
+    def simulate(self, inputs):
+        """Advance the simulation by one frame with one INPUT_* value per player"""
+        self.update_world()
+        self.update_players(inputs)
+
+    def update_world(self):
+        """The first part of a frame, everything that does not depend on the input"""
+        self.frame += 1
+        self.time = self.frame * 1000 // FPS
+        self.visibility.update(self.all_sprites)
+        self.scheduler.run() # Shots, power-ups, respawns, difficulty increases, ...
+        self.projectiles.update()
+        self.particles.update()
         self.background.update()  # Update background animation
 
         if self.game_state == "PLAYING":
             self.manage_waves()
 
+    def update_players(self, inputs):
+        """The rest of the frame: move the players with one INPUT_* value each, then collide"""
+        # Replaces the log's tail, so frames simulated again after a restore are logged once
+        self.input_log[(self.frame - 1) * len(inputs):] = bytes(inputs)
+        for player, bits in zip(self.players, inputs):
+            player.input = bits
+            player.move()
+
+        self.visibility.flag(self.all_sprites) # After the spawns, before anything collides
         self.check_collisions()
 
-        if self.player.lives <= 0 and not self.player.hidden:
+        for player in self.players:
+            if player.lives <= 0 and not player.hidden and not player.out:
+                player.out = True
+                player.hide()
+        # In co-op the game goes on while one player still has lives
+        if all(player.out for player in self.players):
              self.game_state = "GAME_OVER"
              self.playing = False
 
-        # Check for automatic player power increase
-        now = pygame.time.get_ticks()
+        now = self.time
+        if self.game_state == "PLAYING" or self.game_state == "BOSS_FIGHT":
+            # Periodic checkpoint, only while the player is alive and in control (not in co-op)
+            if self.playing and self.netplay is None and not self.player.hidden and now - self.last_checkpoint_time >= CHECKPOINT_INTERVAL:
+                self.take_checkpoint(now)
+
+    def arm_timers(self):
+        """Register the game's own timers, after setup or a snapshot restore"""
+        self.scheduler.every(self.power_increase_interval, self.increase_power, (0, 0), start=self.last_power_increase_time)
+        self.scheduler.every(self.obstacle_difficulty_increase_interval, self.increase_obstacle_difficulty, (0, 1),
+                             start=self.last_obstacle_difficulty_increase_time)
+
+    def increase_power(self):
+        # Automatic player power increase
+        self.last_power_increase_time += self.power_increase_interval # When it was due (see Scheduler.every)
         if self.game_state == "PLAYING" or self.game_state == "BOSS_FIGHT":
-            if now - self.last_power_increase_time > self.power_increase_interval:
-                self.player.collect_powerup() # Reuse powerup logic for stat increase
-                self.last_power_increase_time = now
-                print("Player power increased automatically!")
+            for player in self.players:
+                player.collect_powerup() # Reuse powerup logic for stat increase
+            print("Player power increased automatically!")
 
-            # Check for automatic obstacle difficulty increase
-            if now - self.last_obstacle_difficulty_increase_time > self.obstacle_difficulty_increase_interval:
-                self.time_based_difficulty_multiplier += 0.1 # Increase multiplier by 0.1
-                self.last_obstacle_difficulty_increase_time = now
-                print(f"Obstacle difficulty increased! Multiplier: {self.time_based_difficulty_multiplier:.2f}")
+    def increase_obstacle_difficulty(self):
+        # Automatic obstacle difficulty increase
+        self.last_obstacle_difficulty_increase_time += self.obstacle_difficulty_increase_interval
+        if self.game_state == "PLAYING" or self.game_state == "BOSS_FIGHT":
+            self.time_based_difficulty_multiplier += 0.1 # Increase multiplier by 0.1
+            if self.endless_spawns is not None:
+                # Endless runs go on for hours, enemies must not get ever faster
+                self.time_based_difficulty_multiplier = min(self.time_based_difficulty_multiplier, ENDLESS_MAX_DIFFICULTY_MULT)
+            print(f"Obstacle difficulty increased! Multiplier: {self.time_based_difficulty_multiplier:.2f}")
+
+    def take_checkpoint(self, now):
+        import snapshot
+        self.last_checkpoint_time = now
+        self.last_checkpoint = snapshot.capture(self)
+        if self.checkpoint_writer is None:
+            self.checkpoint_writer = snapshot.CheckpointWriter(os.path.join(SAVE_DIR, "checkpoint.bin"))
+        self.checkpoint_writer.submit(self.last_checkpoint)
+
+    def retry_from_checkpoint(self):
+        """Restore the last checkpoint, to resume playing from it (see scenes.Playing)"""
+        import snapshot
+        snapshot.restore(self, self.last_checkpoint)
+        self.last_checkpoint_time = self.time
 
     def manage_waves(self):
         # If we're in a boss fight, don't manage waves
         if self.game_state == "BOSS_FIGHT":
             return
 
+        if self.endless_spawns is not None:
+            self.manage_endless()
+            return
+
         # If we have no enemies and haven't completed all waves
         if len(self.enemies) == 0:
             if self.current_wave < len(self.level_data["waves"]):
                 # Spawn next wave
                 wave = self.level_data["waves"][self.current_wave]
                 print(f"Spawning wave {self.current_wave + 1} with {wave['count']} {wave['type']} enemies")
-                for _ in range(wave["count"]):
-                    self.spawn_enemy(wave["type"], wave["pattern"])
+                for i in range(wave["count"]):
+                    self.spawn_enemy(wave["type"], wave["pattern"], i * wave["spawn_delay"])
                 self.current_wave += 1
             # If all waves are complete and we've killed enough enemies, start boss fight
             elif self.enemies_killed_this_level >= self.level_data["enemy_count_for_boss"]:
@@ -251,21 +507,60 @@ class Game:
                 for _ in range(3):
                     self.spawn_enemy("basic", "top_random")
 
+    def manage_endless(self):
+        # Spawn whatever the endless stream has due, unless the screen is full. Then the
+        # stream waits, and everything after it moves back (see endless.py).
+        while self.time >= self.endless_due:
+            number, intensity, index, delay, wave = self.endless_next
+            if "boss" in wave:
+                if len(self.enemies) > 0 and self.time < self.endless_due + ENDLESS_BOSS_WAIT:
+                    return # The boss comes once the last wave is cleared, or when waiting is over
+                self.current_wave = number + 1
+                self.advance_endless()
+                self.start_boss_fight()
+                return
+            if len(self.enemies) >= ENDLESS_MAX_ENEMIES or len(self.enemy_bullets) >= ENDLESS_BULLET_PRESSURE:
+                self.endless_waits += 1
+                return
+            if index == 0:
+                print(f"Spawning endless wave {number + 1} with {wave['count']} {wave['type']} enemies")
+            self.current_wave = number + 1
+            self.spawn_enemy(wave["type"], wave["pattern"])
+            self.advance_endless()
+
+    def advance_endless(self):
+        self.endless_next = next(self.endless_spawns)
+        self.endless_due = self.time + self.endless_next[3]
+
     def check_collisions(self):
-        # Player Bullets hitting enemies
-        hits_bullet_enemy = pygame.sprite.groupcollide(self.enemies, self.bullets, True, True)
+        import sweep # Already loaded by load_deferred
+        # Only sprites on screen can collide (see visibility.py)
+        visible = self.visibility.visible
+        collide = self.visibility.collide
+        # Player Bullets hitting enemies, tested along the path each flew this frame (see sweep.py)
+        enemies = visible(self.enemies)
+        bullets = visible(self.bullets)
+        hit = set()
+        for bullet, index in zip(bullets, sweep.sprite_hits(bullets, enemies)):
+            if index >= 0:
+                bullet.kill()
+                hit.add(index)
+        hits_bullet_enemy = [enemy for index, enemy in enumerate(enemies) if index in hit]
         for enemy_hit in hits_bullet_enemy:
+            enemy_hit.kill()
             self.score += 10
             self.enemies_killed_this_level += 1
+            self.particles.burst(enemy_hit.rect.center, ENEMY_BURST_PARTICLES, 4, 40, PARTICLE_FIRE_COLORS)
+            self.audio.play("explosion")
             # Apply difficulty multiplier to powerup drop chance
-            if random.random() < (POWERUP_DROP_CHANCE * self.difficulty_multipliers["powerup_drop_mult"]):
+            if self.rng.random() < (POWERUP_DROP_CHANCE * self.difficulty_multipliers["powerup_drop_mult"]):
                 PowerUp(self, enemy_hit.rect.center)
 
         # Player Bullets hitting boss
         if self.game_state == "BOSS_FIGHT":
             boss = self.boss_group.sprite
-            if boss is not None:  # Check if boss exists
-                hits_bullet_boss = pygame.sprite.spritecollide(boss, self.bullets, True)
+            if boss is not None and boss.visible:  # Check if boss exists
+                hits_bullet_boss = sweep.spritecollide(boss, visible(self.bullets))
                 for hit in hits_bullet_boss:
                     boss_defeated = boss.take_damage(1)
                     self.score += 5
@@ -274,46 +569,47 @@ class Game:
                         self.handle_boss_defeat()
                         return  # Exit early to prevent any further processing
 
-        # Player hitting enemies or boss
-        if not self.player.hidden:
-            hits_player_enemy = pygame.sprite.spritecollide(self.player, self.enemies, True)
-            if self.game_state == "BOSS_FIGHT" and self.boss_group.sprite is not None:
-                hits_player_boss = pygame.sprite.spritecollide(self.player, self.boss_group, False)
-                if hits_player_boss:
-                    self.player_death()
-            if hits_player_enemy:
-                self.player_death()
-
-            # Player hitting enemy bullets
-            hits_player_enemybullet = pygame.sprite.spritecollide(self.player, self.enemy_bullets, True)
-            if hits_player_enemybullet:
-                self.player_death()
-
-        # Player collecting power-ups
-        if not self.player.hidden:
-            hits_player_powerup = pygame.sprite.spritecollide(self.player, self.powerups, True)
-            for hit in hits_player_powerup:
-                self.player.collect_powerup()
+        for player in self.players:
+            # Player hitting enemies or boss
+            if not player.hidden:
+                hits_player_enemy = collide(player, self.enemies, True)
+                if self.game_state == "BOSS_FIGHT" and self.boss_group.sprite is not None:
+                    hits_player_boss = collide(player, self.boss_group, False)
+                    if hits_player_boss:
+                        self.player_death(player)
+                if hits_player_enemy:
+                    self.player_death(player)
+
+                # Player hitting enemy bullets
+                hits_player_enemybullet = sweep.spritecollide(player, visible(self.enemy_bullets))
+                if hits_player_enemybullet or self.projectiles.collide_rect(player.rect):
+                    self.player_death(player)
+
+            # Player collecting power-ups
+            if not player.hidden:
+                hits_player_powerup = collide(player, self.powerups, True)
+                for hit in hits_player_powerup:
+                    player.collect_powerup()
+                    self.audio.play("powerup")
 
     def handle_boss_defeat(self):
         """Handle the boss defeat sequence and level transition"""
         print(f"Boss defeated in level {self.current_level}")
         # Create explosion at boss position if boss still exists
         if self.boss_group.sprite is not None:
-            explosion = Explosion(self, self.boss_group.sprite.rect.center)
-            self.all_sprites.add(explosion)
+            Explosion(self, self.boss_group.sprite.rect.center, scale=2)
+            self.particles.burst(self.boss_group.sprite.rect.center, BOSS_BURST_PARTICLES, 9, 90, PARTICLE_FIRE_COLORS, size=2)
+            self.audio.play("boss_explosion")
         
         # Clear all projectiles and enemies
-        self.bullets.empty()
-        self.enemy_bullets.empty()
-        self.enemies.empty()
-        self.powerups.empty()
+        self.kill_all(self.bullets, self.enemy_bullets, self.enemies, self.powerups)
+        self.projectiles.clear()
         
         # Add a delay to show the explosion
-        pygame.time.delay(1000)
+        self.hold(1000)
         
         # Clear the boss group
-        self.boss_group.empty()
+        self.kill_all(self.boss_group)
         
         # Transition to next level
         self.level_complete()
@@ -323,47 +619,50 @@ class Game:
         print(f"Level {self.current_level} Complete!")
         self.current_level += 1
         
-        # Clear all sprites except player
-        for sprite in self.all_sprites:
-            if sprite != self.player:
+        # Clear all sprites except the players, which also empties the typed groups
+        for sprite in self.all_sprites.sprites():
+            if sprite not in self.players:
                 sprite.kill()
-        
-        # Ensure all sprite groups are empty
-        self.enemies.empty()
-        self.bullets.empty()
-        self.enemy_bullets.empty()
-        self.powerups.empty()
-        self.boss_group.empty()
-
-        if self.current_level > len(LEVELS):
+        self.projectiles.clear()
+        self.scheduler.prune() # The killed sprites' timers
+
+        if self.current_level > len(LEVELS) and self.endless_spawns is None:
             print("Congratulations! You beat the game!")
             self.game_state = "GAME_OVER"
             self.playing = False
         else:
             print(f"Starting level {self.current_level}")
             # Reset level state
-            self.level_data = LEVELS[self.current_level]
+            self.load_level_data()
             self.current_wave = 0
             self.enemies_killed_this_level = 0
             self.game_state = "PLAYING"
             
             # Reset player state
-            self.player.rect.centerx = WIDTH / 2
-            self.player.rect.bottom = HEIGHT - 10
-            self.player.hidden = False
+            for player in self.players:
+                player.respawn()
+            if self.auditor is not None:
+                self.auditor.audit(self, f"start of level {self.current_level}")
             
-            # Add a small delay before starting next level
-            pygame.time.delay(500)
+            # Add a small delay before starting next level. The garbage collection of the
+            # level start happens during it, not in the middle of this frame.
+            if self.realtime:
+                self.hold(500, "level_transition")
+            else:
+                self.gc_policy.level_start()
+
+    def kill_all(self, *groups):
+        """Kill every sprite in groups, so they leave all_sprites and cancel their timers too"""
+        for group in groups:
+            for sprite in group.sprites():
+                sprite.kill()
 
     def start_boss_fight(self):
         """Start a boss fight with proper state management"""
         if self.game_state != "BOSS_FIGHT":  # Prevent multiple boss spawns
             # Clear any remaining enemies and projectiles
-            self.enemies.empty()
-            self.bullets.empty()
-            self.enemy_bullets.empty()
-            self.powerups.empty()
-            self.boss_group.empty()
+            self.kill_all(self.enemies, self.bullets, self.enemy_bullets, self.powerups, self.boss_group)
+            self.projectiles.clear()
             
             # Start the boss fight
             boss_type = self.level_data.get("boss_type", "level1_boss")
@@ -372,49 +671,75 @@ class Game:
             Boss(self, self.current_level, boss_type)
             
             # Add a small delay before boss appears
-            pygame.time.delay(500)
+            self.hold(500, "boss_intro")
+
+    def level_name(self, level):
+        return "Endless" if endless.is_endless(level) else str(level)
+
+    def target_player(self):
+        """The player enemies aim at: the first one still flying"""
+        for player in self.players:
+            if not player.hidden:
+                return player
+        return self.players[0]
+
+    def hold(self, ms, kind=None):
+        # Short pause between phases, shown by a scene once the frame is done (see
+        # scenes.Playing.follow_up). Skipped in co-op, where both games have to keep
+        # stepping in lockstep (and a rollback must not pause while re-simulating), and
+        # when rendering a replay.
+        if self.realtime:
+            self.holds.append((ms, kind))
 
     def events(self):
         for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                if self.playing:
-                    self.playing = False
-                self.running = False
-            if event.type == pygame.KEYDOWN:
-                if self.game_state == "START_SCREEN":
-                    if event.key == pygame.K_ESCAPE:
-                        self.running = False
-                        self.playing = False
-                    elif event.key in [pygame.K_LEFT, pygame.K_a]:
-                        self.selected_level = max(1, self.selected_level - 1)
-                    elif event.key in [pygame.K_RIGHT, pygame.K_d]:
-                        self.selected_level = min(self.max_level, self.selected_level + 1)
-                    elif event.key == pygame.K_RETURN:
-                        self.playing = False
-                    elif event.key == pygame.K_UP:
-                        self.selected_difficulty_index = (self.selected_difficulty_index - 1) % len(self.difficulty_options)
-                        self.set_difficulty(self.difficulty_options[self.selected_difficulty_index])
-                    elif event.key == pygame.K_DOWN:
-                        self.selected_difficulty_index = (self.selected_difficulty_index + 1) % len(self.difficulty_options)
-                        self.set_difficulty(self.difficulty_options[self.selected_difficulty_index])
-                elif self.game_state == "GAME_OVER":
-                    if event.key == pygame.K_ESCAPE:
-                        self.running = False
-                        self.playing = False
-                    else:
-                        self.playing = False
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:  # Left click
-                    mouse_pos = pygame.mouse.get_pos()
-                    if HEIGHT / 2 + 100 <= mouse_pos[1] <= HEIGHT / 2 + 140:
-                        if WIDTH / 2 - 100 <= mouse_pos[0] <= WIDTH / 2 + 100:
-                            self.playing = False
+            self.handle_event(event)
+
+    def handle_event(self, event):
+        # The keys of the menus and the pause are handled by their scenes (see scenes.py)
+        if event.type == pygame.QUIT:
+            if self.playing:
+                self.playing = False
+            self.running = False
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_F9 and self.game_state in ("PLAYING", "BOSS_FIGHT"):
+                self.audit("F9")
+
+    def audit(self, reason):
+        from audit import LifecycleAuditor
+        if self.auditor is None:
+            self.auditor = LifecycleAuditor()
+        return self.auditor.audit(self, reason)
+
     def draw(self):
+        self.render(self.render_state())
+
+    def render_state(self):
+        """Everything render() needs, copied out of the simulation (see pipeline.py)"""
+        boss_health = None
+        if self.game_state == "BOSS_FIGHT" and self.boss_group.sprite:
+            boss = self.boss_group.sprite
+            boss_health = max(0, boss.health / boss.max_health)
+        # Sprite images are never drawn on once created, so they are shared, not copied.
+        # Sprites with a heading are drawn with the nearest rotated variant (see variants.py).
+        variants = self.variants
+        blits = [(sprite.image, sprite.rect.topleft) if sprite.heading is None else variants.blit(sprite)
+                 for sprite in self.all_sprites if sprite.visible]
+        blits += self.projectiles.blit_list()
+        return pipeline.RenderFrame(tuple(self.background.positions), tuple(blits), self.particles.points(), self.audio.take(),
+                                    self.score, self.current_level,
+                                    tuple(player.lives for player in self.players),
+                                    tuple(player.power_level for player in self.players),
+                                    self.difficulty, boss_health)
+
+    def render(self, frame):
+        import particles # Already loaded by load_deferred
         # Draw animated background
-        self.background.draw(self.screen)
+        self.background.draw(self.screen, frame.background)
         
-        # Draw all game sprites
-        self.all_sprites.draw(self.screen)
+        # Draw all game sprites, then the boss projectiles and the particles on top
+        self.screen.blits(frame.blits, doreturn=False)
+        particles.draw(self.screen, frame.particles)
         
         # Draw UI background rectangles
         pygame.draw.rect(self.screen, (0,0,0,180), (WIDTH/2-90, 5, 180, 36), border_radius=8)
@@ -422,300 +747,255 @@ class Game:
         pygame.draw.rect(self.screen, (0,0,0,180), (WIDTH-140, 5, 130, 60), border_radius=8)
         
         # Score (center top, big)
-        self.draw_text(f"Score: {self.score}", 28, YELLOW, WIDTH / 2, 10)
+        self.draw_text(f"Score: {frame.score}", 28, YELLOW, WIDTH / 2, 10)
         # Level (top right)
-        self.draw_text(f"Level: {self.current_level}", 22, WHITE, WIDTH - 75, 10)
-        # Lives (top left)
-        self.draw_text(f"Lives: {self.player.lives}", 22, GREEN, 70, 10)
+        self.draw_text(f"Level: {frame.level}" if frame.level <= self.max_level else f"Endless: {frame.level - self.max_level}",
+                       22, WHITE, WIDTH - 75, 10)
+        # Lives (top left), one value per player in co-op
+        self.draw_text("Lives: " + " / ".join(str(lives) for lives in frame.lives), 22, GREEN, 70, 10)
         # Power (top left, below lives)
-        self.draw_text(f"Power: {self.player.power_level}", 18, BLUE, 70, 35)
+        self.draw_text("Power: " + " / ".join(str(power) for power in frame.power), 18, BLUE, 70, 35)
         # Difficulty (top right, below level)
-        self.draw_text(f"Difficulty: {self.difficulty}", 18, RED if self.difficulty=="Hard" else (YELLOW if self.difficulty=="Medium" else GREEN), WIDTH - 75, 35)
+        self.draw_text(f"Difficulty: {frame.difficulty}", 18, RED if frame.difficulty=="Hard" else (YELLOW if frame.difficulty=="Medium" else GREEN), WIDTH - 75, 35)
         
         # Boss health bar
-        if self.game_state == "BOSS_FIGHT" and self.boss_group.sprite:
-            boss = self.boss_group.sprite
+        if frame.boss_health is not None:
             BAR_LENGTH = 200
             BAR_HEIGHT = 18
-            fill_pct = max(0, boss.health / boss.max_health)
+            fill_pct = frame.boss_health
             fill = fill_pct * BAR_LENGTH
             outline_rect = pygame.Rect(WIDTH / 2 - BAR_LENGTH / 2, 60, BAR_LENGTH, BAR_HEIGHT)
             fill_rect = pygame.Rect(WIDTH / 2 - BAR_LENGTH / 2, 60, fill, BAR_HEIGHT)
             pygame.draw.rect(self.screen, RED, fill_rect)
             pygame.draw.rect(self.screen, WHITE, outline_rect, 2)
         
-        pygame.display.flip()
-
-    def show_start_screen(self):
-        self.game_state = "START_SCREEN"
-        selecting_level = True
-
-        # Card dimensions and position
-        card_width = 600
-        card_height = 500
-        card_x = (WIDTH - card_width) // 2
-        card_y = (HEIGHT - card_height) // 2 + 50 # Shift slightly down from center
-        card_rect = pygame.Rect(card_x, card_y, card_width, card_height)
-        card_color = (20, 20, 40) # Darker blue/purple for the card
-        border_color = (80, 80, 100)
-        border_radius = 20
-
-        # Difficulty button positions (adjusting for the card)
-        button_y = card_y + card_height * 0.6
-        button_spacing = 10
-        button_width = 100
-        button_height = 40
-        easy_button_x = card_x + card_width / 2 - button_width * 1.5 - button_spacing
-        medium_button_x = card_x + card_width / 2 - button_width / 2
-        hard_button_x = card_x + card_width / 2 + button_width * 0.5 + button_spacing
-
-        # Level selection position
-        level_select_y = button_y + button_height + 40
-
-        while selecting_level and self.running:
-            # Draw animated background
-            self.background.draw(self.screen)
-            
-            # Draw the card background with rounded corners and border
-            pygame.draw.rect(self.screen, border_color, card_rect, border_radius=border_radius)
-            pygame.draw.rect(self.screen, card_color, card_rect.inflate(-4, -4), border_radius=border_radius - 2)
-
-            # Draw title outside the card
-            # Pulsating Title Animation
-            now = pygame.time.get_ticks()
-            pulse_scale = 1.0 + math.sin(now * 0.002) * 0.05 # Pulsates between 1.0 and 1.05
-            title_size = int(64 * pulse_scale)
-            # Ensure title size doesn't go below a minimum to avoid visual glitches if pulse_scale becomes small
-            title_size = max(title_size, 56) # Minimum font size
-            # Recalculate text surface for animated size
-            font = pygame.font.Font(self.font_name, title_size)
-            text_surface = font.render("COSMIC CLASH", True, (100, 150, 255))
-            text_rect = text_surface.get_rect(center=(WIDTH / 2, HEIGHT / 10))
-            self.screen.blit(text_surface, text_rect)
-
-            # Draw text inside the card
-            self.draw_text("Welcome to Cosmic Clash", 36, (150, 180, 255), WIDTH / 2, card_y + 40) # Lighter blue/purple
-            self.draw_text("A space shooter with power-ups, levels, and boss fights!", 22, WHITE, WIDTH / 2, card_y + 90)
-
-            # Controls section
-            controls_box_y = card_y + 140
-            controls_box_height = 60
-            pygame.draw.rect(self.screen, (30, 30, 50), (card_x + 20, controls_box_y, card_width - 40, controls_box_height), border_radius=10)
-            self.draw_text("Controls", 20, WHITE, WIDTH / 2, controls_box_y + 10)
-            self.draw_text("WASD or Arrow keys to move, SPACE to shoot", 24, WHITE, WIDTH / 2, controls_box_y + 35)
-
-            # Difficulty selection text
-            self.draw_text("Select Difficulty", 24, WHITE, WIDTH / 2, button_y - 30)
-
-            # Draw difficulty buttons
-            easy_button_rect = pygame.Rect(easy_button_x, button_y, button_width, button_height)
-            medium_button_rect = pygame.Rect(medium_button_x, button_y, button_width, button_height)
-            hard_button_rect = pygame.Rect(hard_button_x, button_y, button_width, button_height)
-
-            # Highlight the selected difficulty
-            easy_color = GREEN if self.difficulty == "Easy" else (34, 139, 34) # Darker green when not selected
-            medium_color = YELLOW if self.difficulty == "Medium" else (218, 165, 32) # Darker yellow/orange
-            hard_color = RED if self.difficulty == "Hard" else (139, 0, 0) # Darker red
-
-            # Hover and Selection Animation for Difficulty Buttons
-            mouse_pos = pygame.mouse.get_pos()
-            hover_scale_factor = 1.1 # Scale up by 10% on hover/select
-
-            easy_draw_rect = easy_button_rect.copy()
-            medium_draw_rect = medium_button_rect.copy()
-            hard_draw_rect = hard_button_rect.copy()
-
-            # Check for hover or selection
-            if easy_button_rect.collidepoint(mouse_pos) or self.difficulty == "Easy":
-                easy_draw_rect.width *= hover_scale_factor
-                easy_draw_rect.height *= hover_scale_factor
-                easy_draw_rect.center = easy_button_rect.center
-                easy_color = GREEN # Keep bright color on hover/select
-            if medium_button_rect.collidepoint(mouse_pos) or self.difficulty == "Medium":
-                medium_draw_rect.width *= hover_scale_factor
-                medium_draw_rect.height *= hover_scale_factor
-                medium_draw_rect.center = medium_button_rect.center
-                medium_color = YELLOW # Keep bright color on hover/select
-            if hard_button_rect.collidepoint(mouse_pos) or self.difficulty == "Hard":
-                hard_draw_rect.width *= hover_scale_factor
-                hard_draw_rect.height *= hover_scale_factor
-                hard_draw_rect.center = hard_button_rect.center
-                hard_color = RED # Keep bright color on hover/select
-
-            pygame.draw.rect(self.screen, easy_color, easy_draw_rect, border_radius=8)
-            pygame.draw.rect(self.screen, medium_color, medium_draw_rect, border_radius=8)
-            pygame.draw.rect(self.screen, hard_color, hard_draw_rect, border_radius=8)
-
-            # Adjust text position slightly for scaled buttons
-            self.draw_text("Easy", 20, BLACK, easy_draw_rect.centerx, easy_draw_rect.centery - 10)
-            self.draw_text("Medium", 20, BLACK, medium_draw_rect.centerx, medium_draw_rect.centery - 10)
-            self.draw_text("Hard", 20, BLACK, hard_draw_rect.centerx, hard_draw_rect.centery - 10)
-
-            # Level selection text and display
-            level_text = f"Select Level: {self.selected_level}"
-            level_text_size = 28
-            level_text_color = WHITE
-
-            level_rect_approx = pygame.Rect(WIDTH / 2 - 150, level_select_y - 10, 300, 60) # Approximate clickable area
-
-            # Pulsate the level text slightly
-            pulse_scale_level = 1.0 + math.sin(now * 0.003) * 0.03 # Slower pulsation
-            animated_level_size = int(level_text_size * pulse_scale_level)
-            animated_level_size = max(animated_level_size, 24) # Minimum font size
-
-            # Change color on hover
-            if level_rect_approx.collidepoint(mouse_pos):
-                 level_text_color = YELLOW # Highlight color on hover
-
-            font_level = pygame.font.Font(self.font_name, animated_level_size)
-            text_surface_level = font_level.render(level_text, True, level_text_color)
-            text_rect_level = text_surface_level.get_rect(center=(WIDTH / 2, level_select_y))
-            self.screen.blit(text_surface_level, text_rect_level)
-
-            self.draw_text("Use LEFT/RIGHT or A/D to change level", 18, WHITE, WIDTH / 2, level_select_y + 30)
-            self.draw_text("Click on the level number to start", 20, WHITE, WIDTH / 2, level_select_y + 70)
-
-            self.draw_text("Press ESC to Quit", 18, WHITE, WIDTH / 2, HEIGHT - 30)
-
-            pygame.display.flip()
-            
-            # Update background animation
-            self.background.update()
-            
-            # Handle events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                    selecting_level = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        self.running = False
-                        selecting_level = False
-                    # Arrow key navigation for difficulty
-                    elif event.key == pygame.K_UP:
-                        self.selected_difficulty_index = (self.selected_difficulty_index - 1) % len(self.difficulty_options)
-                        self.set_difficulty(self.difficulty_options[self.selected_difficulty_index])
-                    elif event.key == pygame.K_DOWN:
-                        self.selected_difficulty_index = (self.selected_difficulty_index + 1) % len(self.difficulty_options)
-                        self.set_difficulty(self.difficulty_options[self.selected_difficulty_index])
-                    # Level selection handled by LEFT/RIGHT or A/D
-                    elif event.key in [pygame.K_LEFT, pygame.K_a]:
-                        self.selected_level = max(1, self.selected_level - 1)
-                    elif event.key in [pygame.K_RIGHT, pygame.K_d]:
-                        self.selected_level = min(self.max_level, self.selected_level + 1)
-                    # Select difficulty/start game with ENTER
-                    elif event.key == pygame.K_RETURN:
-                        selecting_level = False
-                        self.playing = False
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:  # Left click
-                        mouse_pos = event.pos
-                        # Check if click is on a difficulty button
-                        if easy_draw_rect.collidepoint(mouse_pos):
-                            self.set_difficulty("Easy")
-                            selecting_level = False
-                            self.playing = False
-                        elif medium_draw_rect.collidepoint(mouse_pos):
-                            self.set_difficulty("Medium")
-                            selecting_level = False
-                            self.playing = False
-                        elif hard_draw_rect.collidepoint(mouse_pos):
-                            self.set_difficulty("Hard")
-                            selecting_level = False
-                            self.playing = False
-                        # Check if click is on level selection area
-                        elif level_select_y - 10 <= mouse_pos[1] <= level_select_y + 50:
-                             if WIDTH / 2 - 150 <= mouse_pos[0] <= WIDTH / 2 + 150:
-                                 selecting_level = False
-                                 self.playing = False
-            
-            self.clock.tick(FPS / 2)  # Slow down the loop to avoid high CPU usage
-
-    def show_game_over_screen(self):
-        if not self.running:
-            return
-        self.game_state = "GAME_OVER"
-        # Stop background music
-        pygame.mixer.music.stop()
-        self.screen.fill(BLACK)
-        self.draw_text("GAME OVER", 48, WHITE, WIDTH / 2, HEIGHT / 4)
-        self.draw_text(f"Final Score: {self.score}", 22, WHITE, WIDTH / 2, HEIGHT / 2)
-        self.draw_text("Press any key to play again (ESC to Quit)", 22, WHITE, WIDTH / 2, HEIGHT * 3 / 4)
-        pygame.display.flip()
-        self.wait_for_key_or_quit()
-
-    def wait_for_key_or_quit(self):
-        # This loop now primarily handles waiting in start/game over screens
-        # Key handling for these states is done in self.events()
-        waiting = True
-        while waiting and self.running:
-            self.clock.tick(FPS / 2)
-            # Process events to check for key presses or quit
-            self.events()
-            # If playing is set to False by event handler, exit wait loop
-            if not self.playing:
-                 waiting = False
-
-    def draw_text(self, text, size, color, x, y):
-        font = pygame.font.Font(self.font_name, size)
+        self.audio.schedule(frame.sounds) # Played as the frame is shown
+        self.present()
+
+    def get_font(self, size):
+        # Font objects are cached; creating one loads and parses the font file
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(self.font_name, size)
+        return font
+
+    def get_text(self, font, text, color):
+        # Cache of rendered menu text, keyed by font, text and color
+        key = (font, text, color)
+        text_surface = self.text_cache.get(key)
+        if text_surface is None:
+            text_surface = self.text_cache[key] = font.render(text, True, color)
+        return text_surface
+
+    def draw_text(self, text, size, color, x, y, surface=None):
+        font = self.get_font(size)
         text_surface = font.render(text, True, color)
         text_rect = text_surface.get_rect()
         text_rect.midtop = (x, y)
-        self.screen.blit(text_surface, text_rect)
-
-    def spawn_enemy(self, enemy_type, pattern):
+        if surface is None:
+            surface = self.screen
+        surface.blit(text_surface, text_rect)
+
+    def spawn_enemy(self, enemy_type, pattern, delay=0):
+        if is_path(pattern):
+            # Enemies on the same path follow each other, delay (ms) apart
+            Enemy(self, 0, 0, enemy_type, path=pattern, path_delay=delay * FPS // 1000)
+            return
         if pattern == "top_random":
-            x = random.randrange(ENEMY_WIDTH, WIDTH - ENEMY_WIDTH)
-            y = random.randrange(-150, -100)
+            x = self.rng.randrange(ENEMY_WIDTH, WIDTH - ENEMY_WIDTH)
+            y = self.rng.randrange(-150, -100)
         elif pattern == "top_sides":
-             x = random.choice([random.randrange(ENEMY_WIDTH, WIDTH // 4), random.randrange(WIDTH * 3 // 4, WIDTH - ENEMY_WIDTH)])
-             y = random.randrange(-150, -100)
+             x = self.rng.choice([self.rng.randrange(ENEMY_WIDTH, WIDTH // 4), self.rng.randrange(WIDTH * 3 // 4, WIDTH - ENEMY_WIDTH)])
+             y = self.rng.randrange(-150, -100)
         elif pattern == "top_center_spread":
-             x = WIDTH / 2 + random.randrange(-50, 50)
-             y = random.randrange(-100, -80)
+             x = WIDTH / 2 + self.rng.randrange(-50, 50)
+             y = self.rng.randrange(-100, -80)
         else:
-            x = random.randrange(ENEMY_WIDTH, WIDTH - ENEMY_WIDTH)
-            y = random.randrange(-150, -100)
+            x = self.rng.randrange(ENEMY_WIDTH, WIDTH - ENEMY_WIDTH)
+            y = self.rng.randrange(-150, -100)
         Enemy(self, x, y, enemy_type)
 
-    def player_death(self):
-        if self.player.lives > 0:
-            self.player.lives -= 1
+    def player_death(self, player):
+        self.audio.play("player_death")
+        if player.lives > 0:
+            player.lives -= 1
             # Create an explosion at the player's position
-            explosion = Explosion(self, self.player.rect.center) # Pass game instance and position
-            self.all_sprites.add(explosion)
+            Explosion(self, player.rect.center) # Pass game instance and position
             # Hide the player and reset position, will respawn after a delay (handled in Player class update)
-            self.player.hide()
-            self.player.power_level = 0
-            self.player.powerup_timers = []
-            print(f"Player died! Lives remaining: {self.player.lives}")
+            player.hide()
+            player.clear_powerups()
+            print(f"Player {player.index + 1} died! Lives remaining: {player.lives}")
             for bullet in self.enemy_bullets:
                 bullet.kill()
+            self.projectiles.clear()
         else:
-            # If no lives left, transition to game over state after a brief delay for explosion
-            explosion = Explosion(self, self.player.rect.center)
-            self.all_sprites.add(explosion)
-            # Small delay to show explosion before game over screen
-            pygame.time.delay(500) # Adjust delay as needed
-            self.player.hide()
-            self.game_state = "GAME_OVER"
-            self.playing = False
+            # No lives left, the player is out. Show the explosion briefly before a game over.
+            Explosion(self, player.rect.center)
+            self.hold(500) # Adjust delay as needed
+            player.hide()
+            player.out = True
+            if all(p.out for p in self.players):
+                self.game_state = "GAME_OVER"
+                self.playing = False
+
+    def play_coop(self, local_index, port, peer, latency=0, loss=0.0, frames=0, scripted=False):
+        """Play a co-op game against another instance over UDP (see netplay.py)"""
+        import netplay
+        link = netplay.UdpLink(port, peer, latency, loss)
+        session = netplay.RollbackSession(self, link, local_index)
+        print(f"Player {local_index + 1} waiting for {peer[0]}:{peer[1]} on port {port}...")
+        agreed = session.handshake(self.selected_level, self.difficulty)
+        if agreed is None:
+            print("The other player did not answer")
+            link.close()
+            return
+        seed, level, difficulty = agreed
+        self.set_difficulty(difficulty)
+        self.selected_level = level
+        self.setup(seed, player_count=2, local_index=local_index)
+        self.netplay = session
+        self.realtime = False
+        if not scripted:
+            self.audio.play_music()
+        self.run_netplay(session, frames, scripted)
+        session.close()
+        self.netplay = None
+        self.realtime = True
+        print(session.report())
+        if not scripted and self.running and self.game_state == "GAME_OVER":
+            self.scenes.run(GameOver(self, restart=False))
+
+    def run_replay(self, path, paced=True):
+        """Play back a recorded run. Unpaced, it runs as fast as drawing (and recording) allows."""
+        recorded = replay.load(path)
+        self.set_difficulty(recorded.difficulty)
+        self.selected_level = recorded.level
+        self.setup(recorded.seed, recorded.players)
+        self.realtime = False
+        self.playing = True
+        self.pacer.start()
+        for inputs in replay.frames(recorded):
+            if not self.running:
+                break
+            if paced:
+                self.pacer.tick(FPS)
+            self.events()
+            self.simulate(inputs)
+            self.draw()
+        self.realtime = True
+        print(f"Replayed {self.frame} frames of {path}: score {self.score}, level {self.current_level}")
 
-# --- Main Execution ---
-g = Game()
-while g.running:
-    g.show_start_screen()
-    if not g.running: break
-    # Reset player state for new game after game over
-    if g.game_state == "GAME_OVER":
-        g.player.lives = PLAYER_LIVES
-        g.player.power_level = 0
-        g.player.powerup_timers = []
-        g.player.hidden = False
-    g.new() # Starts a new game loop
-    if not g.running: break
-    g.show_game_over_screen()
-
-pygame.quit()
-sys.exit()
+    def run_netplay(self, session, frames=0, scripted=False):
+        # Same pacing as scenes.Playing, but frames are advanced by the rollback session, which
+        # may re-simulate earlier frames or hold back while the other player catches up
+        import netplay
+        self.playing = True
+        self.pacer.start()
+        while self.running and not session.finished:
+            self.dt = self.pacer.tick(FPS) / 1000.0
+            self.events()
+            bits = netplay.scripted_input(self.frame, session.local) if scripted else read_input()
+            session.advance(bits)
+            if frames and self.frame >= frames:
+                break
+            self.draw()
 
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=TITLE)
+    parser.add_argument("--coop", action="store_true", help="two-player co-op with another instance over UDP")
+    parser.add_argument("--player", type=int, choices=(1, 2), default=1, help="which player this instance is in co-op")
+    parser.add_argument("--port", type=int, help="local UDP port (default: NET_PORT for player 1, NET_PORT + 1 for player 2)")
+    parser.add_argument("--peer", help="host:port of the other player (default: the other port on localhost)")
+    parser.add_argument("--latency", type=int, default=0, help="artificial one-way latency in ms, for testing")
+    parser.add_argument("--loss", type=float, default=0.0, help="artificial packet loss between 0 and 1, for testing")
+    parser.add_argument("--level", type=int, default=1, help="starting level in co-op (player 1 decides)")
+    parser.add_argument("--endless", action="store_true", help="start in endless mode (levels made up as the game goes on)")
+    parser.add_argument("--difficulty", choices=list(DIFFICULTY_LEVELS), default="Medium", help="difficulty in co-op (player 1 decides)")
+    parser.add_argument("--headless", action="store_true", help="no window or sound, scripted input (for testing co-op)")
+    parser.add_argument("--frames", type=int, default=0, help="stop co-op after this many frames")
+    parser.add_argument("--record", metavar="PATH", help="record the presented frames (a directory for png, a file for raw)")
+    parser.add_argument("--record-format", choices=("png", "raw"), default=CAPTURE_FORMAT)
+    loop = parser.add_mutually_exclusive_group()
+    loop.add_argument("--pipeline", action="store_true", help="simulate the next frame on a second thread while drawing")
+    loop.add_argument("--low-latency", action="store_true", help="read input just before each flip instead of at the start of the frame")
+    parser.add_argument("--input-latency", action="store_true", help="measure input latency in the normal loop too (see latency.py)")
+    parser.add_argument("--pacing", choices=STRATEGIES, default=PACING, help="how to wait for the next frame (see pacing.py)")
+    parser.add_argument("--bench-pacing", type=float, metavar="SECONDS", help="play a boss fight for SECONDS under each pacing strategy, print the frame intervals and exit")
+    parser.add_argument("--bench-pipeline", type=int, metavar="FRAMES", help="time serial against pipelined frames and exit")
+    parser.add_argument("--asset-report", action="store_true", help="print the format, memory and blit time of every image and exit (see formats.py)")
+    parser.add_argument("--profile-startup", action="store_true", help="print how long startup took, step by step, and exit")
+    parser.add_argument("--gc-mode", choices=("default", "low-latency"), default=GC_MODE, help="garbage collection policy (see gcpolicy.py)")
+    parser.add_argument("--report", action="store_true", help="print the surface cache, asset format, rotation, GC, culling, audio and scene statistics at exit")
+    parser.add_argument("--audit", action="store_true", help="check for leaked sprites and memory at every level transition (see audit.py)")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT", help=f"serve live metrics on http://{TELEMETRY_HOST}:PORT/metrics")
+    parser.add_argument("--metrics-json", metavar="FILE", help=f"write the metrics to FILE every {TELEMETRY_JSON_INTERVAL} seconds")
+    parser.add_argument("--replay", metavar="FILE", help=f"play back a replay, e.g. {SAVE_DIR}/last.replay (headless: as fast as possible)")
+    args = parser.parse_args()
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+    g = Game()
+    if args.endless:
+        args.level = g.endless_level
+        g.selected_level = g.endless_level
+    g.pipelined = args.pipeline
+    g.set_pacing(args.pacing)
+    g.low_latency = args.low_latency
+    g.measure_latency = args.input_latency
+    g.gc_policy.mode = args.gc_mode
+    g.profile_startup = args.profile_startup
+    if args.audit:
+        from audit import LifecycleAuditor
+        g.auditor = LifecycleAuditor()
+    if args.metrics_port is not None or args.metrics_json:
+        g.telemetry = Telemetry(g, args.metrics_port, args.metrics_json)
+    if args.bench_pacing:
+        pacing.benchmark(g, args.bench_pacing, args.level)
+        g.running = False
+    if args.asset_report:
+        g.load_deferred()
+        print(g.asset_formats.report(g.screen))
+        g.running = False
+    if args.bench_pipeline:
+        pipeline.benchmark(g, args.bench_pipeline, args.level)
+        g.running = False
+    if args.record:
+        # Live play drops frames the encoder can't keep up with; offline replays wait for it
+        g.recorder = FrameRecorder(args.record, g.screen, args.record_format, block=bool(args.replay and args.headless))
+    if args.replay and g.running:
+        g.run_replay(args.replay, paced=not args.headless)
+    elif args.coop and g.running:
+        local_index = args.player - 1
+        port = args.port or NET_PORT + local_index
+        if args.peer:
+            host, peer_port = args.peer.rsplit(":", 1)
+            peer = (host, int(peer_port))
+        else:
+            peer = ("127.0.0.1", NET_PORT + 1 - local_index)
+        g.selected_level = args.level
+        g.set_difficulty(args.difficulty)
+        g.play_coop(local_index, port, peer, args.latency, args.loss, args.frames, scripted=args.headless)
+    if g.running and not args.coop and not args.replay:
+        g.scenes.run(StartScreen(g))
+
+    if g.recorder is not None:
+        g.recorder.close()
+    if g.telemetry is not None:
+        g.telemetry.close()
+    g.scores.close()
+    if args.report:
+        print(g.surfaces.report())
+        print(g.asset_formats.summary())
+        print(g.variants.report())
+        print(g.gc_policy.report())
+        print(g.visibility.report())
+        print(g.audio.report())
+        print(g.scenes.report())
+    if g.pacer.stats and not args.bench_pacing:
+        print(g.pacer.report())
+    if g.low_latency or g.measure_latency:
+        print(g.input_latency.report())
+    pygame.quit()
+    sys.exit()
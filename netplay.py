@@ -0,0 +1,335 @@
+# Two-player co-op over UDP with rollback for Cosmic Clash
+
+# The two games only exchange their players' inputs (one byte per frame). Each side runs
+# the full simulation, which is deterministic (seeded rng, frame-based clock), so the
+# same inputs give the same game on both machines.
+# The remote input for a frame usually has not arrived yet when that frame is simulated,
+# so it is predicted (the player keeps holding what they held last). When the real input
+# turns out different, the game is restored from the snapshot taken before that frame
+# and the frames since are simulated again, all within one rendered frame. If the other
+# player falls more than NET_MAX_ROLLBACK frames behind, the game waits for them.
+# Every NET_CHECKSUM_INTERVAL frames both sides compare a checksum of a confirmed frame
+# to detect desyncs.
+#
+# Testing on one machine, in two terminals:
+#   python main.py --coop --player 1 --latency 60 --loss 0.05
+#   python main.py --coop --player 2 --latency 60 --loss 0.05
+
+import heapq
+import random
+import socket
+import struct
+import time
+import zlib
+import pygame
+from settings import *
+import snapshot
+
+MAGIC = b"CCNP"
+HELLO, INPUT, QUIT = 1, 2, 3
+
+PACKET = struct.Struct("<4sB")            # magic, packet type
+HELLO_BODY = struct.Struct("<BBIBB")      # player index, got the other hello, seed, level, difficulty
+INPUT_BODY = struct.Struct("<IIIbBII")    # sender frame, ack, first input frame, frame advantage, input count, checksum frame, checksum
+MAX_INPUTS_PER_PACKET = 128
+
+def scripted_input(frame, index):
+    """Deterministic stand-in for the keyboard in headless runs: a new direction every 20 frames"""
+    return random.Random(frame // 20 * 2 + index).randrange(16)
+
+class UdpLink:
+    """Datagram socket to the other player, with optional artificial latency and loss"""
+    def __init__(self, port, peer, latency=0, loss=0.0):
+        self.peer = peer
+        self.latency = latency / 1000.0 # One way, applied to outgoing packets
+        self.loss = loss
+        self.loss_rng = random.Random(port) # Independent of the game's rng
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("", port))
+        self.sock.setblocking(False)
+        self.delayed = [] # (send time, sequence, data)
+        self.sequence = 0
+        self.sent = 0
+        self.received = 0
+        self.lost = 0
+
+    def send(self, data):
+        if self.loss and self.loss_rng.random() < self.loss:
+            self.lost += 1
+            return
+        if self.latency:
+            self.sequence += 1
+            heapq.heappush(self.delayed, (time.perf_counter() + self.latency, self.sequence, data))
+        else:
+            self.transmit(data)
+
+    def pump(self):
+        # Send the delayed packets that are due
+        now = time.perf_counter()
+        while self.delayed and self.delayed[0][0] <= now:
+            self.transmit(heapq.heappop(self.delayed)[2])
+
+    def transmit(self, data):
+        try:
+            self.sock.sendto(data, self.peer)
+            self.sent += 1
+        except OSError:
+            pass # Nobody listening yet (connection refused on loopback)
+
+    def receive(self):
+        self.pump()
+        packets = []
+        while True:
+            try:
+                data, address = self.sock.recvfrom(2048)
+            except (BlockingIOError, ConnectionError):
+                break
+            self.received += 1
+            packets.append(data)
+        return packets
+
+    def close(self):
+        self.sock.close()
+
+class RollbackSession:
+    def __init__(self, game, link, local_index, input_delay=NET_INPUT_DELAY, max_rollback=NET_MAX_ROLLBACK):
+        self.game = game
+        self.link = link
+        self.local = local_index
+        self.remote = 1 - local_index
+        self.input_delay = input_delay
+        self.max_rollback = max_rollback
+        self.local_inputs = {frame: 0 for frame in range(1, input_delay + 1)} # frame -> INPUT_* bits
+        self.remote_inputs = {} # Confirmed remote inputs, frame -> bits
+        self.predicted = {} # Frames simulated with a predicted remote input -> the prediction
+        self.confirmed = 0 # All remote inputs up to this frame have arrived
+        self.peer_ack = 0 # The other side has all local inputs up to this frame
+        self.peer_frame = 0
+        self.peer_advantage = 0
+        self.snapshots = {} # frame -> state before that frame was simulated
+        self.rollback_frame = None # Earliest mispredicted frame
+        self.checksums = {} # frame -> checksum, local and remote
+        self.remote_checksums = {}
+        self.last_checked = 0 # Newest frame compared with the other side
+        self.game_over_frame = None
+        self.last_packet_time = time.perf_counter()
+        self.finished = False
+        # Statistics
+        self.rollbacks = 0
+        self.resimulated = 0
+        self.longest_rollback = 0
+        self.stalls = 0 # Frames waited because the other player was too far behind
+        self.waits = 0 # Frames waited to let the other player catch up (time sync)
+        self.checks = 0
+        self.desyncs = 0
+
+    def handshake(self, level, difficulty, timeout=30000):
+        """Find the other player. Returns the (seed, level, difficulty) of player one, or None on timeout."""
+        seed = random.randrange(1 << 32)
+        difficulty_index = list(DIFFICULTY_LEVELS).index(difficulty)
+        agreed = None
+        got_ack = False
+        deadline = time.perf_counter() + timeout / 1000.0
+        next_hello = 0
+        while time.perf_counter() < deadline:
+            pygame.event.pump()
+            now = time.perf_counter()
+            if now >= next_hello:
+                next_hello = now + 0.1
+                body = HELLO_BODY.pack(self.local, agreed is not None, seed, level, difficulty_index)
+                self.link.send(PACKET.pack(MAGIC, HELLO) + body)
+            for data in self.link.receive():
+                packet_type = self.packet_type(data)
+                if packet_type == HELLO:
+                    index, acked, peer_seed, peer_level, peer_difficulty = HELLO_BODY.unpack_from(data, PACKET.size)
+                    if index != self.remote:
+                        print(f"Both sides are player {index + 1}, start one as --player {self.remote + 1}")
+                        return None
+                    # Player one decides the seed, level and difficulty
+                    if self.local == 0:
+                        agreed = (seed, level, difficulty)
+                    else:
+                        agreed = (peer_seed, peer_level, list(DIFFICULTY_LEVELS)[peer_difficulty])
+                    got_ack = got_ack or acked
+                elif packet_type == INPUT and agreed is not None:
+                    # The other side already started, so it has our hello
+                    got_ack = True
+                    self.receive_inputs(data)
+            if agreed is not None and got_ack:
+                # One more hello so the other side knows we got theirs
+                self.link.send(PACKET.pack(MAGIC, HELLO) + HELLO_BODY.pack(self.local, True, seed, level, difficulty_index))
+                self.last_packet_time = time.perf_counter()
+                return agreed
+            time.sleep(0.005)
+        return None
+
+    def packet_type(self, data):
+        if len(data) < PACKET.size:
+            return None
+        magic, packet_type = PACKET.unpack_from(data)
+        return packet_type if magic == MAGIC else None
+
+    def poll(self):
+        for data in self.link.receive():
+            packet_type = self.packet_type(data)
+            if packet_type is None:
+                continue
+            self.last_packet_time = time.perf_counter()
+            if packet_type == INPUT:
+                self.receive_inputs(data)
+            elif packet_type == QUIT and not self.finished:
+                print("The other player left")
+                self.finished = True
+        if time.perf_counter() - self.last_packet_time > NET_TIMEOUT / 1000.0:
+            print("Lost connection to the other player")
+            self.finished = True
+
+    def receive_inputs(self, data):
+        frame, ack, first, advantage, count, checksum_frame, checksum = INPUT_BODY.unpack_from(data, PACKET.size)
+        inputs = data[PACKET.size + INPUT_BODY.size:PACKET.size + INPUT_BODY.size + count]
+        self.peer_frame = max(self.peer_frame, frame)
+        self.peer_advantage = advantage
+        self.peer_ack = max(self.peer_ack, ack)
+        for offset, bits in enumerate(inputs):
+            input_frame = first + offset
+            if input_frame <= self.confirmed or input_frame in self.remote_inputs:
+                continue
+            self.remote_inputs[input_frame] = bits
+            prediction = self.predicted.pop(input_frame, None)
+            if prediction is not None and prediction != bits:
+                if self.rollback_frame is None or input_frame < self.rollback_frame:
+                    self.rollback_frame = input_frame
+        while self.confirmed + 1 in self.remote_inputs:
+            self.confirmed += 1
+        if checksum_frame > self.last_checked:
+            self.remote_checksums[checksum_frame] = checksum
+            self.compare_checksums()
+
+    def advance(self, local_bits):
+        """Simulate the next frame if possible. Returns False when the game had to wait."""
+        self.poll()
+        if self.rollback_frame is not None:
+            self.rollback()
+        next_frame = self.game.frame + 1
+        if next_frame - self.confirmed > self.max_rollback:
+            self.stalls += 1
+            self.send_inputs()
+            return False
+        # Time sync: when this side runs ahead of the other, skip a frame now and then
+        local_advantage = self.game.frame - self.peer_frame
+        if local_advantage - self.peer_advantage > 2 and next_frame % 10 == 0:
+            self.waits += 1
+            self.send_inputs()
+            return False
+        self.local_inputs[next_frame + self.input_delay] = local_bits
+        self.step(next_frame)
+        self.record_checksum()
+        self.send_inputs()
+        self.prune()
+        return True
+
+    def step(self, frame):
+        # Simulate one frame with the best inputs known
+        self.snapshots[frame] = snapshot.capture(self.game)
+        remote_bits = self.remote_inputs.get(frame)
+        if remote_bits is None:
+            # Predict that the other player keeps holding the same keys
+            remote_bits = self.remote_inputs.get(self.confirmed, 0)
+            self.predicted[frame] = remote_bits
+        inputs = [0, 0]
+        inputs[self.local] = self.local_inputs.get(frame, 0)
+        inputs[self.remote] = remote_bits
+        self.game.simulate(inputs)
+        if self.game.game_state == "GAME_OVER":
+            if self.game_over_frame is None:
+                self.game_over_frame = frame
+        else:
+            self.game_over_frame = None
+
+    def rollback(self):
+        # Go back to before the first mispredicted frame and simulate up to now again
+        start, end = self.rollback_frame, self.game.frame
+        self.rollback_frame = None
+        snapshot.restore(self.game, self.snapshots[start])
+        self.game_over_frame = None
+        self.game.resimulating = True # Effects of these frames were already shown
+        for frame in range(start, end + 1):
+            self.step(frame)
+        self.game.resimulating = False
+        self.rollbacks += 1
+        self.resimulated += end - start + 1
+        self.longest_rollback = max(self.longest_rollback, end - start + 1)
+
+    def record_checksum(self):
+        # A frame is final once the remote inputs up to it are confirmed. Its state is
+        # the snapshot taken before the frame after it.
+        frame = self.confirmed - self.confirmed % NET_CHECKSUM_INTERVAL
+        if frame and frame not in self.checksums and frame + 1 in self.snapshots:
+            self.checksums[frame] = zlib.crc32(self.snapshots[frame + 1])
+            self.compare_checksums()
+        if self.game_over_frame is not None and self.confirmed >= self.game_over_frame:
+            self.finished = True
+
+    def compare_checksums(self):
+        for frame in [f for f in self.remote_checksums if f in self.checksums]:
+            self.checks += 1
+            self.last_checked = max(self.last_checked, frame)
+            if self.remote_checksums.pop(frame) != self.checksums[frame]:
+                self.desyncs += 1
+                print(f"Desync detected at frame {frame}")
+
+    def send_inputs(self):
+        first = max(self.peer_ack + 1, self.game.frame + self.input_delay - MAX_INPUTS_PER_PACKET + 1, 1)
+        last = max(self.local_inputs)
+        inputs = bytes(self.local_inputs[frame] for frame in range(first, last + 1))
+        checksum_frame = max(self.checksums, default=0)
+        advantage = max(-128, min(127, self.game.frame - self.peer_frame))
+        body = INPUT_BODY.pack(self.game.frame, self.confirmed, first, advantage, len(inputs),
+                               checksum_frame, self.checksums.get(checksum_frame, 0))
+        self.link.send(PACKET.pack(MAGIC, INPUT) + body + inputs)
+
+    def prune(self):
+        # Nothing at or before the confirmed frame can be rolled back any more
+        for frame in [f for f in self.snapshots if f <= self.confirmed]:
+            del self.snapshots[frame]
+        for frame in [f for f in self.local_inputs if f <= min(self.peer_ack, self.confirmed) - MAX_INPUTS_PER_PACKET]:
+            del self.local_inputs[frame]
+        for frame in [f for f in self.remote_inputs if f < self.confirmed - 1]:
+            del self.remote_inputs[frame]
+        for frame in [f for f in self.checksums if f < self.confirmed - 10 * NET_CHECKSUM_INTERVAL]:
+            del self.checksums[frame]
+        for frame in [f for f in self.remote_checksums if f < self.confirmed - 10 * NET_CHECKSUM_INTERVAL]:
+            del self.remote_checksums[frame]
+
+    def settle(self, timeout=1.0):
+        """Wait until the other player's inputs up to the current frame are in, so the state is final"""
+        deadline = time.perf_counter() + timeout
+        while self.confirmed < self.game.frame and time.perf_counter() < deadline:
+            self.poll()
+            if self.rollback_frame is not None:
+                self.rollback()
+            self.send_inputs()
+            time.sleep(0.005)
+        if self.rollback_frame is not None:
+            self.rollback()
+        return self.confirmed >= self.game.frame
+
+    def close(self):
+        settled = self.settle()
+        self.final_checksum = zlib.crc32(snapshot.capture(self.game)) if settled else None
+        # Say goodbye a few times, any of them may get lost
+        for _ in range(3):
+            self.send_inputs()
+            self.link.send(PACKET.pack(MAGIC, QUIT))
+        deadline = time.perf_counter() + self.link.latency + 0.05
+        while self.link.delayed and time.perf_counter() < deadline:
+            self.link.pump()
+            time.sleep(0.005)
+        self.link.close()
+
+    def report(self):
+        final = f"{self.final_checksum:08x}" if self.final_checksum is not None else "unconfirmed"
+        return (f"Co-op player {self.local + 1}: {self.game.frame} frames, final state {final}, "
+                f"{self.rollbacks} rollbacks ({self.resimulated} frames re-simulated, longest {self.longest_rollback}), "
+                f"{self.stalls} stalls, {self.waits} time sync waits, {self.checks} checksums compared, {self.desyncs} desyncs, "
+                f"packets sent {self.link.sent} received {self.link.received} dropped {self.link.lost}")
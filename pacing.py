@@ -0,0 +1,152 @@
+# Frame pacing for Cosmic Clash
+
+# How the game loops wait for the next frame (main.py --pacing, default PACING):
+#
+#   tick     clock.tick(FPS). Sleeps with SDL_Delay, which can wake a millisecond or
+#            more late depending on the OS timer, so frame intervals wobble.
+#   busy     clock.tick_busy_loop(FPS). Spins on the CPU for the whole wait: exact, but
+#            keeps a core busy.
+#   hybrid   sleeps until a margin before the deadline, then spins the rest. The margin
+#            is calibrated while running: the longest recent oversleep of time.sleep,
+#            plus PACING_SPIN_MARGIN.
+#   vsync    the window is opened with vsync, so flip() waits for the display. The loop
+#            waits like hybrid, but only until PACING_VSYNC_SLACK of a frame before the
+#            deadline, and lets the flip line the frame up with the refresh. Where the
+#            display can't do vsync, this is hybrid a little early.
+#
+# Deadlines are a fixed cadence (the last deadline plus a frame), so waking late does
+# not push the following frames back. More than a frame behind, the cadence restarts
+# from now rather than rushing frames out to catch up.
+#
+# Every presented frame's interval is recorded per strategy, when it followed a paced
+# wait (menus are not paced). report() gives the mean, standard deviation and missed
+# deadlines (intervals longer than PACING_MISS_TOLERANCE frames) of each. benchmark()
+# runs the same boss fight under each strategy, to pick the smoothest one for a machine.
+
+import math
+import time
+from collections import deque
+import pygame
+from settings import *
+
+STRATEGIES = ("tick", "busy", "hybrid", "vsync")
+
+class PacingStats:
+    def __init__(self):
+        self.frames = 0
+        self.total = 0.0 # Seconds
+        self.total_squares = 0.0
+        self.longest = 0.0
+        self.missed = 0
+
+    def add(self, interval, period):
+        self.frames += 1
+        self.total += interval
+        self.total_squares += interval * interval
+        self.longest = max(self.longest, interval)
+        if interval > period * (1 + PACING_MISS_TOLERANCE):
+            self.missed += 1
+
+    def summary(self):
+        mean = self.total / self.frames
+        deviation = math.sqrt(max(0.0, self.total_squares / self.frames - mean * mean))
+        return (f"{self.frames} frames, mean {mean * 1000:.2f} ms, std dev {deviation * 1000:.2f} ms, "
+                f"longest {self.longest * 1000:.1f} ms, {self.missed} missed deadlines")
+
+class Pacer:
+    def __init__(self, clock, strategy=PACING):
+        self.clock = clock
+        self.strategy = strategy
+        self.vsync = False # Whether the window was opened with vsync (see Game.set_pacing)
+        self.deadline = None
+        self.period = 1 / FPS
+        self.margin = PACING_INITIAL_MARGIN / 1000 # Seconds hybrid spins before a deadline
+        self.oversleeps = deque(maxlen=PACING_MARGIN_SAMPLES)
+        self.ticked = False
+        self.last_present = None
+        self.stats = {}
+
+    def start(self):
+        """Called as a paced loop starts, so the time before it isn't counted as a frame"""
+        self.clock.tick()
+        self.deadline = None
+        self.ticked = False
+        self.last_present = None
+
+    def tick(self, fps):
+        """Wait for the next frame. Returns the milliseconds since the last call, like clock.tick."""
+        self.period = 1 / fps
+        self.ticked = True
+        if self.strategy == "tick":
+            return self.clock.tick(fps)
+        if self.strategy == "busy":
+            return self.clock.tick_busy_loop(fps)
+        now = time.perf_counter()
+        if self.deadline is None or now - self.deadline > self.period:
+            self.deadline = now # First frame, or more than a frame behind
+        else:
+            self.deadline += self.period
+        early = self.period * PACING_VSYNC_SLACK if self.strategy == "vsync" else 0.0
+        self.wait_until(self.deadline - early)
+        return self.clock.tick()
+
+    def wait_until(self, deadline):
+        sleep = deadline - time.perf_counter() - self.margin
+        if sleep > 0:
+            started = time.perf_counter()
+            time.sleep(sleep)
+            # Calibrate the margin from how late the sleeps wake up
+            self.oversleeps.append(max(0.0, time.perf_counter() - started - sleep))
+            self.margin = max(self.oversleeps) + PACING_SPIN_MARGIN / 1000
+        while time.perf_counter() < deadline:
+            pass
+
+    def presented(self):
+        """Called right after each flip"""
+        now = time.perf_counter()
+        if not self.ticked:
+            self.last_present = None # Not a paced frame
+            return
+        self.ticked = False
+        if self.last_present is not None:
+            stats = self.stats.get(self.strategy)
+            if stats is None:
+                stats = self.stats[self.strategy] = PacingStats()
+            stats.add(now - self.last_present, self.period)
+        self.last_present = now
+
+    def report(self):
+        if not self.stats:
+            return "Pacing: no paced frames"
+        lines = [f"Pacing at {FPS} FPS (target {1000 / FPS:.2f} ms):"]
+        for strategy, stats in self.stats.items():
+            lines.append(f"  {strategy:<7} {stats.summary()}")
+        if "hybrid" in self.stats or "vsync" in self.stats:
+            lines.append(f"  calibrated spin margin {self.margin * 1000:.2f} ms")
+        return "\n".join(lines)
+
+def benchmark(game, seconds=5, level=10):
+    """Play the same boss fight for seconds under each strategy (scripted input) and print the intervals"""
+    import netplay # For scripted_input; only needed here
+    pacer = game.pacer
+    chosen = pacer.strategy
+    # vsync only makes a difference in a window opened with it (main.py --pacing vsync)
+    strategies = [s for s in STRATEGIES if s != "vsync" or pacer.vsync]
+    pacer.stats = {}
+    for strategy in strategies:
+        pacer.strategy = strategy
+        game.selected_level = level
+        game.setup(seed=1)
+        game.start_boss_fight()
+        pacer.start()
+        end = time.perf_counter() + seconds
+        n = 0
+        while time.perf_counter() < end and game.running:
+            game.dt = pacer.tick(FPS) / 1000.0
+            pygame.event.pump()
+            game.simulate([netplay.scripted_input(n, 0)])
+            game.draw()
+            n += 1
+    pacer.strategy = chosen
+    print(pacer.report())
+    return pacer.stats
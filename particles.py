@@ -0,0 +1,129 @@
+# Particle effects for Cosmic Clash
+
+# Explosion bursts and engine trails are made of thousands of short-lived dots, so like
+# the boss projectiles (see projectiles.py) they live in flat NumPy arrays packed at the
+# front (index < count) and are moved, aged and culled with one array operation each per
+# frame. They are drawn straight into the screen's pixels with additive blending.
+#
+# Particles are purely visual. They are not part of snapshots and nothing in the game
+# reads them back, so they use their own random generator and never change the
+# simulation. PARTICLE_BUDGET is a hard limit: particles that do not fit are not spawned.
+
+import numpy as np
+import pygame
+from settings import *
+
+# Offsets of the extra pixels drawn for particles of size 2
+LARGE_OFFSETS = [(1, 0), (0, 1), (1, 1)]
+
+class ParticleSystem:
+    def __init__(self, game, capacity=PARTICLE_BUDGET, seed=0):
+        self.game = game
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2), np.float32)
+        self.vel = np.zeros((capacity, 2), np.float32) # Pixels per frame
+        self.age = np.zeros(capacity, np.float32) # Frames lived
+        self.life = np.ones(capacity, np.float32) # Frames until the particle is gone
+        self.color = np.zeros((capacity, 3), np.float32) # Color when spawned, fades to black
+        self.size = np.ones(capacity, np.uint8) # 1 or 2 pixels across
+        self.count = 0
+        self.dropped = 0 # Particles not spawned because the budget was used up
+        self.rng = np.random.default_rng(seed)
+
+    def spawn(self, x, y, vx, vy, life, colors, size):
+        """Add particles at x, y (arrays or scalars) with velocity arrays vx, vy.
+
+        life is a frame count per particle or shared, colors is a list to pick from.
+        """
+        n = min(len(vx), self.capacity - self.count)
+        self.dropped += len(vx) - n
+        if n == 0:
+            return
+        live = slice(self.count, self.count + n)
+        self.pos[live, 0] = x if np.isscalar(x) else x[:n]
+        self.pos[live, 1] = y if np.isscalar(y) else y[:n]
+        self.vel[live, 0] = vx[:n]
+        self.vel[live, 1] = vy[:n]
+        self.age[live] = 0
+        self.life[live] = life if np.isscalar(life) else life[:n]
+        palette = np.array(colors, np.float32)
+        self.color[live] = palette[self.rng.integers(len(palette), size=n)]
+        self.size[live] = size
+        self.count += n
+
+    def burst(self, center, count, speed, life, colors, size=1):
+        """Particles flying out of center in every direction"""
+        if self.game.resimulating:
+            return # Already shown when the frame was first simulated (see netplay.py)
+        angle = self.rng.uniform(0, 2 * np.pi, count)
+        velocity = self.rng.uniform(0.2, 1.0, count) * speed
+        lifetime = self.rng.uniform(0.5, 1.0, count) * life
+        self.spawn(center[0], center[1], np.cos(angle) * velocity, np.sin(angle) * velocity, lifetime, colors, size)
+
+    def trail(self, position, count, speed, life, colors):
+        """Exhaust particles streaming down from position"""
+        if self.game.resimulating:
+            return
+        x = position[0] + self.rng.uniform(-4, 4, count)
+        vx = self.rng.uniform(-0.3, 0.3, count)
+        vy = self.rng.uniform(0.5, 1.0, count) * speed
+        self.spawn(x, position[1], vx, vy, self.rng.uniform(0.5, 1.0, count) * life, colors, 1)
+
+    def update(self):
+        if self.count == 0:
+            return
+        live = slice(0, self.count)
+        self.pos[live] += self.vel[live]
+        self.vel[live] *= PARTICLE_DRAG
+        self.age[live] += 1
+        x = self.pos[live, 0]
+        y = self.pos[live, 1]
+        keep = (self.age[live] < self.life[live]) & (x >= 0) & (x < WIDTH) & (y >= 0) & (y < HEIGHT)
+        n = int(np.count_nonzero(keep))
+        if n != self.count:
+            for array in (self.pos, self.vel, self.age, self.life, self.color, self.size):
+                array[:n] = array[:self.count][keep]
+            self.count = n
+
+    def clear(self):
+        self.count = 0
+
+    def points(self):
+        """Pixel positions and faded colors of the live particles, copied for drawing"""
+        live = slice(0, self.count)
+        xy = self.pos[live].astype(np.int32)
+        fade = 1.0 - self.age[live] / self.life[live]
+        colors = (self.color[live] * fade[:, None]).astype(np.uint16)
+        return xy, colors, self.size[live] > 1
+
+def draw(surface, points):
+    """Add the colors of points (from ParticleSystem.points) onto surface"""
+    xy, colors, large = points
+    if len(xy) == 0:
+        return
+    width, height = surface.get_size()
+    # Particles spawned after this frame's update (the players' trails) are not culled yet
+    x = xy[:, 0]
+    y = xy[:, 1]
+    inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    if not inside.all():
+        xy = xy[inside]
+        colors = colors[inside]
+        large = large[inside]
+    pixels = pygame.surfarray.pixels3d(surface)
+    try:
+        _add(pixels, xy[:, 0], xy[:, 1], colors)
+        if large.any():
+            xy = xy[large]
+            colors = colors[large]
+            for dx, dy in LARGE_OFFSETS:
+                x = xy[:, 0] + dx
+                y = xy[:, 1] + dy
+                inside = (x < width) & (y < height)
+                _add(pixels, x[inside], y[inside], colors[inside])
+    finally:
+        del pixels # Unlocks the surface
+
+def _add(pixels, x, y, colors):
+    # Additive blend, clamped to white. Particles on the same pixel count once.
+    pixels[x, y] = np.minimum(pixels[x, y] + colors, 255)
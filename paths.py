@@ -0,0 +1,89 @@
+# Enemy flight paths for Cosmic Clash
+
+# Paths are declared by name in levels.py (PATHS) with coordinates given as fractions
+# of the screen size. When a level is loaded every path it uses is baked once into a
+# lookup table holding one (x, y) position per frame, spaced evenly along the curve.
+# Enemies following a path only index that table with their own frame counter.
+
+import math
+from settings import *
+from levels import PATHS
+
+_baked_paths = {} # Path name -> baked table (tuple of (x, y) positions)
+
+def bezier_point(points, t):
+    # De Casteljau evaluation, works for any number of control points
+    while len(points) > 1:
+        points = [(x0 + (x1 - x0) * t, y0 + (y1 - y0) * t) for (x0, y0), (x1, y1) in zip(points, points[1:])]
+    return points[0]
+
+def catmull_rom_point(points, t):
+    # The curve passes through every point; the end points are repeated as tangents
+    points = [points[0]] + list(points) + [points[-1]]
+    segments = len(points) - 3
+    segment = min(int(t * segments), segments - 1)
+    u = t * segments - segment
+    p0, p1, p2, p3 = points[segment:segment + 4]
+    u2 = u * u
+    u3 = u2 * u
+    return tuple(
+        0.5 * (2 * b + (c - a) * u + (2 * a - 5 * b + 4 * c - d) * u2 + (3 * b - a - 3 * c + d) * u3)
+        for a, b, c, d in zip(p0, p1, p2, p3)
+    )
+
+def sine_point(start, end, amplitude, waves, t):
+    # Straight line from start to end with a sideways sine weave
+    x = start[0] + (end[0] - start[0]) * t + amplitude * math.sin(t * waves * 2 * math.pi)
+    y = start[1] + (end[1] - start[1]) * t
+    return x, y
+
+def sample_path(definition, t):
+    """Position (in screen fractions) of a path definition at parameter t in [0, 1]"""
+    kind = definition["kind"]
+    if kind == "bezier":
+        return bezier_point(definition["points"], t)
+    elif kind == "catmull_rom":
+        return catmull_rom_point(definition["points"], t)
+    elif kind == "sine":
+        return sine_point(definition["start"], definition["end"], definition["amplitude"], definition["waves"], t)
+    raise ValueError(f"Unknown path kind '{kind}'")
+
+def bake_path(definition, samples=512):
+    """Bake a path definition into a table of per-frame screen positions"""
+    # Sample the curve densely and measure its length, so the table can be spaced by
+    # distance instead of by curve parameter (constant speed along the whole path)
+    points = [sample_path(definition, i / samples) for i in range(samples + 1)]
+    points = [(x * WIDTH, y * HEIGHT) for x, y in points]
+    lengths = [0.0]
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        lengths.append(lengths[-1] + math.hypot(x1 - x0, y1 - y0))
+
+    speed = definition["speed"] # Pixels per frame
+    frames = max(1, int(lengths[-1] / speed))
+    table = []
+    segment = 0
+    for frame in range(frames + 1):
+        distance = frame * speed
+        while segment < samples - 1 and lengths[segment + 1] < distance:
+            segment += 1
+        span = lengths[segment + 1] - lengths[segment]
+        u = (distance - lengths[segment]) / span if span else 0.0
+        (x0, y0), (x1, y1) = points[segment], points[segment + 1]
+        table.append((int(x0 + (x1 - x0) * u), int(y0 + (y1 - y0) * u)))
+    return tuple(table)
+
+def get_path(name):
+    """Baked table for a path, baking it on first use"""
+    table = _baked_paths.get(name)
+    if table is None:
+        table = _baked_paths[name] = bake_path(PATHS[name])
+    return table
+
+def is_path(name):
+    return name in PATHS
+
+def bake_level_paths(level_data):
+    """Bake every path referenced by the waves of a level, so nothing is baked mid-fight"""
+    for wave in level_data["waves"]:
+        if is_path(wave["pattern"]):
+            get_path(wave["pattern"])
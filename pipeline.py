@@ -0,0 +1,102 @@
+# Pipelined simulation and rendering for Cosmic Clash
+
+# Normally a frame is simulated and then drawn, so it takes as long as both together.
+# In pipelined mode (main.py --pipeline) a worker thread simulates frame N+1 while the
+# main thread draws frame N. Drawing never looks at the live game objects: the worker
+# ends each frame by building a RenderFrame, an immutable description of what is on
+# screen (images and positions of the sprites and projectiles, copies of the particles,
+# the HUD values) and of the sound effects to play with it, and the two threads hand
+# those over strictly one at a time. Particles are spawned and moved by the simulation
+# only. pygame releases the GIL inside blits and scaling, so on a multi-core machine the
+# simulation runs while the frame is being composed.
+#
+# The gain is small: the simulation is mostly Python and holds the GIL, and it is a
+# fraction of the frame (about 0.6 ms against 4.5 ms of drawing for a level 1 boss).
+# --bench-pipeline measured 1.00x on one core and 1.05x on a multi-core machine, so it
+# stays off by default and can't be combined with --low-latency.
+
+import threading
+import time
+from collections import namedtuple
+from settings import *
+
+RenderFrame = namedtuple("RenderFrame", "background blits particles sounds score level lives power difficulty boss_health")
+
+class SimulationWorker:
+    """Runs Game.simulate on its own thread, one frame per start()/finish() pair"""
+    def __init__(self, game):
+        self.game = game
+        self.inputs = None
+        self.frame = None # RenderFrame of the last simulated frame
+        self.error = None
+        self.go = threading.Semaphore(0)
+        self.done = threading.Semaphore(0)
+        self.thread = threading.Thread(target=self.run, name="simulation", daemon=True)
+        self.thread.start()
+
+    def start(self, inputs):
+        """Begin simulating the next frame. The game must not be touched until finish()."""
+        self.inputs = inputs
+        self.go.release()
+
+    def finish(self):
+        """Wait for the frame started last and return its RenderFrame"""
+        self.done.acquire()
+        if self.error is not None:
+            raise self.error
+        return self.frame
+
+    def run(self):
+        while True:
+            self.go.acquire()
+            if self.inputs is None:
+                return
+            try:
+                self.game.simulate(self.inputs)
+                self.frame = self.game.render_state()
+            except Exception as e:
+                self.error = e
+            self.done.release()
+
+    def stop(self):
+        self.inputs = None
+        self.go.release()
+        self.thread.join()
+
+def benchmark(game, frames=600, level=10):
+    """Time the same boss fight serially and pipelined (unpaced, scripted input) and print the speedup"""
+    import netplay # For scripted_input; only needed here
+    results = {}
+    for mode in ("serial", "pipelined"):
+        game.selected_level = level
+        game.setup(seed=1)
+        game.realtime = False
+        game.start_boss_fight() # The busiest frames for both simulation and drawing
+        simulate_time = 0.0
+        render_time = 0.0
+        start = time.perf_counter()
+        if mode == "serial":
+            for n in range(frames):
+                t0 = time.perf_counter()
+                game.simulate([netplay.scripted_input(n, 0)])
+                frame = game.render_state()
+                t1 = time.perf_counter()
+                game.render(frame)
+                simulate_time += t1 - t0
+                render_time += time.perf_counter() - t1
+        else:
+            worker = SimulationWorker(game)
+            frame = game.render_state()
+            for n in range(frames):
+                worker.start([netplay.scripted_input(n, 0)])
+                game.render(frame)
+                frame = worker.finish()
+            worker.stop()
+        results[mode] = (time.perf_counter() - start) * 1000 / frames
+        if mode == "serial":
+            print(f"serial:    {results[mode]:.2f} ms/frame (simulation {simulate_time * 1000 / frames:.2f}, rendering {render_time * 1000 / frames:.2f})")
+        else:
+            print(f"pipelined: {results[mode]:.2f} ms/frame")
+    game.realtime = True
+    print(f"speedup:   {results['serial'] / results['pipelined']:.2f}x over {frames} frames of the level {level} boss")
+    return results
@@ -0,0 +1,103 @@
+# Compact projectile store for Cosmic Clash
+
+# Boss patterns can put hundreds of bullets on screen at once. Instead of one sprite per
+# bullet they live in flat NumPy arrays, packed at the front (index < count), so moving,
+# culling and collision testing them are each a single array operation per frame.
+# Each bullet is drawn rotated along its velocity, with the nearest of the image's
+# preloaded rotations (see variants.py).
+
+import numpy as np
+import pygame
+from settings import *
+from sweep import first_hits
+
+class ProjectileStore:
+    def __init__(self, game, image_key="bullet_enemy", capacity=PROJECTILE_CAPACITY):
+        self.game = game
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2), np.float32) # Centers
+        self.vel = np.zeros((capacity, 2), np.float32) # Pixels per frame
+        self.count = 0
+        self.moved = 0 # Bullets moved by the last update(); the ones spawned since have not moved yet
+        self.dropped = 0 # Bullets not spawned because the store was full
+        self.image_key = image_key
+        self.image = self.game.surfaces.image(image_key, (int(BULLET_WIDTH * 1.5), int(BULLET_HEIGHT * 1.5 * 1.5)), YELLOW)
+        self.half_size = np.array(self.image.get_size(), np.float32) / 2
+        # Square hitbox the width of the image, so bullets flying sideways are not wider than they look
+        self.hit_half = self.half_size[0]
+        self.frames = None # The rotated variants images and offsets are taken from
+
+    def spawn(self, x, y, vx, vy):
+        """Add a batch of bullets starting at (x, y) with velocity arrays vx, vy"""
+        n = min(len(vx), self.capacity - self.count)
+        self.dropped += len(vx) - n
+        if n:
+            self.game.audio.play("boss_shot")
+        start, end = self.count, self.count + n
+        self.pos[start:end, 0] = x
+        self.pos[start:end, 1] = y
+        self.vel[start:end, 0] = vx[:n]
+        self.vel[start:end, 1] = vy[:n]
+        self.count = end
+
+    def update(self):
+        live = slice(0, self.count)
+        self.pos[live] += self.vel[live]
+        # Drop everything that left the screen
+        x = self.pos[live, 0]
+        y = self.pos[live, 1]
+        margin = self.half_size[1]
+        keep = (x > -margin) & (x < WIDTH + margin) & (y > -margin) & (y < HEIGHT + margin)
+        self.compact(keep)
+        self.moved = self.count
+
+    def compact(self, keep):
+        # Move the bullets to keep to the front of the arrays
+        n = int(np.count_nonzero(keep))
+        if n != self.count:
+            self.moved = int(np.count_nonzero(keep[:self.moved]))
+            self.pos[:n] = self.pos[:self.count][keep]
+            self.vel[:n] = self.vel[:self.count][keep]
+            self.count = n
+
+    def collide_rect(self, rect, kill=True):
+        """Number of bullets that ran into rect this frame (see sweep.py), removing them if kill is set"""
+        if self.count == 0:
+            return 0
+        live = slice(0, self.count)
+        moves = self.vel[live]
+        if self.moved < self.count:
+            # Bullets spawned since the last update are tested where they are, not behind it
+            moves = moves.copy()
+            moves[self.moved:] = 0
+        hits = first_hits(self.pos[live], moves, (self.hit_half, self.hit_half),
+                          [(rect.left, rect.top, rect.right, rect.bottom)]) == 0
+        hit_count = int(np.count_nonzero(hits))
+        if hit_count and kill:
+            self.compact(~hits)
+        return hit_count
+
+    def clear(self):
+        self.count = 0
+        self.moved = 0
+
+    def blit_list(self):
+        """(image, topleft) pairs for Surface.blits()"""
+        if self.count == 0:
+            return []
+        frames = self.game.variants.frames(self.image_key, self.image)
+        if frames is not self.frames:
+            self.frames = frames
+            self.images = [variant.image for variant in frames]
+            self.offsets = np.array([variant.offset for variant in frames], np.float32)
+        live = slice(0, self.count)
+        steps = len(frames)
+        # The nearest step to each heading (0 is straight down, see variants.heading_of)
+        angles = np.arctan2(self.vel[live, 0], self.vel[live, 1])
+        index = np.rint(angles * (steps / (2 * np.pi))).astype(np.int32) % steps
+        topleft = (self.pos[live] + self.offsets[index]).astype(np.int32).tolist()
+        images = self.images
+        return [(images[i], p) for i, p in zip(index.tolist(), topleft)]
+
+    def draw(self, surface):
+        surface.blits(self.blit_list(), doreturn=False)
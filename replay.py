@@ -0,0 +1,50 @@
+# Input replays for Cosmic Clash
+
+# The simulation is deterministic (see Game.simulate), so a whole run is described by its
+# seed, starting level, difficulty and the inputs of every frame: one byte per player per
+# frame. Playing those inputs back reproduces the run exactly, which is how recordings are
+# rendered offline (main.py --replay FILE --record DIR --headless).
+
+import struct
+from collections import namedtuple
+from settings import *
+
+MAGIC = b"CCRP"
+VERSION = 9 # 2: timers moved to the scheduler, which changed the order of events within a frame
+            # 3: sprites cleared for a boss fight are killed, not just taken out of their groups
+            # 4: sprites far off screen only move (see visibility.py)
+            # 5: the players move after the rest of the world (see latency.py)
+            # 6: projectiles collide along the path they flew (see sweep.py)
+            # 7: a shooter that can't fire yet is armed once it can, not polled every frame
+            # 8: recurring timers keep their cadence instead of counting from when they fired
+            # 9: bullets fired this frame are not swept from behind the muzzle
+HEADER = struct.Struct("<4sHIHBBI")  # magic, version, seed, level, difficulty, player count, frame count
+
+Replay = namedtuple("Replay", "seed level difficulty players inputs")
+
+def save(path, game):
+    """Write the inputs of the game's current run"""
+    players = len(game.players)
+    frames = len(game.input_log) // players
+    header = HEADER.pack(MAGIC, VERSION, game.seed, game.start_level, list(DIFFICULTY_LEVELS).index(game.difficulty), players, frames)
+    with open(path, "wb") as f:
+        f.write(header + game.input_log[:frames * players])
+
+def load(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, seed, level, difficulty, players, frames = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a Cosmic Clash replay")
+    if version != VERSION:
+        raise ValueError(f"Unsupported replay version {version}")
+    inputs = data[HEADER.size:HEADER.size + frames * players]
+    if len(inputs) != frames * players:
+        raise ValueError(f"{path} is truncated")
+    return Replay(seed, level, list(DIFFICULTY_LEVELS)[difficulty], players, inputs)
+
+def frames(replay):
+    """The inputs of each frame, one list per frame"""
+    n = replay.players
+    for start in range(0, len(replay.inputs), n):
+        yield list(replay.inputs[start:start + n])
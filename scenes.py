@@ -0,0 +1,739 @@
+# Scenes for Cosmic Clash
+
+# Every screen is a scene on a stack, and one loop (SceneStack.run) drives whichever scene
+# is on top:
+#
+#   StartScreen      level and difficulty selection
+#   Playing          the game itself, in the normal, low-latency or pipelined loop
+#   BossIntro        the pause before a boss fight (Game.hold with kind "boss_intro")
+#   LevelTransition  the pause between levels (kind "level_transition")
+#   Hold             any other pause of the game (the last death, a defeated boss)
+#   Pause            the game paused with ESC or P
+#   GameOver         the score and the leaderboard
+#
+# A frame of the loop is: scene.wait() for the frame and its events, handle_event() for
+# each of them, update(), draw() (which presents), then the pushes, pops and replacements
+# the scene asked for are applied. They are only applied between frames, so a scene never
+# changes in the middle of a simulated frame (replays and co-op rely on whole frames).
+# Game scenes wait on the pacer (see pacing.py). Menus draw nothing until something
+# changes and sleep until there is input instead, so they don't keep a core busy; they
+# present through Game.present like the rest, with the same telemetry and recording.
+#
+# Scenes are made before they are needed and preloaded: prepare() runs on the "preload"
+# thread while the current scene is shown, so entering a scene only has to wait for what
+# is left of its preload, normally nothing. The start screen preloads the game (NumPy and
+# the sprite images, see Game.load_deferred) once its first frame is up, Playing preloads
+# the next boss's images and the next level's paths, and GameOver the start screen.
+# report() (main.py --report) shows how long transitions waited for preloads.
+
+import queue
+import threading
+import time
+import math
+import os
+import pygame
+from settings import *
+import replay
+from scores import Run
+import pipeline
+from latency import FlipEstimate
+from paths import bake_level_paths
+from levels import LEVELS
+from sprites import preload_boss
+
+def read_input():
+    """INPUT_* bits for the movement keys held right now (arrow keys or WASD)"""
+    keys = pygame.key.get_pressed()
+    bits = 0
+    if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+        bits |= INPUT_LEFT
+    if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+        bits |= INPUT_RIGHT
+    if keys[pygame.K_UP] or keys[pygame.K_w]:
+        bits |= INPUT_UP
+    if keys[pygame.K_DOWN] or keys[pygame.K_s]:
+        bits |= INPUT_DOWN
+    return bits
+
+def pulse_size(now, base, speed, amount, minimum):
+    """Font size of a pulsating text element at time now (ms)"""
+    return max(int(base * (1.0 + math.sin(now * speed) * amount)), minimum)
+
+def next_pulse_change(now, base, speed, amount, minimum, step=10):
+    """Milliseconds until pulse_size() next returns a different size, at most MENU_IDLE_TIMEOUT"""
+    current = pulse_size(now, base, speed, amount, minimum)
+    for wait in range(step, MENU_IDLE_TIMEOUT, step):
+        if pulse_size(now + wait, base, speed, amount, minimum) != current:
+            return wait
+    return MENU_IDLE_TIMEOUT
+
+class Scene:
+    def __init__(self, game):
+        self.game = game
+        self.entered = False
+        self.queued = False # Handed to the preload thread
+        self.prepared = threading.Event()
+        self.error = None # Raised by prepare() on the preload thread
+
+    def prepare(self):
+        """Load what the scene needs.
+
+        May run on the preload thread while another scene is drawn and simulated (even on
+        the pipeline's worker), so it must not draw to the screen or change the state they
+        use. It may load files, bake paths, build surfaces of its own (convert() and text
+        rendering included) and fill the locked caches: SurfaceCache, VariantCache and
+        Game.load_deferred. Results are published with single assignments, like
+        game.start_screen_cache, and used only once the scene is entered.
+        """
+
+    def enter(self):
+        """Called when the scene first comes to the top of the stack"""
+
+    def resume(self):
+        """Called when the scenes above it are popped"""
+
+    def exit(self):
+        """Called when the scene leaves the stack"""
+
+    def wait(self):
+        """Wait for the next frame and return its events"""
+        self.game.dt = self.game.pacer.tick(FPS) / 1000.0
+        return pygame.event.get()
+
+    def handle_event(self, event):
+        pass
+
+    def update(self):
+        pass
+
+    def draw(self):
+        pass
+
+class Menu(Scene):
+    """A scene that only draws when something changed and otherwise sleeps until there is input"""
+    def __init__(self, game):
+        super().__init__(game)
+        self.redraw = True
+
+    def timeout(self):
+        """Milliseconds to sleep at most when there is no input"""
+        return MENU_IDLE_TIMEOUT
+
+    def wait(self):
+        if self.redraw:
+            return pygame.event.get()
+        return [pygame.event.wait(self.timeout())] + pygame.event.get()
+
+    def handle_event(self, event):
+        if event.type in (pygame.VIDEORESIZE, pygame.WINDOWEXPOSED, pygame.WINDOWSIZECHANGED):
+            self.redraw = True
+
+    def resume(self):
+        self.redraw = True
+
+class StartScreen(Menu):
+    # Card dimensions and position
+    card_width = 600
+    card_height = 500
+    card_color = (20, 20, 40) # Darker blue/purple for the card
+    border_color = (80, 80, 100)
+    border_radius = 20
+    # Difficulty buttons
+    button_spacing = 10
+    button_width = 100
+    button_height = 40
+    bright_colors = {"Easy": GREEN, "Medium": YELLOW, "Hard": RED}
+    dark_colors = {"Easy": (34, 139, 34), "Medium": (218, 165, 32), "Hard": (139, 0, 0)} # Shown when not selected
+    hover_scale_factor = 1.1 # Scale up by 10% on hover/select
+
+    def __init__(self, game):
+        super().__init__(game)
+        card_x = (WIDTH - self.card_width) // 2
+        card_y = (HEIGHT - self.card_height) // 2 + 50 # Shift slightly down from center
+        self.card_rect = pygame.Rect(card_x, card_y, self.card_width, self.card_height)
+
+        # Difficulty button positions (adjusting for the card)
+        self.button_y = card_y + self.card_height * 0.6
+        width, height, spacing = self.button_width, self.button_height, self.button_spacing
+        self.button_rects = {
+            "Easy": pygame.Rect(card_x + self.card_width / 2 - width * 1.5 - spacing, self.button_y, width, height),
+            "Medium": pygame.Rect(card_x + self.card_width / 2 - width / 2, self.button_y, width, height),
+            "Hard": pygame.Rect(card_x + self.card_width / 2 + width * 0.5 + spacing, self.button_y, width, height),
+        }
+        self.button_draw_rects = dict(self.button_rects)
+
+        # Level selection position
+        self.level_select_y = self.button_y + height + 40
+        self.level_rect_approx = pygame.Rect(WIDTH / 2 - 150, self.level_select_y - 10, 300, 60) # Approximate clickable area
+        self.buttons_area = self.button_rects["Easy"].union(self.button_rects["Hard"]).inflate(
+            width * (self.hover_scale_factor - 1) + 4, height * (self.hover_scale_factor - 1) + 4)
+        self.level_area = pygame.Rect(0, 0, 320, 40)
+        self.level_area.center = (WIDTH / 2, self.level_select_y)
+        self.title_area = None
+        self.drawn = {} # Last drawn state of each animated element
+        self.next = None # The Playing scene, preloaded while this one is shown
+
+    def prepare(self):
+        # Everything that does not animate (background, card, static text) is rendered once
+        # into a cached surface. The animated elements are redrawn over it inside their own areas.
+        if self.game.start_screen_cache is None:
+            self.game.start_screen_cache = self.build_cache()
+
+    def build_cache(self):
+        """Render the static parts of the start screen into a surface"""
+        game = self.game
+        card_rect = self.card_rect
+        surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+        game.background.draw(surface) # The background is frozen while the menu is shown
+
+        # Draw the card background with rounded corners and border
+        pygame.draw.rect(surface, self.border_color, card_rect, border_radius=self.border_radius)
+        pygame.draw.rect(surface, self.card_color, card_rect.inflate(-4, -4), border_radius=self.border_radius - 2)
+
+        # Draw text inside the card
+        game.draw_text("Welcome to Cosmic Clash", 36, (150, 180, 255), WIDTH / 2, card_rect.y + 40, surface) # Lighter blue/purple
+        game.draw_text("A space shooter with power-ups, levels, and boss fights!", 22, WHITE, WIDTH / 2, card_rect.y + 90, surface)
+
+        # Controls section
+        controls_box_y = card_rect.y + 140
+        controls_box_height = 60
+        pygame.draw.rect(surface, (30, 30, 50), (card_rect.x + 20, controls_box_y, card_rect.width - 40, controls_box_height), border_radius=10)
+        game.draw_text("Controls", 20, WHITE, WIDTH / 2, controls_box_y + 10, surface)
+        game.draw_text("WASD or Arrow keys to move, SPACE to shoot", 24, WHITE, WIDTH / 2, controls_box_y + 35, surface)
+
+        # Difficulty selection text
+        game.draw_text("Select Difficulty", 24, WHITE, WIDTH / 2, self.button_y - 30, surface)
+
+        game.draw_text("Use LEFT/RIGHT or A/D to change level", 18, WHITE, WIDTH / 2, self.level_select_y + 30, surface)
+        game.draw_text("Click on the level number to start", 20, WHITE, WIDTH / 2, self.level_select_y + 70, surface)
+
+        game.draw_text("Press ESC to Quit", 18, WHITE, WIDTH / 2, HEIGHT - 30, surface)
+        return surface
+
+    def enter(self):
+        game = self.game
+        game.game_state = "START_SCREEN"
+        title_area = game.get_font(68).size("COSMIC CLASH")
+        self.title_area = pygame.Rect(0, 0, title_area[0] + 8, title_area[1] + 8)
+        self.title_area.center = (WIDTH / 2, HEIGHT / 10)
+        self.drawn = {}
+        self.redraw = True
+
+    def resume(self):
+        super().resume()
+        self.drawn = {}
+
+    def timeout(self):
+        # Sleep until the next input or the next time an animation actually changes
+        now = pygame.time.get_ticks()
+        return min(next_pulse_change(now, 64, 0.002, 0.05, 56), next_pulse_change(now, 28, 0.003, 0.03, 24))
+
+    def start(self):
+        self.game.scenes.replace(self.next if self.next is not None else Playing(self.game))
+
+    def change_difficulty(self, step):
+        game = self.game
+        game.selected_difficulty_index = (game.selected_difficulty_index + step) % len(game.difficulty_options)
+        game.set_difficulty(game.difficulty_options[game.selected_difficulty_index])
+
+    def handle_event(self, event):
+        super().handle_event(event)
+        game = self.game
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                game.running = False
+            # Arrow key navigation for difficulty
+            elif event.key == pygame.K_UP:
+                self.change_difficulty(-1)
+            elif event.key == pygame.K_DOWN:
+                self.change_difficulty(1)
+            # Level selection handled by LEFT/RIGHT or A/D
+            elif event.key in [pygame.K_LEFT, pygame.K_a]:
+                game.selected_level = max(1, game.selected_level - 1)
+            elif event.key in [pygame.K_RIGHT, pygame.K_d]:
+                game.selected_level = min(game.endless_level, game.selected_level + 1)
+            # Select difficulty/start game with ENTER
+            elif event.key == pygame.K_RETURN:
+                self.start()
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            if event.button == 1:  # Left click
+                mouse_pos = game.window_to_logical(event.pos)
+                # Check if click is on a difficulty button
+                clicked = [name for name, rect in self.button_draw_rects.items() if rect.collidepoint(mouse_pos)]
+                if clicked:
+                    game.set_difficulty(clicked[0])
+                    self.start()
+                # Check if click is on level selection area
+                elif self.level_select_y - 10 <= mouse_pos[1] <= self.level_select_y + 50:
+                    if WIDTH / 2 - 150 <= mouse_pos[0] <= WIDTH / 2 + 150:
+                        self.start()
+
+    def draw(self):
+        game = self.game
+        screen = game.screen
+        static = game.start_screen_cache
+        drawn = self.drawn
+        now = pygame.time.get_ticks()
+        mouse_pos = game.window_to_logical(pygame.mouse.get_pos())
+        dirty = []
+        if self.redraw:
+            screen.blit(static, (0, 0))
+            drawn.clear()
+
+        # Pulsating title (between 1.0 and 1.05). The font size only takes a handful of
+        # values, so each size is rendered once and the screen is only touched when it changes.
+        title_size = pulse_size(now, 64, 0.002, 0.05, 56)
+        if drawn.get("title") != title_size:
+            drawn["title"] = title_size
+            text_surface = game.get_text(game.get_font(title_size), "COSMIC CLASH", (100, 150, 255))
+            screen.blit(static, self.title_area, self.title_area)
+            screen.blit(text_surface, text_surface.get_rect(center=(WIDTH / 2, HEIGHT / 10)))
+            dirty.append(self.title_area)
+
+        # Difficulty buttons, scaled up and highlighted on hover or selection
+        hovered = tuple(name for name, rect in self.button_rects.items() if rect.collidepoint(mouse_pos) or game.difficulty == name)
+        if drawn.get("buttons") != (game.difficulty, hovered):
+            drawn["buttons"] = (game.difficulty, hovered)
+            screen.blit(static, self.buttons_area, self.buttons_area)
+            for name, rect in self.button_rects.items():
+                draw_rect = rect.copy()
+                color = self.bright_colors[name] if game.difficulty == name else self.dark_colors[name]
+                if name in hovered:
+                    draw_rect.width *= self.hover_scale_factor
+                    draw_rect.height *= self.hover_scale_factor
+                    draw_rect.center = rect.center
+                    color = self.bright_colors[name] # Keep bright color on hover/select
+                self.button_draw_rects[name] = draw_rect
+                pygame.draw.rect(screen, color, draw_rect, border_radius=8)
+                # Adjust text position slightly for scaled buttons
+                game.draw_text(name, 20, BLACK, draw_rect.centerx, draw_rect.centery - 10)
+            dirty.append(self.buttons_area)
+
+        # Level selection text, pulsating slightly and highlighted on hover
+        level_size = pulse_size(now, 28, 0.003, 0.03, 24)
+        level_color = YELLOW if self.level_rect_approx.collidepoint(mouse_pos) else WHITE
+        if drawn.get("level") != (level_size, level_color, game.selected_level):
+            drawn["level"] = (level_size, level_color, game.selected_level)
+            text_surface = game.get_text(game.get_font(level_size), f"Select Level: {game.level_name(game.selected_level)}", level_color)
+            screen.blit(static, self.level_area, self.level_area)
+            screen.blit(text_surface, text_surface.get_rect(center=(WIDTH / 2, self.level_select_y)))
+            dirty.append(self.level_area)
+
+        if self.redraw:
+            game.present()
+            self.redraw = False
+        elif dirty:
+            game.present(dirty)
+
+        if self.next is None:
+            # The start screen is up; load the game while the player looks at it
+            if game.startup.first_frame is None:
+                game.startup.mark_first_frame()
+            self.next = Playing(game)
+            game.scenes.preload(self.next)
+            if game.profile_startup:
+                game.scenes.wait(self.next)
+                print(game.startup.report())
+                game.running = False
+
+class Playing(Scene):
+    def __init__(self, game, retry=None):
+        super().__init__(game)
+        self.retry = retry # Run of the game over retried from the last checkpoint, None for a new run
+        self.worker = None # SimulationWorker when pipelined
+        self.frame = None # RenderFrame to draw next when pipelined
+        self.started = False # A frame was started on the worker
+        self.pause = False # ESC or P was pressed this frame
+        self.low_latency = False # Pipelined takes precedence when both are asked for
+        self.measure_latency = False
+        self.estimate = None # FlipEstimate when low-latency
+        self.deadline = None
+        self.frame_start = 0.0
+        self.boss_intro = None
+        self.level_transition = None
+        self.game_over = None
+
+    def prepare(self):
+        self.game.load_deferred()
+
+    def enter(self):
+        game = self.game
+        if self.retry:
+            game.retry_from_checkpoint()
+        else:
+            game.setup()
+        # Start playing background music
+        game.audio.play_music()
+        game.playing = True
+        if game.pipelined:
+            # Frame N+1 is simulated on a worker thread while frame N is drawn
+            self.worker = pipeline.SimulationWorker(game)
+            self.frame = game.render_state()
+        self.low_latency = game.low_latency and self.worker is None
+        self.measure_latency = game.measure_latency and self.worker is None and not self.low_latency
+        if self.low_latency:
+            # The input is read as late as the flip deadline allows (see latency.py)
+            self.estimate = FlipEstimate()
+        self.resume()
+        self.prepare_upcoming()
+        self.game_over = GameOver(game)
+        game.scenes.preload(self.game_over)
+
+    def resume(self):
+        self.deadline = None
+        self.frame_start = time.perf_counter()
+
+    def exit(self):
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+        if self.retry is not None and self.game.game_state != "GAME_OVER":
+            # Quit during a retry: the run ends as it did before it
+            self.game.scores.add(self.retry)
+
+    def prepare_upcoming(self):
+        """Make and preload the scenes the level can go to next"""
+        game = self.game
+        self.boss_intro = BossIntro(game, game.level_data.get("boss_type", "level1_boss"))
+        self.level_transition = LevelTransition(game, game.current_level + 1)
+        game.scenes.preload(self.boss_intro)
+        game.scenes.preload(self.level_transition)
+
+    def wait(self):
+        game = self.game
+        if self.low_latency:
+            game.update_world()
+            if self.deadline is None:
+                game.clock.tick()
+                self.deadline = time.perf_counter() + 1 / FPS # When this frame's flip is due
+            game.input_latency.wait(self.deadline - self.estimate.value())
+            self.frame_start = time.perf_counter()
+            return game.input_latency.take_events()
+        if self.measure_latency:
+            # Wait for the frame like clock.tick(FPS), but see the events that come in meanwhile
+            self.frame_start = max(self.frame_start + 1 / FPS, time.perf_counter())
+            game.input_latency.wait(self.frame_start)
+            game.dt = game.clock.tick() / 1000.0
+            return game.input_latency.take_events()
+        return super().wait()
+
+    def handle_event(self, event):
+        game = self.game
+        game.handle_event(event)
+        if event.type == pygame.KEYDOWN and event.key in (pygame.K_ESCAPE, pygame.K_p):
+            self.pause = True # Once the frame is done
+
+    def update(self):
+        game = self.game
+        if self.low_latency:
+            game.update_players([read_input()]) # Always, the world is already a frame ahead
+        elif not game.playing:
+            return
+        elif self.worker is not None:
+            self.worker.start([read_input()])
+            self.started = True
+        else:
+            game.simulate([read_input()])
+
+    def draw(self):
+        game = self.game
+        if self.worker is not None:
+            if self.started:
+                self.started = False
+                game.render(self.frame)
+                self.frame = self.worker.finish()
+        else:
+            game.draw()
+        if self.low_latency:
+            now = time.perf_counter()
+            self.estimate.add(now - self.frame_start)
+            game.dt = game.clock.tick() / 1000.0
+            # The next deadline, unless this frame was so late that it has passed too
+            self.deadline = max(self.deadline + 1 / FPS, now)
+        self.follow_up()
+
+    def follow_up(self):
+        """Go to the scenes the frame asked for: pauses between phases, and the game over"""
+        game = self.game
+        holds, game.holds = game.holds, []
+        scenes = game.scenes
+        if not game.playing:
+            scenes.replace(self.game_over)
+        elif self.pause:
+            scenes.push(Pause(game)) # Under the holds, so it comes up after them
+        self.pause = False
+        for ms, kind in reversed(holds): # Pushed last, shown first
+            if kind == "boss_intro":
+                boss = game.boss_group.sprite
+                if boss is not None and boss.boss_type != self.boss_intro.boss_type:
+                    self.boss_intro = BossIntro(game, boss.boss_type) # Prepared as it is pushed
+                scene = self.boss_intro
+            elif kind == "level_transition":
+                scene = self.level_transition
+            else:
+                scene = Hold(game)
+            scene.frames = max(1, ms * FPS // 1000)
+            scenes.push(scene)
+        if holds:
+            self.prepare_upcoming()
+
+class Hold(Scene):
+    """The game frozen on its last frame for a while (Game.hold), with an optional caption"""
+    caption = None
+
+    def __init__(self, game):
+        super().__init__(game)
+        self.frames = 1
+        self.backdrop = None
+
+    def enter(self):
+        game = self.game
+        self.backdrop = game.screen.copy()
+        if self.caption is not None:
+            font = game.get_font(48)
+            text_surface = game.get_text(font, self.caption, YELLOW)
+            rect = text_surface.get_rect(center=(WIDTH / 2, HEIGHT / 3))
+            pygame.draw.rect(self.backdrop, BLACK, rect.inflate(40, 20), border_radius=10)
+            self.backdrop.blit(text_surface, rect)
+
+    def handle_event(self, event):
+        self.game.handle_event(event)
+
+    def update(self):
+        self.frames -= 1
+        if self.frames <= 0:
+            self.game.scenes.pop()
+
+    def draw(self):
+        self.game.screen.blit(self.backdrop, (0, 0))
+        self.game.present()
+
+class BossIntro(Hold):
+    caption = "WARNING: BOSS APPROACHING"
+
+    def __init__(self, game, boss_type):
+        super().__init__(game)
+        self.boss_type = boss_type
+
+    def prepare(self):
+        # The boss image, its hit flash and the angles it banks to (see variants.py)
+        preload_boss(self.game, self.boss_type)
+
+class LevelTransition(Hold):
+    def __init__(self, game, level):
+        super().__init__(game)
+        self.level = level
+        self.caption = f"Level {level}" if level <= game.max_level else f"Endless {level - game.max_level}"
+
+    def enter(self):
+        super().enter()
+        # Collected between frames, while the screen is held anyway (see gcpolicy.py)
+        self.game.gc_policy.level_start()
+
+    def prepare(self):
+        if self.level in LEVELS:
+            bake_level_paths(LEVELS[self.level])
+
+class Pause(Menu):
+    def __init__(self, game):
+        super().__init__(game)
+        self.backdrop = None
+
+    def enter(self):
+        game = self.game
+        self.backdrop = game.screen.copy()
+        shade = pygame.Surface((WIDTH, HEIGHT))
+        shade.set_alpha(140)
+        self.backdrop.blit(shade, (0, 0))
+        game.draw_text("PAUSED", 48, WHITE, WIDTH / 2, HEIGHT / 3, self.backdrop)
+        game.draw_text("Press P, ESC or ENTER to continue", 22, WHITE, WIDTH / 2, HEIGHT / 3 + 70, self.backdrop)
+
+    def handle_event(self, event):
+        super().handle_event(event)
+        if event.type == pygame.KEYDOWN and event.key in (pygame.K_p, pygame.K_ESCAPE, pygame.K_RETURN):
+            self.game.scenes.pop()
+
+    def draw(self):
+        if self.redraw:
+            self.redraw = False
+            self.game.screen.blit(self.backdrop, (0, 0))
+            self.game.present()
+
+class GameOver(Menu):
+    def __init__(self, game, restart=True):
+        super().__init__(game)
+        self.restart = restart # Any key goes back to the start screen, otherwise it ends the loop
+        self.run = None # Recorded when the screen is left, unless the run is retried
+        self.retried = False
+        self.next = None
+
+    def enter(self):
+        game = self.game
+        game.game_state = "GAME_OVER"
+        game.playing = False
+        game.gc_policy.game_over()
+        # Stop background music
+        game.audio.stop_music()
+        try:
+            replay.save(os.path.join(SAVE_DIR, "last.replay"), game)
+        except OSError as e:
+            print(f"Could not save replay: {e}")
+        self.run = Run(time.time(), game.score, min(game.current_level, game.max_level), game.difficulty,
+                       game.time, game.seed)
+        if self.restart:
+            self.next = StartScreen(game)
+            game.scenes.preload(self.next)
+
+    def handle_event(self, event):
+        super().handle_event(event)
+        game = self.game
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                game.running = False
+            elif event.key == pygame.K_r and game.last_checkpoint is not None:
+                # The retry goes on with the same run; it is recorded once, when it is over
+                self.retried = True
+                game.scenes.replace(Playing(game, retry=self.run))
+            elif self.restart:
+                game.scenes.replace(self.next)
+            else:
+                game.scenes.pop()
+
+    def exit(self):
+        if not self.retried:
+            self.game.scores.add(self.run)
+
+    def draw(self):
+        if not self.redraw:
+            return
+        self.redraw = False
+        game = self.game
+        game.screen.fill(BLACK)
+        game.draw_text("GAME OVER", 48, WHITE, WIDTH / 2, HEIGHT / 4)
+        game.draw_text(f"Final Score: {game.score}", 22, WHITE, WIDTH / 2, HEIGHT / 4 + 70)
+        # Leaderboard for this difficulty, read from the score index
+        game.draw_text(f"High Scores ({game.difficulty})", 24, YELLOW, WIDTH / 2, HEIGHT / 4 + 130)
+        for i, best in enumerate(game.scores.top(difficulty=game.difficulty, count=5, pending=self.run)):
+            color = YELLOW if best is self.run else WHITE
+            game.draw_text(f"{i + 1}.  {best.score}  (Level {best.level})", 22, color, WIDTH / 2, HEIGHT / 4 + 165 + i * 28)
+        game.draw_text("Press any key to play again (ESC to Quit)", 22, WHITE, WIDTH / 2, HEIGHT * 3 / 4)
+        if game.last_checkpoint is not None:
+            game.draw_text("Press R to retry from the last checkpoint", 22, WHITE, WIDTH / 2, HEIGHT * 3 / 4 + 35)
+        game.present()
+
+class Preloader:
+    """Runs prepare() of the scenes handed to it, one at a time, on a thread of its own"""
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = None
+
+    def preload(self, scene):
+        if scene.queued:
+            return
+        scene.queued = True
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="preload", daemon=True)
+            self.thread.start()
+        self.queue.put(scene)
+
+    def run(self):
+        while True:
+            scene = self.queue.get()
+            try:
+                scene.prepare()
+            except Exception as e:
+                scene.error = e
+            scene.prepared.set()
+
+    def wait(self, scene):
+        """Make sure scene is prepared, here and now if it was never preloaded"""
+        if not scene.queued:
+            scene.queued = True
+            scene.prepare()
+            scene.prepared.set()
+        scene.prepared.wait()
+        if scene.error is not None:
+            raise scene.error
+
+class SceneStack:
+    def __init__(self, game):
+        self.game = game
+        self.scenes = []
+        self.pending = [] # (operation, scene), applied between frames
+        self.preloader = Preloader()
+        self.transitions = 0
+        self.waited = 0.0 # Seconds transitions spent waiting for preloads
+        self.longest = 0.0 # Longest transition (preload wait and enter())
+
+    @property
+    def top(self):
+        return self.scenes[-1] if self.scenes else None
+
+    def push(self, scene):
+        self.pending.append(("push", scene))
+
+    def pop(self):
+        self.pending.append(("pop", None))
+
+    def replace(self, scene):
+        self.pending.append(("replace", scene))
+
+    def preload(self, scene):
+        self.preloader.preload(scene)
+
+    def wait(self, scene):
+        self.preloader.wait(scene)
+
+    def apply(self):
+        """Carry out the pending pushes and pops, then bring the new top scene up"""
+        if not self.pending:
+            return
+        top = self.top
+        pending, self.pending = self.pending, []
+        for operation, scene in pending:
+            if operation != "push" and self.scenes:
+                removed = self.scenes.pop()
+                if removed.entered:
+                    removed.exit()
+            if scene is not None:
+                self.scenes.append(scene)
+        scene = self.top
+        if scene is None or scene is top:
+            return
+        started = time.perf_counter()
+        if scene.entered:
+            scene.resume()
+        else:
+            self.wait(scene)
+            self.waited += time.perf_counter() - started
+            scene.entered = True
+            scene.enter()
+        self.transitions += 1
+        self.longest = max(self.longest, time.perf_counter() - started)
+        self.game.pacer.start() # The transition is not a frame
+
+    def run(self, scene):
+        """The main loop: drive the scene on top until the stack is empty or the game quits"""
+        game = self.game
+        self.push(scene)
+        self.apply()
+        while game.running and self.scenes:
+            scene = self.top
+            for event in scene.wait():
+                if event.type == pygame.QUIT:
+                    game.running = False
+                    game.playing = False
+                scene.handle_event(event)
+            scene.update()
+            scene.draw()
+            if game.running:
+                self.apply()
+        while self.scenes:
+            scene = self.scenes.pop()
+            if scene.entered:
+                scene.exit()
+        self.pending = []
+
+    def report(self):
+        return (f"Scenes: {self.transitions} transitions, {self.waited * 1000:.1f} ms waiting for preloads, "
+                f"longest transition {self.longest * 1000:.1f} ms")
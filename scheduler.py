@@ -0,0 +1,84 @@
+# Timer scheduler for Cosmic Clash
+
+# Sprites and the game register deadlines here instead of comparing the time against
+# their own timestamps every frame. Pending timers are kept in a min-heap, so each frame
+# only the timers that are due are looked at (O(expired), plus O(log n) per timer).
+#
+# The scheduler reads the time from a clock, any function returning milliseconds. The
+# game uses its simulation clock (Game.time), which stands still while the game is not
+# simulating and runs as fast as frames are simulated in unpaced replays and co-op
+# catch-up. Anything running at wall time could pass pygame.time.get_ticks instead.
+#
+# Timers that are due at the same time fire in order of their order key, (owner rank,
+# kind), never in the order they were registered. Snapshots only store the state the
+# timers are armed from (last_shot and so on), and a restored game registers its timers
+# again in a different order, so firing order must not depend on it.
+
+import heapq
+
+class Timer:
+    __slots__ = ("time", "callback", "order", "interval", "cancelled")
+
+    def __init__(self, time, callback, order, interval=None):
+        self.time = time
+        self.callback = callback
+        self.order = order
+        self.interval = interval # Milliseconds between calls of a recurring timer
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        self.callback = None # Stays in the heap until due, but no longer keeps its owner alive
+
+class Scheduler:
+    def __init__(self, clock):
+        self.clock = clock
+        self.heap = []
+        self.count = 0 # Timers registered, also breaks ties between identical order keys
+        self.fired = 0
+        self.next_rank = 1 # Rank 0 is the game's own timers
+
+    def new_rank(self):
+        """A rank for a new timer owner. Owners created later fire later on ties."""
+        self.next_rank += 1
+        return self.next_rank - 1
+
+    def at(self, time, callback, order=(0, 0)):
+        """Call callback() once the clock reaches time. Returns the Timer, to cancel it."""
+        return self.push(Timer(time, callback, order))
+
+    def every(self, interval, callback, order=(0, 0), start=None):
+        """Call callback() every interval milliseconds, counted from start (default now).
+        A late call does not shift the ones after it: they stay at start + n * interval."""
+        start = self.clock() if start is None else start
+        return self.push(Timer(start + interval, callback, order, interval))
+
+    def push(self, timer):
+        heapq.heappush(self.heap, (timer.time, timer.order, self.count, timer))
+        self.count += 1
+        return timer
+
+    def run(self):
+        """Fire every timer that is due, including ones registered by the callbacks"""
+        now = self.clock()
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            timer = heapq.heappop(heap)[3]
+            if timer.cancelled:
+                continue
+            self.fired += 1
+            timer.callback()
+            if timer.interval is not None and not timer.cancelled:
+                timer.time += timer.interval
+                self.push(timer)
+
+    def prune(self):
+        """Drop cancelled timers now instead of when they come due"""
+        self.heap = [entry for entry in self.heap if not entry[3].cancelled]
+        heapq.heapify(self.heap)
+
+    def clear(self):
+        self.heap.clear()
+
+    def __len__(self):
+        return len(self.heap)
@@ -0,0 +1,204 @@
+# High scores and run history for Cosmic Clash
+
+# Every finished run is appended to an append-only log (scores.log) of fixed-size,
+# CRC-checked records, so a crash can at worst lose the record being written.
+# A small index (scores.idx) keeps the top runs per difficulty and per level, together
+# with how much of the log it covers. At startup only the part of the log past that
+# point is read (normally nothing), torn records are cut off and the index rewritten.
+# All disk writes happen on a background thread; leaderboard queries are answered from
+# the in-memory index.
+
+import bisect
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+from settings import *
+
+Run = namedtuple("Run", "time score level difficulty duration seed")
+
+DIFFICULTY_NAMES = list(DIFFICULTY_LEVELS)
+
+RECORD = struct.Struct("<dIHBIQ")       # time, score, level reached, difficulty, duration (ms), seed
+CRC = struct.Struct("<I")
+ENTRY_SIZE = RECORD.size + CRC.size
+INDEX_MAGIC = b"CCSI"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sHQIH")  # magic, version, log bytes covered, total runs, list count
+INDEX_LIST = struct.Struct("<BHH")       # kind (0 = difficulty, 1 = level), key, run count
+
+def pack_run(run):
+    payload = RECORD.pack(run.time, run.score, run.level, DIFFICULTY_NAMES.index(run.difficulty), run.duration, run.seed)
+    return payload + CRC.pack(zlib.crc32(payload))
+
+def unpack_run(data, offset=0):
+    """Run stored at offset, or None if the record is damaged"""
+    payload = data[offset:offset + RECORD.size]
+    (crc,) = CRC.unpack_from(data, offset + RECORD.size)
+    if zlib.crc32(payload) != crc:
+        return None
+    run_time, score, level, difficulty, duration, seed = RECORD.unpack(payload)
+    if difficulty >= len(DIFFICULTY_NAMES):
+        return None
+    return Run(run_time, score, level, DIFFICULTY_NAMES[difficulty], duration, seed)
+
+class ScoreStore:
+    def __init__(self, directory=SAVE_DIR, keep=SCORE_INDEX_SIZE):
+        self.log_path = os.path.join(directory, "scores.log")
+        self.index_path = os.path.join(directory, "scores.idx")
+        self.keep = keep # Runs kept per leaderboard
+        self.lock = threading.Lock() # Guards the in-memory index shared with the writer
+        self.boards = {} # (kind, key) -> runs sorted by score, best first
+        self.total_runs = 0
+        self.indexed_bytes = 0 # Length of the log the index covers
+        os.makedirs(directory, exist_ok=True)
+        self.load_index()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.writer, name="score-writer", daemon=True)
+        self.thread.start()
+        # Catching up with the log and rewriting the index also happens on the writer thread
+        self.queue.put("compact")
+
+    def load_index(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+            magic, version, log_bytes, total_runs, list_count = INDEX_HEADER.unpack_from(data)
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                return
+            offset = INDEX_HEADER.size
+            boards = {}
+            for _ in range(list_count):
+                kind, key, count = INDEX_LIST.unpack_from(data, offset)
+                offset += INDEX_LIST.size
+                runs = []
+                for _ in range(count):
+                    run = unpack_run(data, offset)
+                    if run is None:
+                        return # Damaged index, rebuild it from the log
+                    runs.append(run)
+                    offset += ENTRY_SIZE
+                boards[(kind, key)] = runs
+        except (OSError, struct.error):
+            return
+        self.boards = boards
+        self.total_runs = total_runs
+        self.indexed_bytes = log_bytes
+
+    def add_to_index(self, run):
+        for board in ((0, DIFFICULTY_NAMES.index(run.difficulty)), (1, run.level)):
+            runs = self.boards.setdefault(board, [])
+            # Sorted best first; ties keep the earlier run ahead
+            position = bisect.bisect_right([-r.score for r in runs], -run.score)
+            if position < self.keep:
+                runs.insert(position, run)
+                del runs[self.keep:]
+        self.total_runs += 1
+
+    def record(self, score, level, difficulty, duration, seed):
+        """Record a finished run. Returns immediately; the disk write happens in the background."""
+        return self.add(Run(time.time(), score, level, difficulty, duration, seed))
+
+    def add(self, run):
+        """Record a Run made earlier (see scenes.GameOver)"""
+        with self.lock:
+            self.add_to_index(run)
+        self.queue.put(run)
+        return run
+
+    def top(self, difficulty=None, level=None, count=None, pending=None):
+        """Best runs for a difficulty or a level, straight from the index. A pending run
+        not recorded yet is ranked among them, after the runs with the same score."""
+        board = (0, DIFFICULTY_NAMES.index(difficulty)) if difficulty is not None else (1, level)
+        with self.lock:
+            runs = list(self.boards.get(board, []))
+        if pending is not None:
+            runs.insert(bisect.bisect_right([-r.score for r in runs], -pending.score), pending)
+        return runs[:count or self.keep]
+
+    def close(self, timeout=2.0):
+        """Let the writer finish pending records"""
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    # --- Writer thread ---
+
+    def writer(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            try:
+                if item == "compact":
+                    self.compact()
+                else:
+                    self.append(item)
+            except OSError as e:
+                print(f"Could not save scores: {e}")
+
+    def compact(self):
+        # Index the part of the log the index does not cover yet (normally nothing) and
+        # cut off a record left half written by a crash
+        try:
+            size = os.path.getsize(self.log_path)
+        except OSError:
+            size = 0
+        with self.lock:
+            start = self.indexed_bytes
+            if start > size or start % ENTRY_SIZE:
+                # The index does not belong to this log, rebuild it completely
+                self.boards = {}
+                self.total_runs = 0
+                start = 0
+        valid_end = start
+        if size > start:
+            with open(self.log_path, "rb") as f:
+                f.seek(start)
+                while True:
+                    chunk = f.read(ENTRY_SIZE * 4096)
+                    whole = len(chunk) - len(chunk) % ENTRY_SIZE
+                    runs = []
+                    for offset in range(0, whole, ENTRY_SIZE):
+                        run = unpack_run(chunk, offset)
+                        if run is None:
+                            break
+                        runs.append(run)
+                    with self.lock:
+                        for run in runs:
+                            self.add_to_index(run)
+                    valid_end += len(runs) * ENTRY_SIZE
+                    if len(runs) * ENTRY_SIZE < len(chunk) or not chunk:
+                        break
+            if valid_end != size:
+                print(f"Discarding {size - valid_end} damaged bytes at the end of {self.log_path}")
+                with open(self.log_path, "r+b") as f:
+                    f.truncate(valid_end)
+        with self.lock:
+            self.indexed_bytes = valid_end
+        self.write_index()
+
+    def append(self, run):
+        with open(self.log_path, "ab") as f:
+            f.write(pack_run(run))
+            f.flush()
+            os.fsync(f.fileno())
+            end = f.tell()
+        with self.lock:
+            self.indexed_bytes = end
+        self.write_index()
+
+    def write_index(self):
+        with self.lock:
+            boards = sorted(self.boards.items())
+            parts = [INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.indexed_bytes, self.total_runs, len(boards))]
+            for (kind, key), runs in boards:
+                parts.append(INDEX_LIST.pack(kind, key, len(runs)))
+                parts.extend(pack_run(run) for run in runs)
+        # Replace atomically so a crash leaves either the old or the new index
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(b"".join(parts))
+        os.replace(temp_path, self.index_path)
@@ -1,10 +1,15 @@
 # Settings for Cosmic Clash
 
-import pygame
-
 # --- Screen Dimensions ---
+# Logical render resolution. The game is drawn into an internal surface of this size
+# and scaled once per frame to the real window, so it can be lowered on weak machines.
 WIDTH = 1280
 HEIGHT = 800
+# Initial size of the (resizable) window
+WINDOW_WIDTH = 1280
+WINDOW_HEIGHT = 800
+# How the internal surface is scaled to the window: "smooth" or "integer" (nearest, whole multiples only)
+SCALE_MODE = "smooth"
 
 # --- Colors ---
 WHITE = (255, 255, 255)
@@ -22,7 +27,51 @@ GREY = (150, 150, 150) # Final Boss
 # --- Game Settings ---
 FPS = 60
 TITLE = "Cosmic Clash"
-FONT_NAME = pygame.font.match_font("arial") # Or choose a specific pixel font later
+FONT_NAME = "arial" # System font name, resolved once and cached (see startup.py). Or choose a specific pixel font later
+SAVE_DIR = "saves" # Checkpoints and other local data
+CHECKPOINT_INTERVAL = 1000 # Milliseconds between automatic checkpoints while playing
+SCORE_INDEX_SIZE = 10 # Runs kept per leaderboard (per difficulty and per level)
+MENU_IDLE_TIMEOUT = 1000 # Longest time (ms) a menu blocks waiting for input when nothing animates
+CAPTURE_FORMAT = "raw" # Gameplay recording: "raw" (one video stream, cheap enough for live play) or "png" (numbered images)
+CAPTURE_RING_SIZE = 8 # Frame buffers waiting for the encoder before frames get dropped
+CAPTURE_WORKERS = 2 # Threads encoding PNG frames
+GC_MODE = "default" # "low-latency" freezes long-lived objects and collects between levels (see gcpolicy.py)
+GC_PLAY_THRESHOLDS = (20000, 50, 1000) # gc thresholds while playing in low-latency mode
+GC_RECENT_PAUSES = 256 # Collections kept for the longest-recent-pause metric
+TELEMETRY_HOST = "127.0.0.1" # The metrics endpoint only listens locally (see telemetry.py)
+TELEMETRY_WINDOW = 600 # Frames the FPS and frame-time percentiles are computed over
+TELEMETRY_SAMPLE_FRAMES = 30 # Frames between samples of the sprite counts and cache sizes
+TELEMETRY_JSON_INTERVAL = 10 # Seconds between JSON telemetry snapshots
+VISIBILITY_MARGIN = 8 # Pixels off screen a sprite is still drawn and collided (see visibility.py)
+ACTIVATION_BAND = 48 # Pixels off screen beyond which sprites only move (dormant)
+LATENCY_POLL_INTERVAL = 1 # ms between event polls while the low-latency loop waits (see latency.py)
+LATENCY_ESTIMATE_FRAMES = 60 # Frames the time from reading input to the flip is estimated over
+LATENCY_ESTIMATE_QUANTILE = 0.9 # Quantile of those times the low-latency loop plans for
+LATENCY_MARGIN = 1 # ms added to that estimate, so a flip is rarely late
+LATENCY_WINDOW = 600 # Input events the latency quantiles are computed over
+MUSIC_PATH = "assets/audio.wav"
+MUSIC_VOLUME = 0.5
+SFX_DIR = "assets/sfx" # <effect name>.wav; missing effects get a made-up placeholder (see audio.py)
+EFFECTS_VOLUME = 0.6
+AUDIO_CHANNELS = 16 # Mixer channels for effects
+# Most voices each category of effects may use at once
+AUDIO_VOICE_CAPS = {"shots": 4, "enemy_shots": 3, "impacts": 3, "explosions": 4, "pickups": 2}
+AUDIO_MERGE_BOOST = 0.15 # Extra volume per copy of an effect merged into one in the same frame
+ASSET_SOFT_EDGE_SHARE = 0.05 # Share of partly transparent pixels an image may have and still be snapped to a colorkey (see formats.py)
+ASSET_ALPHA_THRESHOLD = 128 # Alpha from which a snapped pixel is kept
+ROTATION_DEFAULT_STEPS = 64 # Angles an image can be drawn rotated to (see variants.py)
+ROTATION_STEPS = {"bullet_enemy": 32} # ... per asset, where the default doesn't fit
+ROTATION_PRELOAD = ("bullet_enemy",) # Rotated to every angle as the images load, the others when first drawn
+VARIANT_CACHE_BYTES = 8 * 1024 * 1024 # Most memory kept for rotated variants made when first drawn
+PACING = "tick" # How the game loops wait for the next frame: tick, busy, hybrid or vsync (see pacing.py)
+PACING_INITIAL_MARGIN = 2 # ms hybrid pacing spins before a deadline until it has calibrated
+PACING_SPIN_MARGIN = 0.25 # ms spun on top of the longest recent oversleep
+PACING_MARGIN_SAMPLES = 120 # Sleeps the oversleep is calibrated over
+PACING_VSYNC_SLACK = 0.25 # Part of a frame vsync pacing stops waiting early, for the flip to line up
+PACING_MISS_TOLERANCE = 0.5 # A frame interval longer than 1.5 frames is a missed deadline
+AUDIT_TRACE_FRAMES = 1 # Stack frames tracemalloc keeps per allocation while auditing (see audit.py)
+AUDIT_TOP_ALLOCATIONS = 10 # Allocation sites listed in each audit report
+AUDIT_TOP_TYPES = 10 # Object types with the largest growth listed in each audit report
 
 # --- Player Settings ---
 PLAYER_WIDTH = 40
@@ -32,12 +81,29 @@ PLAYER_SHOOT_DELAY_BASE = 250 # milliseconds
 PLAYER_MAX_POWER_LEVEL = 6
 PLAYER_POWERUP_DURATION = 10000 # milliseconds (10 seconds)
 PLAYER_LIVES = 3
+PLAYER_TWO_TINT = (255, 140, 140) # Multiplied into the second ship in co-op
+PLAYER_POWER_TINTS = [WHITE, (255, 250, 215), (255, 240, 185), (255, 230, 155), (255, 220, 125), (255, 205, 100), (255, 190, 80)] # Ship tint per power level
+# Bits of a player's input for one frame (the only thing co-op peers exchange)
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_UP = 4
+INPUT_DOWN = 8
 
 # --- Bullet Settings ---
 BULLET_WIDTH = 5
 BULLET_HEIGHT = 10
 BULLET_VEL = 7
 ENEMY_BULLET_VEL_MULT = 0.8 # Enemy bullets are 80% speed of player bullets
+PROJECTILE_CAPACITY = 4096 # Most boss bullets on screen at once (see projectiles.py)
+
+# --- Particle Settings ---
+PARTICLE_BUDGET = 20000 # Most particles alive at once (see particles.py)
+PARTICLE_DRAG = 0.96 # Particles keep this much of their speed every frame
+PARTICLE_FIRE_COLORS = [(255, 230, 160), (255, 170, 60), (255, 110, 30), (200, 60, 20)]
+THRUSTER_COLORS = [(140, 200, 255), (90, 140, 255), (255, 180, 90)]
+ENEMY_BURST_PARTICLES = 80 # Per destroyed enemy
+BOSS_BURST_PARTICLES = 3000
+THRUSTER_PARTICLES = 3 # Per ship per frame
 
 # --- Enemy Settings ---
 ENEMY_WIDTH = 35
@@ -45,6 +111,7 @@ ENEMY_HEIGHT = 35
 ENEMY_VEL_BASE = 2 # Base downward speed
 ENEMY_SHOOT_DELAY_BASE = 1500 # Base delay for shooters
 ENEMY_SKIP_SCORE = 5 # Score awarded for skipping an enemy
+ENEMY_BANK_ANGLE = 15 # Degrees zigzag enemies lean towards where they fly
 
 # --- Boss Settings ---
 BOSS_WIDTH = 100
@@ -52,6 +119,19 @@ BOSS_HEIGHT = 80
 BOSS_HEALTH_BASE = 100 # Per level
 BOSS_VEL_BASE = 1
 BOSS_SHOOT_DELAY_BASE = 1000
+BOSS_HIT_FLASH_DURATION = 50 # Milliseconds the boss flashes after a hit
+BOSS_BANK_ANGLE = 6 # Degrees a boss leans towards where it sweeps
+BOSS_HIT_FLASH_COLOR = (110, 110, 110) # Added to the boss image while flashing
+
+# --- Endless Mode Settings ---
+ENDLESS_MAX_ENEMIES = 24 # Waves stop spawning while this many enemies are alive
+ENDLESS_BULLET_PRESSURE = 120 # ... or while this many enemy bullets are flying
+ENDLESS_MAX_INTENSITY = 4.0 # Upper limit of the wave difficulty curve (see endless.py)
+ENDLESS_MAX_DIFFICULTY_MULT = 3.0 # time_based_difficulty_multiplier stops rising here in endless mode
+ENDLESS_BOSS_EVERY = 8 # Every 8th wave is a boss
+ENDLESS_WAVE_PAUSE = 2000 # Milliseconds before the first spawn of a wave
+ENDLESS_BOSS_WAIT = 20000 # Longest a boss waits for the last enemies of the wave before it comes anyway
+ENEMY_BULLET_CAP = 200 # Shooters hold fire while this many enemy bullets are flying
 
 # --- PowerUp Settings ---
 POWERUP_WIDTH = 25
@@ -59,6 +139,13 @@ POWERUP_HEIGHT = 25
 POWERUP_VEL = 3
 POWERUP_DROP_CHANCE = 0.1 # Base chance
 
+# --- Co-op Settings ---
+NET_PORT = 47210 # UDP port of player one; player two uses the next one
+NET_INPUT_DELAY = 1 # Frames local input is delayed, fewer rollbacks at the cost of latency
+NET_MAX_ROLLBACK = 8 # Furthest (in frames) the game may run ahead of the other player's input
+NET_CHECKSUM_INTERVAL = 30 # Frames between state checksums sent for desync detection
+NET_TIMEOUT = 5000 # Milliseconds without a packet before the other player counts as gone
+
 # --- Difficulty Settings ---
 # Multipliers applied based on selected difficulty
 DIFFICULTY_LEVELS = {
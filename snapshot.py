@@ -0,0 +1,297 @@
+# Binary snapshots of the game simulation for Cosmic Clash
+
+# capture() packs the whole simulation state (level progress, players, enemies, bullets,
+# power-ups, boss, boss projectiles, explosions, the endless mode spawn stream and the
+# RNG state) into a compact
+# versioned byte string and restore() rebuilds a running game from one. All timers run
+# on the game's simulation clock, which is saved too, so they are stored as they are.
+# Co-op rollback (netplay.py) takes one of these every frame, so both have to stay cheap,
+# and two games in the same state must produce identical bytes.
+
+import os
+import struct
+import threading
+import zlib
+import numpy as np
+from settings import *
+from levels import LEVELS, PATHS, BOSS_PATTERNS
+import endless
+from sprites import Enemy, Bullet, EnemyBullet, PowerUp, Boss
+from explosion import Explosion
+
+MAGIC = b"CCSN"
+VERSION = 5 # 5: enemies waiting to shoot and the boss hit flash
+
+GAME_STATES = ["START_SCREEN", "PLAYING", "BOSS_FIGHT", "GAME_OVER"]
+ENEMY_TYPES = ["basic", "zigzag", "shooter"]
+BOSS_TYPES = list(BOSS_PATTERNS)
+PATH_NAMES = sorted(PATHS)
+
+# All records are little endian. Times are in ms of the simulation clock.
+HEADER = struct.Struct("<4sHI")           # magic, version, crc32 of the body
+GAME = struct.Struct("<IBiiiiBdii")       # frame, state, level, score, wave, enemies killed, difficulty, time difficulty mult, last power increase, last obstacle increase
+ENDLESS = struct.Struct("<BIIdi")         # endless run, wave number, spawns done in it, wave intensity, next spawn time
+PLAYER = struct.Struct("<iiiiBBiiH")      # x, y, lives, power level, hidden, out, hide time, last shot, powerup timer count
+TIMER = struct.Struct("<i")               # end of a powerup timer
+COUNT = struct.Struct("<I")
+ENEMY = struct.Struct("<BiidddihddB")     # type, x, y, vel_y, speed_x, shoot delay, last shot, path (-1 for none), path_pos, path_step, waiting to shoot
+BULLET = struct.Struct("<ii")             # x, y
+ENEMY_BULLET = struct.Struct("<iid")      # x, y, speed_y
+POWERUP = struct.Struct("<ii")            # x, y
+BOSS = struct.Struct("<BiiddddBBiH")      # type, x, y, speed_x, speed_y, health, max health, entry complete, phase, end of the hit flash (-1 for none), emitter count
+EMITTER = struct.Struct("<dd")            # current angle, time of next volley
+EXPLOSION = struct.Struct("<iiBiB")       # center x, center y, frame index, last frame change, scale
+RNG = struct.Struct("<625IBd")            # Mersenne Twister state, has gauss_next, gauss_next
+
+def capture(game):
+    """Pack the current simulation state into bytes"""
+    parts = []
+    add = parts.append
+
+    add(GAME.pack(game.frame, GAME_STATES.index(game.game_state), game.current_level, game.score, game.current_wave,
+                  game.enemies_killed_this_level, game.difficulty_options.index(game.difficulty),
+                  game.time_based_difficulty_multiplier, game.last_power_increase_time,
+                  game.last_obstacle_difficulty_increase_time))
+    if game.endless_spawns is not None:
+        number, intensity, index, _, _ = game.endless_next
+        add(ENDLESS.pack(True, number, index, intensity, game.endless_due))
+    else:
+        add(ENDLESS.pack(False, 0, 0, 0.0, 0))
+
+    add(COUNT.pack(len(game.players)))
+    for player in game.players:
+        add(PLAYER.pack(player.rect.x, player.rect.y, player.lives, player.power_level, player.hidden, player.out,
+                        player.hide_timer, player.last_shot, len(player.powerup_timers)))
+        for timer_end in player.powerup_timers:
+            add(TIMER.pack(timer_end))
+
+    enemies = game.enemies.sprites()
+    add(COUNT.pack(len(enemies)))
+    for enemy in enemies:
+        path_index = PATH_NAMES.index(enemy.path_name) if enemy.path_name is not None else -1
+        add(ENEMY.pack(ENEMY_TYPES.index(enemy.enemy_type), enemy.rect.x, enemy.rect.y, enemy.vel_y, enemy.speed_x,
+                       enemy.shoot_delay, enemy.last_shot, path_index, enemy.path_pos, enemy.path_step, enemy.waiting_to_shoot))
+
+    bullets = game.bullets.sprites()
+    add(COUNT.pack(len(bullets)))
+    add(b"".join([BULLET.pack(bullet.rect.x, bullet.rect.y) for bullet in bullets]))
+
+    enemy_bullets = game.enemy_bullets.sprites()
+    add(COUNT.pack(len(enemy_bullets)))
+    add(b"".join([ENEMY_BULLET.pack(bullet.rect.x, bullet.rect.y, bullet.speed_y) for bullet in enemy_bullets]))
+
+    powerups = game.powerups.sprites()
+    add(COUNT.pack(len(powerups)))
+    add(b"".join([POWERUP.pack(powerup.rect.x, powerup.rect.y) for powerup in powerups]))
+
+    boss = game.boss_group.sprite
+    add(COUNT.pack(boss is not None))
+    if boss is not None:
+        emitters = [emitter for _, phase in boss.pattern.phases for emitter in phase]
+        add(BOSS.pack(BOSS_TYPES.index(boss.boss_type), boss.rect.x, boss.rect.y, boss.speed_x, boss.speed_y,
+                      boss.health, boss.max_health, boss.entry_complete, boss.pattern.phase_index,
+                      boss.flash_timer.time if boss.flash_timer is not None else -1, len(emitters)))
+        for emitter in emitters:
+            add(EMITTER.pack(emitter.angle, emitter.next_shot))
+
+    store = game.projectiles
+    add(COUNT.pack(store.count))
+    add(store.pos[:store.count].tobytes())
+    add(store.vel[:store.count].tobytes())
+
+    explosions = [sprite for sprite in game.all_sprites if isinstance(sprite, Explosion)]
+    add(COUNT.pack(len(explosions)))
+    add(b"".join([EXPLOSION.pack(explosion.rect.centerx, explosion.rect.centery, explosion.frame_index,
+                                 explosion.last_update, explosion.scale) for explosion in explosions]))
+
+    _, internal, gauss_next = game.rng.getstate()
+    add(RNG.pack(*internal, gauss_next is not None, gauss_next or 0.0))
+
+    body = b"".join(parts)
+    return HEADER.pack(MAGIC, VERSION, zlib.crc32(body)) + body
+
+class _Reader:
+    def __init__(self, data, offset):
+        self.data = data
+        self.offset = offset
+
+    def read(self, record):
+        values = record.unpack_from(self.data, self.offset)
+        self.offset += record.size
+        return values
+
+    def read_many(self, record, count):
+        end = self.offset + record.size * count
+        values = record.iter_unpack(self.data[self.offset:end])
+        self.offset = end
+        return values
+
+    def read_array(self, shape):
+        end = self.offset + 4 * shape[0] * shape[1]
+        array = np.frombuffer(self.data[self.offset:end], np.float32).reshape(shape)
+        self.offset = end
+        return array
+
+def restore(game, data):
+    """Replace the running game's simulation state with a snapshot from capture()"""
+    magic, version, crc = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a Cosmic Clash snapshot")
+    if version != VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+    if zlib.crc32(memoryview(data)[HEADER.size:]) != crc:
+        raise ValueError("Snapshot is corrupt")
+    reader = _Reader(data, HEADER.size)
+
+    # Throw away everything but the players
+    for sprite in game.all_sprites.sprites():
+        if sprite not in game.players:
+            sprite.kill()
+    game.projectiles.clear()
+    game.particles.clear()
+    game.scheduler.clear() # Every timer is registered again from the restored state
+
+    frame, state, level, score, wave, killed, difficulty, time_mult, power_time, obstacle_time = reader.read(GAME)
+    game.frame = frame
+    game.time = frame * 1000 // FPS
+    if game.difficulty != game.difficulty_options[difficulty]:
+        game.set_difficulty(game.difficulty_options[difficulty])
+    game.game_state = GAME_STATES[state]
+    game.current_level = level
+    if level in LEVELS or endless.is_endless(game.start_level): # Past the last level once the game is beaten
+        game.load_level_data()
+    game.score = score
+    game.current_wave = wave
+    game.enemies_killed_this_level = killed
+    game.time_based_difficulty_multiplier = time_mult
+    game.last_power_increase_time = power_time
+    game.last_obstacle_difficulty_increase_time = obstacle_time
+    game.arm_timers()
+
+    # The spawn stream is made again from where it was (see endless.py)
+    active, number, index, intensity, due = reader.read(ENDLESS)
+    if active:
+        game.start_endless(number, index, intensity, due)
+    else:
+        game.endless_spawns = None
+
+    (count,) = reader.read(COUNT)
+    if count != len(game.players):
+        raise ValueError(f"Snapshot has {count} players, the game has {len(game.players)}")
+    for player in game.players:
+        x, y, player.lives, player.power_level, hidden, out, player.hide_timer, player.last_shot, timer_count = reader.read(PLAYER)
+        player.rect.topleft = (x, y)
+        player.hidden = bool(hidden)
+        player.out = bool(out)
+        player.powerup_timers = [timer_end for (timer_end,) in reader.read_many(TIMER, timer_count)]
+        player.arm_timers()
+
+    (count,) = reader.read(COUNT)
+    for enemy_type, x, y, vel_y, speed_x, shoot_delay, last_shot, path_index, path_pos, path_step, waiting in reader.read_many(ENEMY, count):
+        path_name = PATH_NAMES[path_index] if path_index >= 0 else None
+        enemy = Enemy(game, x, y, ENEMY_TYPES[enemy_type], path=path_name)
+        enemy.rect.topleft = (x, y)
+        enemy.vel_y = vel_y
+        enemy.speed_x = speed_x
+        enemy.shoot_delay = shoot_delay
+        enemy.last_shot = last_shot
+        enemy.path_pos = path_pos
+        enemy.path_step = path_step
+        if waiting:
+            # No timer: the shot is armed when the shooter can fire (see Enemy.shoot)
+            enemy.shot_timer.cancel()
+            enemy.shot_timer = None
+            enemy.waiting_to_shoot = True
+        elif enemy.shot_timer is not None:
+            enemy.schedule_shot()
+
+    (count,) = reader.read(COUNT)
+    for x, y in reader.read_many(BULLET, count):
+        bullet = Bullet(game, 0, 0)
+        bullet.rect.topleft = (x, y)
+
+    (count,) = reader.read(COUNT)
+    for x, y, speed_y in reader.read_many(ENEMY_BULLET, count):
+        bullet = EnemyBullet(game, 0, 0)
+        bullet.rect.topleft = (x, y)
+        bullet.speed_y = speed_y
+
+    (count,) = reader.read(COUNT)
+    for x, y in reader.read_many(POWERUP, count):
+        powerup = PowerUp(game, (0, 0))
+        powerup.rect.topleft = (x, y)
+
+    (has_boss,) = reader.read(COUNT)
+    if has_boss:
+        boss_type, x, y, speed_x, speed_y, health, max_health, entry_complete, phase, flash_end, emitter_count = reader.read(BOSS)
+        boss = Boss(game, level, BOSS_TYPES[boss_type])
+        boss.rect.topleft = (x, y)
+        boss.speed_x = speed_x
+        boss.speed_y = speed_y
+        boss.health = health
+        boss.max_health = max_health
+        boss.entry_complete = bool(entry_complete)
+        boss.pattern.phase_index = phase
+        if flash_end >= 0:
+            boss.flash(flash_end)
+        emitters = [emitter for _, emitters in boss.pattern.phases for emitter in emitters]
+        for emitter, (angle, next_shot) in zip(emitters, reader.read_many(EMITTER, emitter_count)):
+            emitter.angle = angle
+            emitter.next_shot = next_shot
+
+    (count,) = reader.read(COUNT)
+    store = game.projectiles
+    count = min(count, store.capacity)
+    store.pos[:count] = reader.read_array((count, 2))
+    store.vel[:count] = reader.read_array((count, 2))
+    store.count = count
+    store.moved = count
+
+    (count,) = reader.read(COUNT)
+    for x, y, frame_index, last_update, scale in reader.read_many(EXPLOSION, count):
+        explosion = Explosion(game, (x, y), scale)
+        explosion.frame_index = frame_index
+        explosion.image = explosion.frames[frame_index]
+        explosion.rect = explosion.image.get_rect(center=(x, y))
+        explosion.last_update = last_update
+        explosion.schedule()
+
+    # Last, since creating the sprites above draws from the rng
+    values = reader.read(RNG)
+    game.rng.setstate((3, tuple(values[:625]), values[626] if values[625] else None))
+
+def load(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+class CheckpointWriter:
+    """Writes snapshots to disk on a background thread so the game loop never waits on I/O"""
+    def __init__(self, path):
+        self.path = path
+        self.pending = None # Only the newest unwritten snapshot is kept
+        self.written = 0
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="checkpoint-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, data):
+        with self.condition:
+            self.pending = data
+            self.condition.notify()
+
+    def run(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                data, self.pending = self.pending, None
+            # Write to a temporary file first so a crash never leaves a half-written checkpoint
+            temp_path = self.path + ".tmp"
+            try:
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, self.path)
+                self.written += 1
+            except OSError as e:
+                print(f"Could not write checkpoint: {e}")
@@ -1,60 +1,107 @@
 import pygame
-import random
 from settings import *
+from emitters import BossPattern
+from paths import get_path
+from surfaces import multiply_colors
+from variants import heading_of
 
 vec = pygame.math.Vector2  # For potential vector math later
 
 class Player(pygame.sprite.Sprite):
-    def __init__(self, game, color=BLUE):
+    visible = True # Flagged every frame (see visibility.py)
+    dormant_update = None # Always fully updated
+    heading = None # Drawn as is (see variants.py)
+
+    def __init__(self, game, index=0, spawn_x=WIDTH / 2, color=BLUE):
         super().__init__(game.all_sprites)
         self.game = game
-        self.image = self.game.assets.get("player", pygame.Surface([int(PLAYER_WIDTH * 1.5), int(PLAYER_HEIGHT * 1.5)]))
-        if "player" not in self.game.assets:
-            self.image.fill(color)
+        self.index = index # 0 for player one, 1 for player two in co-op
+        self.base_image = self.game.surfaces.image("player", (int(PLAYER_WIDTH * 1.5), int(PLAYER_HEIGHT * 1.5)), color)
+        self.image_power = None # Power level the current image is tinted for
+        self.power_level = 0
+        self.update_image()
         self.rect = self.image.get_rect()
-        self.rect.centerx = WIDTH / 2
+        self.spawn_x = spawn_x
+        self.rect.centerx = self.spawn_x
         self.rect.bottom = HEIGHT - 10
         self.speed_x = 0
         self.speed_y = 0
+        self.input = 0 # INPUT_* bits held this frame, set by the game before each update
         self.shoot_delay_base = PLAYER_SHOOT_DELAY_BASE
-        self.last_shot = pygame.time.get_ticks()
-        self.power_level = 0
+        self.last_shot = self.game.time
         self.powerup_timers = []
         self.lives = PLAYER_LIVES
         self.hidden = False
-        self.hide_timer = pygame.time.get_ticks()
+        self.out = False # Out of lives (only reached in co-op, otherwise the game ends)
+        self.hide_timer = self.game.time
         self.current_player_vel = PLAYER_VEL  # Base velocity
+        # Shooting, power-up expiry and respawning run on timers (see scheduler.py)
+        self.rank = self.game.scheduler.new_rank()
+        self.shot_timer = None
+        self.powerup_timer = None
+        self.respawn_timer = None
+        self.arm_timers()
+
+    def arm_timers(self):
+        """Register the player's timers from its state, after creation or a snapshot restore"""
+        self.schedule_shot()
+        self.schedule_powerup_expiry()
+        if self.respawn_timer is not None:
+            self.respawn_timer.cancel()
+            self.respawn_timer = None
+        if self.hidden and not self.out:
+            self.respawn_timer = self.game.scheduler.at(self.hide_timer + 1000, self.respawn, (self.rank, 2))
+
+    def schedule_shot(self):
+        # The next shot is due once the delay for the current power level has passed
+        if self.shot_timer is not None:
+            self.shot_timer.cancel()
+        current_shoot_delay = self.shoot_delay_base / (1 + self.power_level * 0.2)
+        self.shot_timer = self.game.scheduler.at(self.last_shot + current_shoot_delay, self.shoot_when_ready, (self.rank, 0))
+
+    def schedule_powerup_expiry(self):
+        # One timer for the power-up that runs out first
+        if self.powerup_timer is not None:
+            self.powerup_timer.cancel()
+            self.powerup_timer = None
+        if self.powerup_timers:
+            self.powerup_timer = self.game.scheduler.at(self.powerup_timers[0], self.expire_powerups, (self.rank, 1))
+
+    def update_image(self):
+        # The ship glows warmer with each power level; the second ship in co-op is tinted
+        # to tell them apart. Every combination is built once by the surface cache.
+        if self.image_power == self.power_level:
+            return
+        self.image_power = self.power_level
+        tint = PLAYER_POWER_TINTS[min(self.power_level, len(PLAYER_POWER_TINTS) - 1)]
+        if self.index == 1:
+            tint = multiply_colors(tint, PLAYER_TWO_TINT)
+        self.image = self.game.surfaces.tinted("player", self.base_image, tint)
 
     def update(self):
-        # Debug: Check if update is called
-        print("Player update called")
+        pass # The players move after everything else, in Game.update_players (see latency.py)
 
-        if self.hidden:
-            if pygame.time.get_ticks() - self.hide_timer > 1000:
-                self.hidden = False
-                self.rect.centerx = WIDTH / 2
-                self.rect.bottom = HEIGHT - 10
+    def move(self):
+        self.update_image()
+        if self.out:
             return
 
+        if self.hidden:
+            return # Until respawn()
+
         # Reset speeds each frame
         self.speed_x = 0
         self.speed_y = 0
 
-        # Get keyboard state (support both WASD and arrow keys)
-        keystate = pygame.key.get_pressed()
-        
-        # Debug: Check if keys are pressed and speeds are set
-        if keystate[pygame.K_LEFT]:
-            print("Key LEFT pressed")
+        # Directions held this frame. They come from the keyboard or, for the remote
+        # player in co-op, from the network (see read_input in main.py).
+        if self.input & INPUT_LEFT:
             self.speed_x = -3
-        if keystate[pygame.K_RIGHT]:
-            print("Key RIGHT pressed")
+        if self.input & INPUT_RIGHT:
             self.speed_x = 3
-        if keystate[pygame.K_UP]:
-            print("Key UP pressed")
+        if self.input & INPUT_UP:
             self.speed_y = -3
-        if keystate[pygame.K_DOWN]:
-            print("Key DOWN pressed")
+        if self.input & INPUT_DOWN:
             self.speed_y = 3
 
         # Normalize diagonal movement
@@ -63,45 +110,43 @@ class Player(pygame.sprite.Sprite):
             self.speed_x *= diagonal_factor
             self.speed_y *= diagonal_factor
 
-        # Debug: Check final speed values
-        if self.speed_x != 0 or self.speed_y != 0:
-            print(f"Final speed: ({self.speed_x:.2f}, {self.speed_y:.2f})")
-
         # Increase player speed based on power level
         current_player_vel = PLAYER_VEL + (self.power_level * 0.5)
 
-        # Apply movement based on calculated speed and direction
-        self.rect.x += self.speed_x * current_player_vel * self.game.dt
-        self.rect.y += self.speed_y * current_player_vel * self.game.dt
+        # Apply movement based on calculated speed and direction (fixed time step)
+        self.rect.x += self.speed_x * current_player_vel / FPS
+        self.rect.y += self.speed_y * current_player_vel / FPS
+
+        self.game.particles.trail(self.rect.midbottom, THRUSTER_PARTICLES, 3, 18, THRUSTER_COLORS)
 
         # Keep player on screen (adjusted for larger size)
         self.rect.x = max(0, min(WIDTH - self.rect.width, self.rect.x))
         self.rect.y = max(HEIGHT // 2, min(HEIGHT - self.rect.height, self.rect.y))
 
-        # Automatic shooting
-        now = pygame.time.get_ticks()
-        current_shoot_delay = self.shoot_delay_base / (1 + self.power_level * 0.2)
-        if now - self.last_shot > current_shoot_delay:
-            self.shoot()
-
-        # Update power level
+    def expire_powerups(self):
+        self.powerup_timer = None
+        now = self.game.time
         expired_count = 0
-        remaining_timers = []
-        for timer_end in self.powerup_timers:
-            if now < timer_end:
-                remaining_timers.append(timer_end)
-            else:
-                expired_count += 1
-        if expired_count > 0:
-            self.power_level = max(0, self.power_level - expired_count)
-            self.powerup_timers = remaining_timers
-            self.current_player_vel = PLAYER_VEL + (self.power_level * 1.5)
+        while self.powerup_timers and self.powerup_timers[0] <= now:
+            self.powerup_timers.pop(0)
+            expired_count += 1
+        self.power_level = max(0, self.power_level - expired_count)
+        self.current_player_vel = PLAYER_VEL + (self.power_level * 1.5)
+        self.schedule_powerup_expiry()
+        self.schedule_shot()
+
+    def shoot_when_ready(self):
+        # Automatic shooting. A hidden player shoots again when it respawns.
+        self.shot_timer = None
+        if not self.hidden and not self.out:
+            self.shoot()
 
     def shoot(self):
         if self.hidden:
             return
-        now = pygame.time.get_ticks()
+        now = self.game.time
         self.last_shot = now
+        self.game.audio.play("player_shot")
         offset = int(5 * 1.5)
         if self.power_level == 0:
             Bullet(self.game, self.rect.centerx, self.rect.top)
@@ -112,122 +157,197 @@ class Player(pygame.sprite.Sprite):
             Bullet(self.game, self.rect.left + offset, self.rect.centery)
             Bullet(self.game, self.rect.centerx, self.rect.top)
             Bullet(self.game, self.rect.right - offset, self.rect.centery)
+        self.schedule_shot()
 
     def collect_powerup(self):
-        if self.hidden:
+        if self.hidden or self.out:
             return
         if self.power_level < PLAYER_MAX_POWER_LEVEL:
             self.power_level += 1
-        self.powerup_timers.append(pygame.time.get_ticks() + PLAYER_POWERUP_DURATION)
+        self.powerup_timers.append(self.game.time + PLAYER_POWERUP_DURATION)
         self.powerup_timers.sort()
+        self.schedule_powerup_expiry()
+        self.schedule_shot()
+
+    def clear_powerups(self):
+        self.power_level = 0
+        self.powerup_timers = []
+        self.schedule_powerup_expiry()
+        self.schedule_shot()
 
     def hide(self):
         self.hidden = True
-        self.hide_timer = pygame.time.get_ticks()
+        self.hide_timer = self.game.time
         self.rect.center = (WIDTH / 2, HEIGHT + 200)
+        self.arm_timers() # Respawns a second later
+
+    def respawn(self):
+        if self.respawn_timer is not None:
+            self.respawn_timer.cancel()
+            self.respawn_timer = None
+        if self.out:
+            return
+        self.hidden = False
+        self.rect.centerx = self.spawn_x
+        self.rect.bottom = HEIGHT - 10
+        self.schedule_shot()
 
 class Enemy(pygame.sprite.Sprite):
-    def __init__(self, game, x, y, enemy_type="basic"):
+    visible = True # Flagged every frame (see visibility.py)
+
+    def __init__(self, game, x, y, enemy_type="basic", path=None, path_delay=0):
         super().__init__(game.all_sprites, game.enemies)
         self.game = game
         self.enemy_type = enemy_type
         self.diff_mult = self.game.difficulty_multipliers
-        image_key = f"enemy_{enemy_type}"
-        self.image = self.game.assets.get(image_key, pygame.Surface([int(ENEMY_WIDTH * 1.5), int(ENEMY_HEIGHT * 1.5)]))
-        if image_key not in self.game.assets:
-            if enemy_type == "basic":
-                self.image.fill(GREEN)
-            elif enemy_type == "zigzag":
-                self.image.fill(TEAL)
-            elif enemy_type == "shooter":
-                self.image.fill(BROWN)
+        placeholder_colors = {"basic": GREEN, "zigzag": TEAL, "shooter": BROWN}
+        self.image_key = f"enemy_{enemy_type}"
+        self.image = self.game.surfaces.image(self.image_key, (int(ENEMY_WIDTH * 1.5), int(ENEMY_HEIGHT * 1.5)),
+                                              placeholder_colors.get(enemy_type, BLACK))
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.y = y
         self.vel_y = ENEMY_VEL_BASE * self.diff_mult["enemy_speed_mult"] * self.game.time_based_difficulty_multiplier
         self.speed_x = 0
-        self.last_shot = pygame.time.get_ticks()
-        self.base_shoot_delay = ENEMY_SHOOT_DELAY_BASE + random.randrange(-300, 300)
+        self.last_shot = self.game.time
+        self.base_shoot_delay = ENEMY_SHOOT_DELAY_BASE + self.game.rng.randrange(-300, 300)
         self.shoot_delay = self.base_shoot_delay * self.diff_mult["enemy_shoot_delay_mult"]
+        self.rank = self.game.scheduler.new_rank()
+        self.shot_timer = None
+        self.waiting_to_shoot = False # A shot came due before the shooter could fire
         if self.enemy_type == "zigzag":
-            self.base_speed_x = random.choice([-2, 2]) * (ENEMY_VEL_BASE / 1.5)
+            self.base_speed_x = self.game.rng.choice([-2, 2]) * (ENEMY_VEL_BASE / 1.5)
             self.speed_x = self.base_speed_x * self.diff_mult["enemy_speed_mult"]
         elif self.enemy_type == "shooter":
             self.vel_y *= 0.7
+        # Enemies on a path look up their position in the baked table (see paths.py).
+        # path_pos counts frames along the path and starts negative to wait off screen.
+        self.path_name = path
+        self.path = get_path(path) if path is not None else None
+        self.path_pos = -path_delay
+        self.path_step = self.diff_mult["enemy_speed_mult"] * self.game.time_based_difficulty_multiplier
+        if self.path is not None:
+            self.rect.center = self.path[0]
+        if self.enemy_type == "shooter":
+            self.schedule_shot()
+
+    def schedule_shot(self):
+        if self.shot_timer is not None:
+            self.shot_timer.cancel()
+        self.shot_timer = self.game.scheduler.at(self.last_shot + self.shoot_delay, self.shoot, (self.rank, 0))
 
     def update(self):
+        if self.path is not None:
+            self.follow_path()
+            return
         self.rect.y += self.vel_y
         self.rect.x += self.speed_x
         if self.enemy_type == "zigzag":
             if self.rect.right > WIDTH or self.rect.left < 0:
                 self.speed_x *= -1
         elif self.enemy_type == "shooter":
-            if self.rect.top > random.randrange(50, 150):
+            if self.rect.top > self.game.rng.randrange(50, 150):
                 self.vel_y = 0
-            if self.vel_y == 0 and self.rect.bottom > 0:
-                self.shoot()
+                if self.waiting_to_shoot:
+                    self.shoot_now()
         if self.rect.top > HEIGHT + 10 or self.rect.left < -int(ENEMY_WIDTH * 1.5) - 5 or self.rect.right > WIDTH + int(ENEMY_WIDTH * 1.5) + 5:
             self.game.score += ENEMY_SKIP_SCORE
             self.kill()
 
+    def dormant_update(self):
+        # Far off screen (see visibility.py): only move, with the same steps as update
+        if self.path is not None:
+            self.follow_path()
+            return
+        self.rect.y += self.vel_y
+        self.rect.x += self.speed_x
+        if self.enemy_type == "zigzag" and (self.rect.right > WIDTH or self.rect.left < 0):
+            self.speed_x *= -1
+
+    def heading(self):
+        """Degrees the image is drawn rotated by (see variants.py)"""
+        if self.path is not None:
+            # Face along the path, measured over a few frames so the whole-pixel steps don't wobble
+            index = min(max(int(self.path_pos), 0), len(self.path) - 1)
+            x0, y0 = self.path[max(index - 4, 0)]
+            x1, y1 = self.path[min(index + 4, len(self.path) - 1)]
+            return heading_of(x1 - x0, y1 - y0)
+        if self.enemy_type == "zigzag":
+            return ENEMY_BANK_ANGLE if self.speed_x > 0 else -ENEMY_BANK_ANGLE # Lean into the turn
+        return 0
+
+    def follow_path(self):
+        self.path_pos += self.path_step
+        index = int(self.path_pos)
+        if index >= len(self.path):
+            # Flew off the end of the path without being shot down
+            self.game.score += ENEMY_SKIP_SCORE
+            self.kill()
+            return
+        self.rect.center = self.path[max(index, 0)]
+        if self.waiting_to_shoot and self.rect.bottom > 0:
+            self.shoot_now()
+
+    def shoot_now(self):
+        # Came on screen or stopped: fire in this frame's scheduler run, right after the moves
+        self.waiting_to_shoot = False
+        self.shot_timer = self.game.scheduler.at(self.game.time, self.shoot, (self.rank, 0))
+
     def shoot(self):
-        now = pygame.time.get_ticks()
-        if now - self.last_shot > self.shoot_delay:
-            self.last_shot = now
-            EnemyBullet(self.game, self.rect.centerx, self.rect.bottom)
+        self.shot_timer = None
+        if not self.alive():
+            return
+        # Shooters fire once on screen, and those flying straight down only once they stopped.
+        # Until then no timer is armed; update and follow_path fire the shot when it can be.
+        if self.rect.bottom > 0 and (self.path is not None or self.vel_y == 0):
+            self.last_shot = self.game.time
+            if len(self.game.enemy_bullets) < ENEMY_BULLET_CAP:
+                EnemyBullet(self.game, self.rect.centerx, self.rect.bottom)
+                self.game.audio.play("enemy_shot")
+            self.schedule_shot()
+        else:
+            self.waiting_to_shoot = True
+
+    def kill(self):
+        if self.shot_timer is not None:
+            self.shot_timer.cancel()
+            self.shot_timer = None
+        super().kill()
 
 class Boss(pygame.sprite.Sprite):
+    visible = True # Flagged every frame (see visibility.py)
+
     def __init__(self, game, level, boss_type):
         super().__init__(game.all_sprites, game.boss_group)
         self.game = game
         self.level = level
         self.boss_type = boss_type
         self.diff_mult = self.game.difficulty_multipliers
-        image_key = f"boss_{boss_type.replace('_boss', '')}"
-        self.image = self.game.assets.get(image_key, pygame.Surface([int(BOSS_WIDTH * 1.5), int(BOSS_HEIGHT * 1.5)]))
-        if image_key not in self.game.assets:
-            if boss_type == "level1_boss":
-                self.image.fill(ORANGE)
-            elif boss_type == "level2_boss":
-                self.image.fill(PURPLE)
-            elif boss_type == "level3_boss":
-                self.image.fill(RED)
-            elif boss_type == "level4_boss":
-                self.image.fill(WHITE)
-            elif boss_type == "level5_boss":
-                self.image.fill(BLUE)
-            elif boss_type == "final_boss":
-                self.image.fill(GREY)
+        self.image_key, self.base_image = boss_image(game, boss_type)
+        self.image = self.base_image
+        self.rank = self.game.scheduler.new_rank()
+        self.flash_timer = None # Ends the hit flash
         self.rect = self.image.get_rect()
         self.rect.centerx = WIDTH / 2
         self.rect.bottom = -int(BOSS_HEIGHT * 1.5)
         self.base_speed_y = BOSS_VEL_BASE
-        self.base_speed_x = BOSS_VEL_BASE * random.choice([-1.5, 1.5])
+        self.base_speed_x = BOSS_VEL_BASE * self.game.rng.choice([-1.5, 1.5])
         self.speed_y = self.base_speed_y * self.diff_mult["boss_speed_mult"]
         self.speed_x = self.base_speed_x * self.diff_mult["boss_speed_mult"]
         self.health = (BOSS_HEALTH_BASE * level) * self.diff_mult["boss_health_mult"]
         self.max_health = self.health
         self.entry_complete = False
-        self.base_shoot_delay = BOSS_SHOOT_DELAY_BASE
-        self.shoot_delay = self.base_shoot_delay * self.diff_mult["boss_shoot_delay_mult"]
-        self.last_shot = pygame.time.get_ticks()
-        if self.boss_type == "level2_boss":
-            self.base_shoot_delay = 750
-        elif self.boss_type == "level3_boss":
-            self.base_shoot_delay = 900
+        if self.boss_type == "level3_boss":
             self.base_speed_x *= 1.2
-        elif self.boss_type == "level4_boss":
-            self.base_shoot_delay = 600
         elif self.boss_type == "level5_boss":
-            self.base_shoot_delay = 700
             self.health *= 1.5
         elif self.boss_type == "final_boss":
             self.health *= 2
-            self.base_shoot_delay = 500
         self.health = self.health * self.diff_mult["boss_health_mult"]
         self.max_health = self.health
         self.speed_x = self.base_speed_x * self.diff_mult["boss_speed_mult"]
-        self.shoot_delay = self.base_shoot_delay * self.diff_mult["boss_shoot_delay_mult"]
+        # Bullet patterns per health phase come from BOSS_PATTERNS in levels.py
+        self.pattern = BossPattern(self.boss_type, self.diff_mult)
 
     def update(self):
         if not self.entry_complete:
@@ -246,72 +366,117 @@ class Boss(pygame.sprite.Sprite):
                 self.speed_x *= -1
             self.shoot()
 
+    def dormant_update(self):
+        # Still flying in from far above the screen (see visibility.py)
+        self.rect.y += self.speed_y
+
+    def heading(self):
+        # Lean into the sweep once in place
+        if not self.entry_complete:
+            return 0
+        return BOSS_BANK_ANGLE if self.speed_x > 0 else -BOSS_BANK_ANGLE
+
     def shoot(self):
-        now = pygame.time.get_ticks()
-        if now - self.last_shot > self.shoot_delay:
-            self.last_shot = now
-            offset = int(10 * 1.5)
-            if self.boss_type == "level1_boss":
-                EnemyBullet(self.game, self.rect.centerx, self.rect.bottom)
-            elif self.boss_type == "level2_boss":
-                EnemyBullet(self.game, self.rect.left + offset, self.rect.bottom)
-                EnemyBullet(self.game, self.rect.right - offset, self.rect.bottom)
-            elif self.boss_type == "final_boss":
-                EnemyBullet(self.game, self.rect.left + offset, self.rect.centery)
-                EnemyBullet(self.game, self.rect.centerx, self.rect.bottom)
-                EnemyBullet(self.game, self.rect.right - offset, self.rect.centery)
-            else:
-                EnemyBullet(self.game, self.rect.centerx, self.rect.bottom)
+        now = self.game.time
+        self.pattern.update(now, self.health / self.max_health, self.rect, self.game.target_player().rect.center, self.game.projectiles)
 
     def take_damage(self, amount):
         self.health -= amount
+        self.game.audio.play("boss_hit")
+        # Flash briefly after every hit
+        self.flash(self.game.time + BOSS_HIT_FLASH_DURATION)
         if self.health <= 0:
             self.kill()
             return True
         return False
 
+    def flash(self, until):
+        """Show the hit flash until the simulation time until"""
+        self.image = self.game.surfaces.flash(self.image_key, self.base_image, BOSS_HIT_FLASH_COLOR)
+        if self.flash_timer is not None:
+            self.flash_timer.cancel()
+        self.flash_timer = self.game.scheduler.at(until, self.end_flash, (self.rank, 0))
+
+    def end_flash(self):
+        self.flash_timer = None
+        self.image = self.base_image
+
+    def kill(self):
+        if self.flash_timer is not None:
+            self.flash_timer.cancel()
+            self.flash_timer = None
+        super().kill()
+
+def boss_image(game, boss_type):
+    """(asset name, image) of a boss type"""
+    image_key = f"boss_{boss_type.replace('_boss', '')}"
+    placeholder_colors = {"level1_boss": ORANGE, "level2_boss": PURPLE, "level3_boss": RED,
+                          "level4_boss": WHITE, "level5_boss": BLUE, "final_boss": GREY}
+    return image_key, game.surfaces.image(image_key, (int(BOSS_WIDTH * 1.5), int(BOSS_HEIGHT * 1.5)),
+                                          placeholder_colors.get(boss_type, BLACK))
+
+def preload_boss(game, boss_type):
+    """Build the images a boss of boss_type will be drawn with (see scenes.BossIntro)"""
+    image_key, image = boss_image(game, boss_type)
+    flash = game.surfaces.flash(image_key, image, BOSS_HIT_FLASH_COLOR)
+    for angle in (-BOSS_BANK_ANGLE, BOSS_BANK_ANGLE):
+        game.variants.rotated(image_key, image, angle)
+        game.variants.rotated(image_key, flash, angle)
+
 class Bullet(pygame.sprite.Sprite):
+    visible = True # Flagged every frame (see visibility.py)
+    dormant_update = None # Always fully updated
+    heading = None # Drawn as is (see variants.py)
+
     def __init__(self, game, x, y):
         super().__init__(game.all_sprites, game.bullets)
         self.game = game
-        self.image = self.game.assets.get("bullet_player", pygame.Surface([int(BULLET_WIDTH * 1.5), int(BULLET_HEIGHT * 1.5)]))
-        if "bullet_player" not in self.game.assets:
-            self.image.fill(RED)
+        self.image = self.game.surfaces.image("bullet_player", (int(BULLET_WIDTH * 1.5), int(BULLET_HEIGHT * 1.5)), RED)
         self.rect = self.image.get_rect()
         self.rect.centerx = x
         self.rect.bottom = y
         self.speed_y = -BULLET_VEL
+        self.moved_y = 0 # Pixels moved this frame, 0 until the first update (see sweep.py)
 
     def update(self):
+        top = self.rect.y
         self.rect.y += self.speed_y
+        self.moved_y = self.rect.y - top
         if self.rect.bottom < 0:
             self.kill()
 
 class EnemyBullet(pygame.sprite.Sprite):
+    visible = True # Flagged every frame (see visibility.py)
+    dormant_update = None # Always fully updated
+    heading = None # Drawn as is (see variants.py)
+
     def __init__(self, game, x, y):
         super().__init__(game.all_sprites, game.enemy_bullets)
         self.game = game
         self.diff_mult = self.game.difficulty_multipliers
-        self.image = self.game.assets.get("bullet_enemy", pygame.Surface([int(BULLET_WIDTH * 1.5), int(BULLET_HEIGHT * 1.5 * 1.5)]))
-        if "bullet_enemy" not in self.game.assets:
-            self.image.fill(YELLOW)
+        self.image = self.game.surfaces.image("bullet_enemy", (int(BULLET_WIDTH * 1.5), int(BULLET_HEIGHT * 1.5 * 1.5)), YELLOW)
         self.rect = self.image.get_rect()
         self.rect.centerx = x
         self.rect.top = y
         self.speed_y = (BULLET_VEL * ENEMY_BULLET_VEL_MULT) * self.diff_mult["enemy_bullet_speed_mult"]
+        self.moved_y = 0 # Pixels moved this frame, 0 until the first update (see sweep.py)
 
     def update(self):
+        top = self.rect.y
         self.rect.y += self.speed_y
+        self.moved_y = self.rect.y - top
         if self.rect.top > HEIGHT:
             self.kill()
 
 class PowerUp(pygame.sprite.Sprite):
+    visible = True # Flagged every frame (see visibility.py)
+    dormant_update = None # Always fully updated
+    heading = None # Drawn as is (see variants.py)
+
     def __init__(self, game, center):
         super().__init__(game.all_sprites, game.powerups)
         self.game = game
-        self.image = self.game.assets.get("powerup", pygame.Surface([POWERUP_WIDTH, POWERUP_HEIGHT]))
-        if "powerup" not in self.game.assets:
-            self.image.fill(YELLOW)
+        self.image = self.game.surfaces.image("powerup", (POWERUP_WIDTH, POWERUP_HEIGHT), YELLOW)
         self.rect = self.image.get_rect()
         self.rect.center = center
         self.speed_y = POWERUP_VEL
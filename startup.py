@@ -0,0 +1,90 @@
+# Startup helpers for Cosmic Clash
+
+# Time to the first frame matters on the kiosks, so startup only does what the start
+# screen needs: the display, the font and the background. Sound, sprite images and the
+# NumPy-based modules are loaded after the first frame is shown (see Game.load_deferred).
+# main.py --profile-startup prints where the time went.
+#
+# The first frame misses its 300 ms target where NumPy is installed: pygame's own
+# __init__ then imports NumPy (for surfarray) and pkg_resources (for pkgdata), and
+# "import pygame" alone takes 210-290 ms of the 400-570 to the first frame on the
+# one-core test machine. Of the rest, the window takes 65-75 ms and the background
+# 135-165, most of it decoding the three 5760x360 PNG layers.
+
+import json
+import os
+import time
+import pygame
+from settings import *
+
+class StartupProfile:
+    """Named steps of startup with the time each one took"""
+    def __init__(self, start):
+        self.start = start
+        self.last = start
+        self.steps = []
+        self.first_frame = None # Time from start to the first presented frame
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.steps.append((name, now - self.last))
+        self.last = now
+
+    def mark_first_frame(self):
+        self.mark("first frame")
+        if self.first_frame is None:
+            self.first_frame = self.last - self.start
+
+    def report(self):
+        lines = ["Startup profile (ms):"]
+        total = 0.0
+        for name, duration in self.steps:
+            total += duration
+            lines.append(f"  {name:<28}{duration * 1000:8.1f}{total * 1000:9.1f}")
+            if name == "first frame":
+                lines.append(f"  {'-- time to first frame':<28}{'':8}{total * 1000:9.1f}")
+        return "\n".join(lines)
+
+# Where fonts get installed; a font that was not found is looked up again once one changes
+FONT_DIRS = ["/usr/share/fonts", "/usr/local/share/fonts", "~/.fonts", "~/.local/share/fonts",
+             "/Library/Fonts", "~/Library/Fonts", os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts")]
+
+def fonts_changed():
+    """Latest modification time of the font directories and the directories in them"""
+    latest = 0.0
+    for top in FONT_DIRS:
+        for directory, _, _ in os.walk(os.path.expanduser(top)):
+            try:
+                latest = max(latest, os.path.getmtime(directory))
+            except OSError:
+                pass
+    return latest
+
+def resolve_font(name, cache_path=os.path.join(SAVE_DIR, "font_cache.json")):
+    """Path of the system font called name, or None for pygame's default font.
+
+    Looking a font up scans every installed font, so the answer is kept in a small
+    cache file. A found font is looked up again when its file disappears, a missing one
+    (cached as {"missing": fonts_changed()}) when fonts are installed or removed.
+    """
+    if not name:
+        return None
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    cached = cache.get(name)
+    if isinstance(cached, str) and os.path.exists(cached):
+        return cached
+    if isinstance(cached, dict) and cached.get("missing") == fonts_changed():
+        return None
+    path = pygame.font.match_font(name)
+    cache[name] = path if path is not None else {"missing": fonts_changed()}
+    try:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump(cache, f)
+    except OSError as e:
+        print(f"Could not save font cache: {e}")
+    return path
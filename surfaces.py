@@ -0,0 +1,108 @@
+# Shared surface cache for Cosmic Clash
+
+# Placeholder images for missing assets and derived variants of images (tints, hit
+# flashes, scaled copies) are built once and shared by every sprite that needs them,
+# instead of each sprite allocating and filling its own surface. Entries are keyed by
+# (kind, size, color or tint, effect). Cached surfaces are shared, so nothing may draw
+# onto them after they are built. Variants are built on a per-pixel alpha copy and put
+# back into the cheapest format for them (see formats.py), so a tint can't change the
+# colorkey of a colorkey image. Scenes preload bosses on a background thread (see
+# scenes.py) while the game draws, so the cache is locked.
+
+import threading
+import pygame
+from settings import *
+from formats import editable, optimize
+
+EXPLOSION_PLACEHOLDER_SIZES = [30, 40, 50, 60, 70, 80, 90, 100]
+EXPLOSION_PLACEHOLDER_COLORS = [(255, 0, 0), (255, 165, 0), (255, 255, 0), (255, 255, 255)]
+
+def multiply_colors(a, b):
+    return tuple(x * y // 255 for x, y in zip(a, b))
+
+class SurfaceCache:
+    def __init__(self, game):
+        self.game = game
+        self.surfaces = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.surfaces.clear()
+
+    def get(self, key, build):
+        """The surface for key, calling build() the first time it is asked for"""
+        with self.lock:
+            surface = self.surfaces.get(key)
+            if surface is None:
+                self.misses += 1
+                surface = self.surfaces[key] = build()
+            else:
+                self.hits += 1
+            return surface
+
+    def image(self, name, size, color):
+        """The loaded asset called name, or a placeholder of size filled with color"""
+        asset = self.game.assets.get(name)
+        if asset is not None:
+            return asset
+        def build():
+            surface = pygame.Surface(size)
+            surface.fill(color)
+            return surface
+        return self.get((name, size, color, "fill"), build)
+
+    def tinted(self, name, image, tint):
+        """image with every color multiplied by tint"""
+        if tint == WHITE:
+            return image
+        def build():
+            surface = editable(image)
+            surface.fill(tint, special_flags=pygame.BLEND_RGB_MULT)
+            return optimize(surface)[0]
+        return self.get((name, image.get_size(), tint, "multiply"), build)
+
+    def flash(self, name, image, color):
+        """image brightened by adding color, for hit flashes"""
+        def build():
+            surface = editable(image)
+            surface.fill(color, special_flags=pygame.BLEND_RGB_ADD)
+            return optimize(surface)[0]
+        return self.get((name, image.get_size(), color, "add"), build)
+
+    def scaled(self, name, image, size):
+        return self.get((name, size, None, "scale"), lambda: pygame.transform.scale(image, size))
+
+    def explosion_frames(self, scale=1):
+        """Frames of the explosion animation, scale times their normal size"""
+        def build():
+            frames = self.game.assets.get("explosion_frames")
+            if frames is None:
+                # Placeholder frames: growing circles
+                frames = []
+                for i, size in enumerate(EXPLOSION_PLACEHOLDER_SIZES):
+                    frame = pygame.Surface([size, size], pygame.SRCALPHA)
+                    color = EXPLOSION_PLACEHOLDER_COLORS[i % len(EXPLOSION_PLACEHOLDER_COLORS)]
+                    pygame.draw.circle(frame, color, (size // 2, size // 2), size // 2 - 5)
+                    frames.append(optimize(frame)[0])
+            if scale != 1:
+                frames = [pygame.transform.scale(frame, (frame.get_width() * scale, frame.get_height() * scale)) for frame in frames]
+            return frames
+        return self.get(("explosion", None, None, f"frames x{scale}"), build)
+
+    def stats(self):
+        """Number of cached surfaces, their total size in bytes, hits and misses"""
+        count = 0
+        size = 0
+        for entry in list(self.surfaces.values()): # May be called while another thread adds entries
+            for surface in entry if isinstance(entry, list) else [entry]:
+                count += 1
+                size += surface.get_pitch() * surface.get_height()
+        return {"surfaces": count, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def report(self):
+        stats = self.stats()
+        return (f"Surface cache: {stats['surfaces']} surfaces, {stats['bytes'] / 1024:.0f} KB, "
+                f"{stats['hits']} hits, {stats['misses']} builds")
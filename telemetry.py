@@ -0,0 +1,193 @@
+# Live telemetry for Cosmic Clash
+
+# Opt in with main.py --metrics-port PORT and/or --metrics-json FILE. The game loop only
+# records each presented frame's duration into a fixed ring of floats and, every
+# TELEMETRY_SAMPLE_FRAMES frames, replaces one dict of gauges (sprite counts, culled
+# sprites, level, state, cache sizes). Both are plain assignments the game thread alone
+# makes, so there are no locks for anything else to hold. A background thread does the rest: it computes
+# FPS and frame-time percentiles from a copy of the ring, reads RSS, answers HTTP
+# requests on localhost in the Prometheus text format (GET /metrics, or /metrics.json)
+# and writes the same values as JSON to a file every TELEMETRY_JSON_INTERVAL seconds.
+# Garbage collection counts and pauses come from the game's GcPolicy (see gcpolicy.py), input
+# latencies from its InputLatency (see latency.py).
+
+import json
+import os
+import threading
+import time
+from array import array
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from settings import *
+
+PREFIX = "cosmic_clash_"
+GROUPS = ["all_sprites", "enemies", "bullets", "enemy_bullets", "powerups"]
+STATES = ["START_SCREEN", "PLAYING", "BOSS_FIGHT", "GAME_OVER"]
+QUANTILES = [0.5, 0.9, 0.99]
+
+def resident_memory():
+    """Resident set size of this process in bytes, or None where it can't be read"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # Peak, not current
+    except ImportError:
+        return None
+
+class Telemetry:
+    def __init__(self, game, port=None, json_path=None, window=TELEMETRY_WINDOW):
+        self.game = game
+        self.json_path = json_path
+        # Written only by the game thread
+        self.frame_times = array("d", bytes(8 * window)) # Seconds, a ring of the last window frames
+        self.frames = 0
+        self.total_time = 0.0
+        self.last_frame = None
+        self.gauges = {}
+        self.server = None
+        if port is not None:
+            self.server = HTTPServer((TELEMETRY_HOST, port), self.handler())
+            threading.Thread(target=self.server.serve_forever, name="telemetry-http", daemon=True).start()
+            print(f"Serving metrics on http://{TELEMETRY_HOST}:{self.server.server_port}/metrics")
+        self.stopped = threading.Event()
+        if json_path is not None:
+            threading.Thread(target=self.write_json, name="telemetry-json", daemon=True).start()
+
+    def frame(self):
+        """Called by the game once per presented frame"""
+        now = time.perf_counter()
+        if self.last_frame is not None:
+            duration = now - self.last_frame
+            self.frame_times[self.frames % len(self.frame_times)] = duration
+            self.frames += 1
+            self.total_time += duration
+            if self.frames % TELEMETRY_SAMPLE_FRAMES == 0:
+                self.sample()
+        self.last_frame = now
+
+    def sample(self):
+        game = self.game
+        gauges = {"level": game.current_level, "state": game.game_state}
+        for name in GROUPS:
+            group = getattr(game, name, None) # Only there once the first game started
+            gauges[name] = len(group) if group is not None else 0
+        projectiles = getattr(game, "projectiles", None)
+        gauges["projectiles"] = projectiles.count if projectiles is not None else 0
+        particles = getattr(game, "particles", None)
+        gauges["particles"] = particles.count if particles is not None else 0
+        visibility = game.visibility
+        gauges["sprites_drawn"] = visibility.drawn
+        gauges["sprites_culled"] = visibility.culled
+        gauges["sprites_dormant"] = visibility.dormant
+        surfaces = game.surfaces.stats()
+        gauges["surface_cache_surfaces"] = surfaces["surfaces"]
+        gauges["surface_cache_bytes"] = surfaces["bytes"]
+        gauges["text_cache_entries"] = len(game.text_cache)
+        gauges["assets"] = len(game.assets)
+        self.gauges = gauges # Replaced whole, readers never see it half-written
+
+    def values(self):
+        """Everything exported, computed from copies of what the game thread wrote"""
+        frames = self.frames
+        window = self.frame_times[:min(frames, len(self.frame_times))].tolist()
+        window.sort()
+        values = {"frames": frames, "frame_time_total": self.total_time, "gauges": self.gauges,
+                  "resident_memory": resident_memory(), "gc": self.game.gc_policy.stats(),
+                  "input_latency_quantiles": self.game.input_latency.quantiles()}
+        if window:
+            values["fps"] = len(window) / sum(window)
+            values["frame_time_quantiles"] = {q: window[min(len(window) - 1, int(q * len(window)))] * 1000 for q in QUANTILES}
+        return values
+
+    def prometheus(self):
+        values = self.values()
+        lines = []
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{PREFIX}{name}{labels} {value}")
+        metric("frames_total", "counter", "Frames presented", [("", values["frames"])])
+        if "fps" in values:
+            metric("fps", "gauge", f"Frames per second over the last {TELEMETRY_WINDOW} frames", [("", f"{values['fps']:.2f}")])
+            quantiles = [(f'{{quantile="{q}"}}', f"{ms:.3f}") for q, ms in values["frame_time_quantiles"].items()]
+            metric("frame_time_ms", "summary", "Time between presented frames",
+                   quantiles + [("_sum", f"{values['frame_time_total'] * 1000:.1f}"), ("_count", values["frames"])])
+        gauges = values["gauges"]
+        if gauges:
+            metric("sprites", "gauge", "Sprites per group", [(f'{{group="{name}"}}', gauges[name]) for name in GROUPS])
+            metric("projectiles", "gauge", "Boss projectiles in flight", [("", gauges["projectiles"])])
+            metric("particles", "gauge", "Live particles", [("", gauges["particles"])])
+            metric("sprites_visibility", "gauge", "Sprites drawn, culled off screen and dormant far off screen in the last frame",
+                   [(f'{{state="{state}"}}', gauges[f"sprites_{state}"]) for state in ("drawn", "culled", "dormant")])
+            metric("level", "gauge", "Current level", [("", gauges["level"])])
+            metric("game_state", "gauge", "1 for the current game state",
+                   [(f'{{state="{state}"}}', int(state == gauges["state"])) for state in STATES])
+            metric("surface_cache_surfaces", "gauge", "Surfaces in the placeholder and variant cache", [("", gauges["surface_cache_surfaces"])])
+            metric("surface_cache_bytes", "gauge", "Pixel bytes in the placeholder and variant cache", [("", gauges["surface_cache_bytes"])])
+            metric("text_cache_entries", "gauge", "Rendered text surfaces cached", [("", gauges["text_cache_entries"])])
+            metric("assets", "gauge", "Loaded image assets", [("", gauges["assets"])])
+        if values["input_latency_quantiles"]:
+            metric("input_latency_ms", "summary", "Time from an input event to the flip that shows it (see latency.py)",
+                   [(f'{{quantile="{q}"}}', f"{ms:.3f}") for q, ms in values["input_latency_quantiles"].items()])
+        gc_stats = values["gc"]
+        metric("gc_collections_total", "counter", "Garbage collections per generation",
+               [(f'{{generation="{g}"}}', n) for g, n in enumerate(gc_stats["collections"])])
+        metric("gc_pause_seconds_total", "counter", "Time spent in garbage collections per generation",
+               [(f'{{generation="{g}"}}', f"{t:.6f}") for g, t in enumerate(gc_stats["pause_total"])])
+        metric("gc_max_recent_pause_ms", "gauge", f"Longest of the last {GC_RECENT_PAUSES} garbage collections",
+               [("", f"{gc_stats['max_recent_pause'] * 1000:.3f}")])
+        metric("gc_frozen_objects", "gauge", "Objects frozen out of garbage collection", [("", gc_stats["frozen"])])
+        if values["resident_memory"] is not None:
+            metric("resident_memory_bytes", "gauge", "Resident memory of the process", [("", values["resident_memory"])])
+        return "\n".join(lines) + "\n"
+
+    def handler(self):
+        telemetry = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = telemetry.prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(telemetry.values()).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # No line per scrape on the console
+        return Handler
+
+    def write_json(self):
+        while not self.stopped.wait(TELEMETRY_JSON_INTERVAL):
+            self.save_json()
+
+    def save_json(self):
+        values = self.values()
+        values["time"] = time.time()
+        try:
+            os.makedirs(os.path.dirname(self.json_path) or ".", exist_ok=True)
+            temporary = self.json_path + ".tmp"
+            with open(temporary, "w") as f:
+                json.dump(values, f)
+            os.replace(temporary, self.json_path) # Readers never see a half-written file
+        except OSError as e:
+            print(f"Could not write telemetry: {e}")
+
+    def close(self):
+        self.stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.json_path is not None:
+            self.save_json()
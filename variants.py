@@ -0,0 +1,125 @@
+# Rotated sprite variants for Cosmic Clash
+
+# Rotating an image with pygame.transform every frame is far too slow, so sprites with a
+# heading (boss bullets along their flight, zigzag enemies banking, enemies on a path
+# facing where they fly, bosses leaning into their sweep) are drawn from variants made
+# once: every image can be rotated to ROTATION_STEPS angles (per asset, or
+# ROTATION_DEFAULT_STEPS) and a heading is drawn with the nearest of them.
+#
+# A variant is the rotated image, the offset of its top left from the sprite's center
+# (rotating grows the image around its center) and its mask, made when first asked for.
+# Only drawing uses variants: sprite rects, and so every collision, stay unrotated, and
+# the simulation (with it replays and co-op) does not depend on them.
+#
+# The images in ROTATION_PRELOAD are rotated to every angle as the images load, since a
+# boss volley needs most angles at once. Other variants are made the first time they
+# are drawn and kept in an LRU of at most VARIANT_CACHE_BYTES, so a boss that only ever
+# leans two ways keeps two variants. Heading 0 is the art as drawn (facing down, towards
+# the players); angles are degrees counterclockwise on screen, like transform.rotate.
+# Scenes preload variants on a background thread (see scenes.py), so the cache is locked.
+
+import math
+import threading
+from collections import OrderedDict
+import pygame
+from settings import *
+from formats import optimize
+
+def heading_of(dx, dy):
+    """Heading in degrees of a movement by (dx, dy)"""
+    return math.degrees(math.atan2(dx, dy))
+
+def steps_for(name):
+    return ROTATION_STEPS.get(name, ROTATION_DEFAULT_STEPS)
+
+class Variant:
+    __slots__ = ("image", "offset", "_mask")
+
+    def __init__(self, image, offset):
+        self.image = image
+        self.offset = offset # Top left relative to the sprite's center
+        self._mask = None
+
+    @property
+    def mask(self):
+        if self._mask is None:
+            self._mask = pygame.mask.from_surface(self.image)
+        return self._mask
+
+def make_variant(image, angle, scale=1):
+    if angle == 0 and scale == 1:
+        rotated = image
+    else:
+        # Colorkey images are rotated as per-pixel alpha, so the key color can't be smoothed into the edges
+        source = image.convert_alpha() if image.get_colorkey() is not None else image
+        rotated = optimize(pygame.transform.rotozoom(source, angle, scale))[0]
+    # Like Rect.center, the top left is the center minus half the size, rounded down
+    return Variant(rotated, (-(rotated.get_width() // 2), -(rotated.get_height() // 2)))
+
+class VariantCache:
+    def __init__(self, budget=VARIANT_CACHE_BYTES):
+        self.budget = budget
+        self.preloaded = {} # Image: a Variant for every step
+        self.recent = OrderedDict() # (image, step, scale): Variant, least recently drawn first
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.preloaded.clear()
+            self.recent.clear()
+            self.bytes = 0
+
+    def frames(self, name, image):
+        """A variant of image for each of the asset's steps, index 0 unrotated"""
+        with self.lock:
+            frames = self.preloaded.get(image)
+            if frames is None:
+                steps = steps_for(name)
+                frames = self.preloaded[image] = [make_variant(image, step * 360 / steps) for step in range(steps)]
+            return frames
+
+    def rotated(self, name, image, angle, scale=1):
+        """The variant of image nearest to angle"""
+        with self.lock:
+            steps = steps_for(name)
+            step = round(angle * steps / 360) % steps
+            frames = self.preloaded.get(image)
+            if frames is not None and scale == 1:
+                self.hits += 1
+                return frames[step]
+            key = (image, step, scale)
+            variant = self.recent.get(key)
+            if variant is not None:
+                self.hits += 1
+                self.recent.move_to_end(key)
+                return variant
+            self.misses += 1
+            variant = self.recent[key] = make_variant(image, step * 360 / steps, scale)
+            if variant.image is not image:
+                self.bytes += size_of(variant.image)
+            # Drop the least recently drawn variants over the budget, never the one just made
+            while self.bytes > self.budget and len(self.recent) > 1:
+                (old, _, _), evicted = self.recent.popitem(last=False)
+                if evicted.image is not old:
+                    self.bytes -= size_of(evicted.image)
+                self.evicted += 1
+            return variant
+
+    def blit(self, sprite):
+        """(image, topleft) to draw sprite at its heading()"""
+        variant = self.rotated(sprite.image_key, sprite.image, sprite.heading())
+        x, y = sprite.rect.center
+        return variant.image, (x + variant.offset[0], y + variant.offset[1])
+
+    def report(self):
+        preloaded = sum(len(frames) for frames in self.preloaded.values())
+        preloaded_bytes = sum(size_of(v.image) for frames in self.preloaded.values() for v in frames)
+        return (f"Rotated variants: {preloaded} preloaded ({preloaded_bytes / 1024:.0f} KB), {len(self.recent)} recent "
+                f"({self.bytes / 1024:.0f} KB), {self.hits} hits, {self.misses} made, {self.evicted} evicted")
+
+def size_of(surface):
+    return surface.get_pitch() * surface.get_height()
@@ -0,0 +1,79 @@
+# Visibility culling for Cosmic Clash
+
+# Enemies spawn above the screen (spawn_enemy puts them at y = -150 to -80) and the boss
+# flies in from above it, so at the start of every wave a good part of all_sprites is
+# out of sight. Once a frame, after the spawns, every sprite is flagged:
+#
+#   visible   its rect touches the screen grown by VISIBILITY_MARGIN. Sprites that are
+#             not visible are not drawn and are left out of every collision query. Bullets
+#             die as they leave the screen and the players are kept on it, so nothing off
+#             screen could have hit anything anyway.
+#   dormant   it is more than ACTIVATION_BAND pixels off screen and has a dormant_update.
+#             The next frame only dormant_update runs (moving it, nothing else) instead of
+#             update, until it is back inside the band.
+#
+# Both flags follow from the sprite positions alone, so a restored snapshot needs no more
+# than the positions to flag the same sprites (see snapshot.py).
+
+import pygame
+from settings import *
+
+class Visibility:
+    def __init__(self):
+        self.view = pygame.Rect(0, 0, WIDTH, HEIGHT).inflate(2 * VISIBILITY_MARGIN, 2 * VISIBILITY_MARGIN)
+        self.band = pygame.Rect(0, 0, WIDTH, HEIGHT).inflate(2 * ACTIVATION_BAND, 2 * ACTIVATION_BAND)
+        # The last frame's counts, and totals for the run
+        self.drawn = 0
+        self.culled = 0
+        self.dormant = 0
+        self.frames = 0
+        self.total_drawn = 0
+        self.total_culled = 0
+        self.total_dormant = 0
+
+    def update(self, sprites):
+        """Update every sprite in sprites, the ones far off screen with dormant_update"""
+        band = self.band
+        dormant = 0
+        for sprite in sprites.sprites(): # A copy, updates add and kill sprites
+            if sprite.dormant_update is not None and not band.colliderect(sprite.rect):
+                sprite.dormant_update()
+                dormant += 1
+            else:
+                sprite.update()
+        self.dormant = dormant
+        self.total_dormant += dormant
+
+    def flag(self, sprites):
+        """Flag which sprites are visible this frame"""
+        view = self.view
+        culled = 0
+        for sprite in sprites:
+            sprite.visible = visible = view.colliderect(sprite.rect)
+            if not visible:
+                culled += 1
+        self.culled = culled
+        self.drawn = len(sprites) - culled
+        self.frames += 1
+        self.total_drawn += self.drawn
+        self.total_culled += culled
+
+    def visible(self, group):
+        """The visible sprites of group, in the group's order"""
+        return [sprite for sprite in group if sprite.visible]
+
+    def collide(self, sprite, group, dokill):
+        """pygame.sprite.spritecollide over the visible sprites of group only"""
+        if not sprite.visible:
+            return []
+        rect = sprite.rect
+        hits = [other for other in group if other.visible and rect.colliderect(other.rect)]
+        if dokill:
+            for other in hits:
+                other.kill()
+        return hits
+
+    def report(self):
+        frames = max(1, self.frames)
+        return (f"Visibility: {self.total_drawn / frames:.1f} sprites drawn, {self.total_culled / frames:.1f} culled "
+                f"and {self.total_dormant / frames:.1f} dormant per frame over {self.frames} frames")